@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+산출물(artifact) 저장소
+벡터DB, 파생 인덱스, JSON 데이터셋을 내용 해시로 주소를 붙여 ARTIFACT_STORE_DIR/objects 아래에 보관합니다.
+캐시 매니페스트(file_manifest.py)에 산출물별 현재 객체와 이전 세대를 기록하여,
+상태 확인(status) / 전체 검증(verify) / 정리(gc)를 산출물 단위로 할 수 있게 합니다.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from file_manifest import FINGERPRINT_HASH, get_default_manifest, hash_file
+
+ARTIFACT_STORE_DIR = os.getenv("ARTIFACT_STORE_DIR", ".artifact_store")
+
+class ArtifactSpec:
+    """관리 대상 산출물 하나.
+
+    kind: "vector_db"(PDF 소스로 만든 벡터DB), "ann_index"/"mmap"(parent 벡터DB에서 파생), "dataset"(원본 JSON 데이터)
+    sources: 만들 때 쓴 소스 파일 경로 (벡터DB는 생략하면 벡터DB 안의 소스 매니페스트를 사용)
+    """
+
+    def __init__(self, name, path, kind, description="", sources=None, parent=None):
+        self.name = name
+        self.path = path
+        self.kind = kind
+        self.description = description
+        self.sources = sources
+        self.parent = parent
+
+    def __repr__(self):
+        return f"ArtifactSpec({self.name!r}, {self.path!r}, {self.kind!r})"
+
+def content_hash(path, manifest=None):
+    """파일 또는 디렉터리의 내용 해시. 디렉터리는 (상대 경로, 파일 해시) 목록의 해시입니다. 매니페스트의 stat 캐시를 사용합니다."""
+    manifest = manifest or get_default_manifest()
+    if not os.path.isdir(path):
+        return manifest.file_hash(path)
+    digest = hashlib.new(FINGERPRINT_HASH)
+    for relative in _directory_files(path):
+        digest.update(f"{relative}\x1f{manifest.file_hash(os.path.join(path, relative))}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+def source_files(path):
+    """산출물 경로를 소스로 기록할 파일 목록으로 바꿉니다 (디렉터리 산출물은 안의 모든 파일)."""
+    if not os.path.isdir(path):
+        return [path]
+    return [os.path.join(path, relative) for relative in _directory_files(path)]
+
+def _directory_files(path):
+    files = []
+    for root, _, names in os.walk(path):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/"))
+    return sorted(files)
+
+def _path_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, relative)) for relative in _directory_files(path))
+
+def _link_or_copy(src, dst):
+    """하드 링크를 만들고, 지원하지 않는 파일 시스템이면 복사합니다."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+class ArtifactStore:
+    """내용 해시로 주소를 붙인 객체 저장소.
+
+    객체 이름은 "<해시><확장자>"이고 objects/<해시 앞 2자리>/ 아래에 저장됩니다.
+    벡터DB처럼 항상 새 파일로 교체(os.replace)되는 산출물은 하드 링크로 보관해 디스크를 두 배로 쓰지 않습니다.
+    """
+
+    def __init__(self, root=ARTIFACT_STORE_DIR, manifest=None):
+        self.root = root
+        self.manifest = manifest or get_default_manifest()
+
+    def object_path(self, object_name):
+        return os.path.join(self.root, "objects", object_name[:2], object_name)
+
+    def has_object(self, object_name):
+        return bool(object_name) and os.path.exists(self.object_path(object_name))
+
+    def put(self, path, link=True):
+        """산출물을 저장소에 넣고 객체 이름을 반환합니다. 같은 내용의 객체가 이미 있으면 다시 쓰지 않습니다."""
+        object_name = content_hash(path, self.manifest) + _object_suffix(path)
+        object_path = self.object_path(object_name)
+        if os.path.exists(object_path):
+            return object_name
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = object_path + ".tmp"
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        if os.path.isdir(path):
+            shutil.copytree(path, tmp_path, copy_function=_link_or_copy if link else shutil.copy2)
+        elif link:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            _link_or_copy(path, tmp_path)
+        else:
+            shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, object_path)
+        return object_name
+
+    def commit(self, path, sources=None, link=True, **info):
+        """산출물을 저장소에 넣고 매니페스트에 (객체, 소스 해시, 부가 정보)를 기록합니다.
+
+        보존 세대(ARTIFACT_HISTORY_SIZE)에서 밀려난 이전 객체는 다른 산출물이 참조하지 않으면 바로 지웁니다.
+        """
+        object_name = self.put(path, link=link)
+        previous = self.manifest.artifacts.get(os.path.normpath(path)) or {}
+        entry = self.manifest.record_artifact(path, sources, object=object_name, **info)
+        self.manifest.save()
+        if entry is not None:
+            kept = {entry.get("object")} | set(entry.get("history", []))
+            dropped = ({previous.get("object")} | set(previous.get("history", []))) - kept - {None}
+            if dropped:
+                referenced = self.referenced_objects()
+                for name in dropped - referenced:
+                    self._remove_object(name)
+        return entry
+
+    def status(self, spec):
+        """산출물 상태 dict (file_manifest.FileManifest.artifact_status + 저장소 보관 여부)."""
+        status = self.manifest.artifact_status(spec.path)
+        status.update(name=spec.name, kind=spec.kind, description=spec.description)
+        status["stored"] = self.has_object(status.get("object"))
+        self.manifest.save()
+        return status
+
+    def verify(self, spec):
+        """stat 캐시를 쓰지 않고 산출물과 보관 객체를 처음부터 다시 해시해 검증합니다. 문제 목록을 반환합니다 (없으면 빈 리스트)."""
+        problems = []
+        status = self.manifest.artifact_status(spec.path)
+        if status["status"] == "not_exists":
+            return ["산출물이 존재하지 않습니다."]
+        if status["status"] == "no_cache_info":
+            problems.append("매니페스트에 기록이 없습니다.")
+        elif status["status"] != "valid":
+            problems.append(status["message"])
+        actual = _full_content_hash(spec.path)
+        object_name = status.get("object")
+        if object_name:
+            if not object_name.startswith(actual):
+                problems.append(f"산출물 내용이 기록된 객체와 다릅니다 (기록 {object_name[:8]}..., 현재 {actual[:8]}...)")
+            if not self.has_object(object_name):
+                problems.append(f"보관 객체가 없습니다: {object_name}")
+            elif not object_name.startswith(_full_content_hash(self.object_path(object_name))):
+                problems.append(f"보관 객체가 손상되었습니다: {object_name}")
+        if spec.kind == "dataset":
+            try:
+                with open(spec.path, 'r', encoding='utf-8') as f:
+                    json.load(f)
+            except ValueError as e:
+                problems.append(f"JSON 파싱 실패: {e}")
+        return problems
+
+    def referenced_objects(self):
+        """매니페스트가 참조하는 객체 이름 집합 (현재 객체 + 이전 세대)."""
+        referenced = set()
+        for entry in self.manifest.artifacts.values():
+            if entry.get("object"):
+                referenced.add(entry["object"])
+            referenced.update(entry.get("history", []))
+        return referenced
+
+    def gc(self, dry_run=False):
+        """매니페스트가 참조하지 않는 객체와 남은 임시 파일을 지웁니다. (삭제한 객체 이름 리스트, 확보한 바이트)를 반환합니다."""
+        objects_dir = os.path.join(self.root, "objects")
+        if not os.path.isdir(objects_dir):
+            return [], 0
+        referenced = self.referenced_objects()
+        removed = []
+        freed = 0
+        for prefix in sorted(os.listdir(objects_dir)):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for object_name in sorted(os.listdir(prefix_dir)):
+                if object_name in referenced:
+                    continue
+                freed += _path_size(os.path.join(prefix_dir, object_name))
+                removed.append(object_name)
+                if not dry_run:
+                    self._remove_object(object_name)
+        return removed, freed
+
+    def _remove_object(self, object_name):
+        """객체 하나를 지우고, 비게 된 접두사 디렉터리도 지웁니다."""
+        object_path = self.object_path(object_name)
+        try:
+            if os.path.isdir(object_path):
+                shutil.rmtree(object_path)
+            elif os.path.exists(object_path):
+                os.remove(object_path)
+            prefix_dir = os.path.dirname(object_path)
+            if not os.listdir(prefix_dir):
+                os.rmdir(prefix_dir)
+        except OSError as e:
+            print(f"보관 객체 삭제 실패 ({object_name}): {e}")
+
+def _object_suffix(path):
+    """객체 이름에 붙일 확장자 (.ivf.npz처럼 겹확장자는 마지막 두 개까지)."""
+    base = os.path.basename(os.path.normpath(path))
+    parts = base.split(".")
+    if len(parts) > 2 and len(parts[-2]) <= 4:
+        return "." + ".".join(parts[-2:])
+    return os.path.splitext(base)[1]
+
+def _full_content_hash(path):
+    """stat 캐시 없이 계산한 content_hash (verify용)."""
+    if not os.path.isdir(path):
+        return hash_file(path)
+    digest = hashlib.new(FINGERPRINT_HASH)
+    for relative in _directory_files(path):
+        digest.update(f"{relative}\x1f{hash_file(os.path.join(path, relative))}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+_default_store = None
+
+def get_default_store():
+    """프로세스 전역 산출물 저장소 (ARTIFACT_STORE_DIR, 전역 캐시 매니페스트 사용)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
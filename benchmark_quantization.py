@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+검색 행렬 압축 벤치마크
+float32 정확 검색을 기준으로 float16 / int8 압축 검색의 메모리, 재현율(recall@k), 지연시간을 비교합니다.
+쿼리는 문서 임베딩에 잡음을 더해 만들므로 API 호출이 없습니다.
+
+사용법: python benchmark_quantization.py [벡터DB 경로(.pkl 또는 .vdb)] [쿼리 수] [k]
+벡터DB 경로를 주지 않으면 합성 데이터(20000 × 768)로 측정합니다.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+# pickle이 __main__.SimpleVectorDB를 참조하는 경우를 위해 네임스페이스에 가져옴
+from rag_utils import SimpleVectorDB, load_vector_db
+from vector_index import QUANTIZATION_DTYPES, normalize_rows, top_k_indices
+
+SYNTHETIC_SHAPE = (20000, 768)
+QUERY_NOISE = 0.5
+# 파이썬 float 리스트로 보관할 때 원소당 대략적인 크기 (float 객체 24바이트 + 리스트 포인터 8바이트)
+PYTHON_FLOAT_LIST_BYTES = 32
+
+def _synthetic_matrix(rng):
+    """군집 구조가 있는 합성 임베딩 행렬을 만듭니다."""
+    n, dim = SYNTHETIC_SHAPE
+    centers = rng.standard_normal((int(np.sqrt(n)), dim)).astype(np.float32)
+    assignments = rng.integers(0, centers.shape[0], n)
+    return normalize_rows(centers[assignments] + 0.7 * rng.standard_normal((n, dim)).astype(np.float32))
+
+def _measure(vector_db, queries, truth, k):
+    """평균 recall@k와 쿼리당 평균 지연시간(ms)을 반환합니다."""
+    hits = 0
+    start = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        found, _ = vector_db.similarity_search_by_vector(query, k=k)
+        hits += len(set(found.tolist()) & expected)
+    elapsed = time.perf_counter() - start
+    return hits / (len(queries) * k), elapsed / len(queries) * 1000
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else None
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    rng = np.random.default_rng(0)
+
+    if db_path:
+        if not os.path.exists(db_path):
+            print(f"❌ 파일이 존재하지 않습니다: {db_path}")
+            return
+        matrix = np.ascontiguousarray(load_vector_db(db_path)._ensure_search_matrix(), dtype=np.float32)
+        print(f"벡터DB: {db_path}")
+    else:
+        matrix = _synthetic_matrix(rng)
+        print("합성 데이터 사용")
+    n, dim = matrix.shape
+    print(f"문서 {n}개, 차원 {dim}, 쿼리 {n_queries}개, k={k}")
+
+    picks = rng.choice(n, n_queries, replace=n_queries > n)
+    queries = normalize_rows(matrix[picks] + QUERY_NOISE / np.sqrt(dim) * rng.standard_normal((n_queries, dim)).astype(np.float32))
+    truth = [set(top_k_indices(matrix @ query, k).tolist()) for query in queries]
+
+    print(f"\n{'형식':<22}{'상주 메모리(MB)':>16}{'float32 대비':>14}{'recall@k':>10}{'지연(ms)':>10}")
+    print(f"{'python list (pickle)':<22}{n * dim * PYTHON_FLOAT_LIST_BYTES / 1e6:>16.1f}{PYTHON_FLOAT_LIST_BYTES / 4:>13.1f}x{'-':>10}{'-':>10}")
+    exact_db = SimpleVectorDB.from_matrix(list(range(n)), matrix)
+    recall, latency = _measure(exact_db, queries, truth, k)
+    print(f"{'float32':<22}{matrix.nbytes / 1e6:>16.1f}{1.0:>13.1f}x{recall:>10.4f}{latency:>10.2f}")
+    for dtype in QUANTIZATION_DTYPES:
+        for rescore in (False, True):
+            vector_db = SimpleVectorDB.from_matrix(list(range(n)), matrix)
+            quantized = vector_db.quantize(dtype, rescore=rescore)
+            recall, latency = _measure(vector_db, queries, truth, k)
+            label = f"{dtype}{' + rescore' if rescore else ''}"
+            print(f"{label:<22}{quantized.nbytes / 1e6:>16.1f}{quantized.nbytes / matrix.nbytes:>13.2f}x{recall:>10.4f}{latency:>10.2f}")
+    print("\n※ rescore는 후보 행만 정확 행렬에서 읽습니다. .vdb(메모리 맵)로 로드하면 정확 행렬은 상주 메모리에 포함되지 않습니다.")
+
+if __name__ == "__main__":
+    main()
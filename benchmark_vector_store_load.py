@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+벡터스토어 로드 시간 벤치마크
+SimpleVectorDB → LangChain 벡터스토어 변환에서, 예전 방식(문서마다 documents.index로 임베딩 위치를 찾음, O(n²))과
+공유 로더(extract_texts_and_vectors / vector_db_to_faiss, 선형 시간)의 로드 시간을 비교합니다.
+임베딩 API는 호출하지 않습니다 (FAISS가 설치되어 있으면 질문 임베딩용으로 FakeEmbeddings 사용).
+
+사용법: python benchmark_vector_store_load.py [벡터DB 경로(.pkl 또는 .vdb)]
+벡터DB 경로를 주지 않으면 여러 크기의 합성 벡터DB로 측정합니다.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+# pickle이 __main__.SimpleVectorDB를 참조하는 경우를 위해 네임스페이스에 가져옴
+from rag_utils import SimpleVectorDB, LANGGRAPH_AVAILABLE, load_vector_db, extract_texts_and_vectors, vector_db_to_faiss
+
+SYNTHETIC_SIZES = [1000, 5000, 20000]
+EMBEDDING_DIM = 768
+# 예전 방식은 O(n²)이라 이 크기를 넘으면 측정하지 않음
+LEGACY_MAX_DOCUMENTS = 20000
+
+def _synthetic_vector_db(n, rng):
+    documents = [{'page_content': f"청크 {i} 부산 생활 안내", 'metadata': {'page': i % 300}} for i in range(n)]
+    return SimpleVectorDB(documents, doc_embeddings=rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32))
+
+def _legacy_extract(vector_db):
+    """예전 LangGraphRAG.load_vector_store의 추출 루프 (비교용)."""
+    documents = []
+    embeddings_list = []
+    for doc in vector_db.documents:
+        if isinstance(doc, dict) and 'page_content' in doc:
+            documents.append(doc['page_content'])
+            doc_idx = vector_db.documents.index(doc)
+            if doc_idx < len(vector_db.doc_embeddings):
+                embeddings_list.append(vector_db.doc_embeddings[doc_idx])
+    return documents, embeddings_list
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def _fake_embeddings():
+    if not LANGGRAPH_AVAILABLE:
+        return None
+    from langchain_community.embeddings import FakeEmbeddings
+    return FakeEmbeddings(size=EMBEDDING_DIM)
+
+def main():
+    rng = np.random.default_rng(0)
+    if len(sys.argv) > 1:
+        if not os.path.exists(sys.argv[1]):
+            print(f"❌ 파일이 존재하지 않습니다: {sys.argv[1]}")
+            return
+        cases = [(sys.argv[1], load_vector_db(sys.argv[1]))]
+    else:
+        cases = [(f"합성 {n}개", _synthetic_vector_db(n, rng)) for n in SYNTHETIC_SIZES]
+
+    embeddings = _fake_embeddings()
+    if embeddings is None:
+        print("FAISS/LangChain이 설치되지 않아 추출 단계만 측정합니다.")
+    print(f"{'벡터DB':<20}{'문서 수':>8}{'예전 추출(s)':>14}{'공유 추출(s)':>14}{'FAISS 생성(s)':>15}")
+    for label, vector_db in cases:
+        n = len(vector_db.documents)
+        legacy = f"{_timed(_legacy_extract, vector_db):.3f}" if n <= LEGACY_MAX_DOCUMENTS else "생략"
+        shared = f"{_timed(extract_texts_and_vectors, vector_db):.3f}"
+        faiss_build = f"{_timed(vector_db_to_faiss, vector_db, embeddings):.3f}" if embeddings is not None else "-"
+        print(f"{label:<20}{n:>8}{legacy:>14}{shared:>14}{faiss_build:>15}")
+    print("\n※ 예전 rag_utils 로더(FAISS.from_texts)는 여기에 더해 모든 문서를 임베딩 API로 다시 계산했습니다.")
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,236 @@
 #!/usr/bin/env python3
 """
 캐시 관리 스크립트
-PDF 파일의 해시 기반 캐싱 시스템을 관리합니다.
+벡터DB, 파생 인덱스(ANN 인덱스, 메모리 맵 .vdb), JSON 데이터셋을 산출물(artifact)로 관리합니다.
+산출물마다 만들 때 쓴 소스의 해시를 캐시 매니페스트에 기록하고, 내용 해시로 산출물 저장소(.artifact_store)에 보관합니다.
 """
 
 import os
 import sys
+import time
+from artifact_store import ArtifactSpec, get_default_store, source_files
+from vector_index import ann_index_path_for
 from rag_utils import (
-    get_cache_status, 
-    force_rebuild_cache, 
     clear_cache,
+    mmap_dir_for,
+    load_vector_db,
+    migrate_legacy_cache_info,
+    rebuild_vector_db_artifact,
+    rebuild_ann_index_artifact,
+    rebuild_mmap_artifact,
+    vector_db_artifact_sources,
     PDF_PATH,
-    CHROMA_PATH
+    VECTOR_DB_PATH,
+    WASTE_INFO_JSON_PATH
 )
 
-def print_cache_status():
-    """캐시 상태를 출력합니다."""
+MULTICULTURAL_DB_PATH = "다문화.pkl"
+FOREIGN_WORKER_DB_PATH = "외국인근로자.pkl"
+
+# 관리 대상 산출물. 파생 산출물(parent가 있는 것)은 부모 뒤에 두어 rebuild stale이 부모부터 다시 만들게 함
+ARTIFACTS = [
+    ArtifactSpec("vector_db", VECTOR_DB_PATH, "vector_db", "단일 PDF 벡터DB", sources=[PDF_PATH]),
+    ArtifactSpec("multicultural", MULTICULTURAL_DB_PATH, "vector_db", "다문화가족 벡터DB"),
+    ArtifactSpec("foreign_worker", FOREIGN_WORKER_DB_PATH, "vector_db", "외국인 권리구제 벡터DB"),
+    ArtifactSpec("multicultural_vdb", mmap_dir_for(MULTICULTURAL_DB_PATH), "mmap", "다문화가족 벡터DB (메모리 맵)", parent="multicultural"),
+    ArtifactSpec("foreign_worker_vdb", mmap_dir_for(FOREIGN_WORKER_DB_PATH), "mmap", "외국인 권리구제 벡터DB (메모리 맵)", parent="foreign_worker"),
+    ArtifactSpec("multicultural_ann", ann_index_path_for(MULTICULTURAL_DB_PATH), "ann_index", "다문화가족 ANN 인덱스", parent="multicultural"),
+    ArtifactSpec("foreign_worker_ann", ann_index_path_for(FOREIGN_WORKER_DB_PATH), "ann_index", "외국인 권리구제 ANN 인덱스", parent="foreign_worker"),
+    ArtifactSpec("busan_food", "부산의맛(2025).json", "dataset", "부산의 맛 데이터"),
+    ArtifactSpec("taek_sulling", "택슐랭(2025).json", "dataset", "택슐랭 데이터"),
+    ArtifactSpec("jangmachul", "jangmachul.json", "dataset", "외국인 근로자 안전 정보 (장마철)"),
+    ArtifactSpec("onyul", "onyul.json", "dataset", "외국인 근로자 안전 정보 (온열질환)"),
+    ArtifactSpec("waste_info", WASTE_INFO_JSON_PATH, "dataset", "부산광역시 쓰레기 처리 정보"),
+    ArtifactSpec("mbti_recommendations", "mbti_recommendations.json", "dataset", "MBTI 관광 추천 데이터"),
+]
+ARTIFACTS_BY_NAME = {spec.name: spec for spec in ARTIFACTS}
+STALE_STATUSES = ("invalid", "modified", "no_cache_info")
+
+def _select(names):
+    """이름 목록을 ArtifactSpec 목록으로 바꿉니다 (비어 있으면 전체). 모르는 이름이 있으면 None."""
+    if not names:
+        return ARTIFACTS
+    unknown = [name for name in names if name not in ARTIFACTS_BY_NAME]
+    if unknown:
+        print(f"❌ 알 수 없는 산출물: {', '.join(unknown)}")
+        print(f"사용 가능한 산출물: {', '.join(ARTIFACTS_BY_NAME)}")
+        return None
+    return [ARTIFACTS_BY_NAME[name] for name in names]
+
+def _parent_path(spec):
+    return ARTIFACTS_BY_NAME[spec.parent].path
+
+def _status(spec, store):
+    """산출물 상태. 단일 PDF 벡터DB에 기록이 없으면 예전 cache_info.json의 PDF 해시를 먼저 옮겨 옵니다 (get_artifact_status와 같음)."""
+    status = store.status(spec)
+    if status['status'] == "no_cache_info" and spec.path == VECTOR_DB_PATH and migrate_legacy_cache_info(store.manifest):
+        status = store.status(spec)
+    return status
+
+def _record(spec, store):
+    """산출물을 현재 상태 그대로 저장소에 보관하고 소스 해시를 기록합니다 (다시 만들지 않음)."""
+    if spec.kind == "vector_db":
+        # 벡터DB 안의 소스 매니페스트 해시, 없으면 이전 기록(예전 cache_info.json 포함)의 소스 해시를 유지
+        # 둘 다 없으면 벡터DB 파일 자체의 지문 (현재 소스 해시로 기록하면 오래된 DB가 유효해 보임)
+        vector_db = load_vector_db(spec.path)
+        sources = {entry['path']: entry['hash'] for entry in vector_db.source_paths().values()}
+        if not sources:
+            sources = (store.manifest.artifacts.get(os.path.normpath(spec.path), {}).get("sources")
+                       or vector_db_artifact_sources(vector_db, spec.path))
+        return store.commit(spec.path, sources, chunk_count=len(vector_db.documents))
+    if spec.kind == "dataset":
+        # 데이터셋은 편집기가 제자리에서 고칠 수 있으므로 하드 링크 대신 복사해서 보관
+        return store.commit(spec.path, link=False)
+    return store.commit(spec.path, source_files(_parent_path(spec)))
+
+def print_cache_status(names=None):
+    """산출물 상태를 출력합니다. 소스가 바뀌지 않았으면 파일을 읽지 않고 stat만 확인합니다."""
+    specs = _select(names)
+    if specs is None:
+        return
+    store = get_default_store()
     print("=== 캐시 상태 확인 ===")
-    status = get_cache_status()
-    
-    print(f"PDF 파일 경로: {PDF_PATH}")
-    print(f"벡터DB 경로: {CHROMA_PATH}")
-    print(f"상태: {status['status']}")
-    print(f"메시지: {status['message']}")
-    
-    if 'current_hash' in status:
-        print(f"현재 파일 해시: {status['current_hash']}")
-        print(f"캐시된 파일 해시: {status['cached_hash']}")
-        print(f"청크 수: {status['chunk_count']}")
-        print(f"생성 시간: {status['created_at']}")
-        print(f"유효성: {'✅ 유효' if status['is_valid'] else '❌ 무효'}")
+    start = time.perf_counter()
+    statuses = [_status(spec, store) for spec in specs]
+    elapsed = time.perf_counter() - start
+    print(f"{'산출물':<22}{'종류':<11}{'상태':<15}{'보관':<6}경로")
+    for status in statuses:
+        print(f"{status['name']:<22}{status['kind']:<11}{status['status']:<15}{'✅' if status['stored'] else '-':<6}{status['path']}")
+        for path in status.get('changed_sources', []):
+            print(f"    - 변경된 소스: {path}")
+        for path in status.get('missing_sources', []):
+            print(f"    - 없는 소스: {path}")
+    stale = [status['name'] for status in statuses if status['status'] in STALE_STATUSES]
+    if stale:
+        print(f"\n다시 만들거나 기록이 필요한 산출물: {', '.join(stale)}")
+        print("  python cache_manager.py rebuild stale   (또는 rebuild <산출물>, 기록만 하려면 warm)")
+    print(f"\n(확인 시간: {elapsed * 1000:.1f}ms)")
+
+def verify_artifacts(names=None):
+    """stat 캐시 없이 산출물과 보관 객체를 다시 해시해 검증합니다. 문제가 없으면 True."""
+    specs = _select(names)
+    if specs is None:
+        return False
+    store = get_default_store()
+    ok = True
+    for spec in specs:
+        problems = store.verify(spec)
+        if problems == ["산출물이 존재하지 않습니다."]:
+            print(f"- {spec.name}: 없음 ({spec.path})")
+            continue
+        if problems:
+            ok = False
+            print(f"❌ {spec.name}: " + "; ".join(problems))
+        else:
+            print(f"✅ {spec.name}")
+    return ok
+
+def rebuild_artifacts(names, gemini_api_key):
+    """산출물을 다시 만듭니다. "stale"은 상태가 유효하지 않은 산출물 전체입니다."""
+    store = get_default_store()
+    only_stale = names == ["stale"]
+    specs = ARTIFACTS if only_stale else _select(names)
+    if specs is None:
+        return
+    for spec in specs:
+        # 부모를 다시 만들면 파생 산출물도 stale이 되므로 순서대로 그때그때 확인
+        if only_stale and _status(spec, store)['status'] not in STALE_STATUSES:
+            continue
+        print(f"\n=== {spec.name} 다시 만들기 ({spec.path}) ===")
+        try:
+            if spec.kind == "vector_db":
+                if not gemini_api_key:
+                    print("❌ 환경변수 GEMINI_API_KEY가 설정되어 있지 않습니다.")
+                    continue
+                rebuild_vector_db_artifact(spec.path, gemini_api_key, source_paths=spec.sources)
+            elif spec.kind == "mmap":
+                rebuild_mmap_artifact(_parent_path(spec))
+            elif spec.kind == "ann_index":
+                rebuild_ann_index_artifact(_parent_path(spec))
+            else:
+                if not os.path.exists(spec.path):
+                    print(f"❌ 원본 데이터가 없습니다: {spec.path}")
+                    continue
+                # 원본 데이터셋은 만들 방법이 없으므로 현재 내용을 기록만 함
+                _record(spec, store)
+                print("원본 데이터셋이므로 현재 내용을 기록했습니다.")
+            print(f"✅ {spec.name} 완료")
+        except Exception as e:
+            print(f"❌ {spec.name} 실패: {e}")
+
+def warm_artifacts(names=None):
+    """기록이 없거나 보관되지 않은 산출물을 현재 상태 그대로 기록/보관합니다. 이후 상태 확인은 stat만으로 끝납니다."""
+    specs = _select(names)
+    if specs is None:
+        return
+    store = get_default_store()
+    start = time.perf_counter()
+    for spec in specs:
+        status = _status(spec, store)
+        if status['status'] == "not_exists":
+            continue
+        if status['status'] != "no_cache_info" and status['stored']:
+            print(f"- {spec.name}: 이미 기록됨 ({status['status']})")
+            continue
+        try:
+            _record(spec, store)
+            print(f"✅ {spec.name}: 기록 완료")
+        except Exception as e:
+            print(f"❌ {spec.name}: 기록 실패 ({e})")
+    print(f"(소요 시간: {time.perf_counter() - start:.2f}초)")
+
+def gc_artifacts(dry_run=False):
+    """매니페스트가 참조하지 않는 보관 객체를 지웁니다."""
+    removed, freed = get_default_store().gc(dry_run=dry_run)
+    for object_name in removed:
+        print(f"- {object_name}")
+    action = "삭제 예정" if dry_run else "삭제"
+    print(f"✅ 객체 {len(removed)}개 {action} ({freed / 1e6:.1f}MB)")
 
 def main():
     if len(sys.argv) < 2:
         print("사용법:")
-        print("  python cache_manager.py status     - 캐시 상태 확인")
-        print("  python cache_manager.py rebuild    - 캐시 강제 재생성")
-        print("  python cache_manager.py clear      - 캐시 삭제")
+        print("  python cache_manager.py status [산출물...]    - 산출물 상태 확인 (stat만 확인)")
+        print("  python cache_manager.py verify [산출물...]    - 산출물/보관 객체를 다시 해시해 검증")
+        print("  python cache_manager.py rebuild <산출물...>   - 산출물 다시 만들기 (stale: 유효하지 않은 전체)")
+        print("  python cache_manager.py warm [산출물...]      - 현재 산출물을 기록/보관")
+        print("  python cache_manager.py gc [--dry-run]       - 참조되지 않는 보관 객체 삭제")
+        print("  python cache_manager.py clear                - 단일 PDF 벡터DB 삭제")
+        print(f"산출물: {', '.join(ARTIFACTS_BY_NAME)}")
         return
-    
+
     command = sys.argv[1].lower()
-    
+    args = sys.argv[2:]
+
     if command == "status":
-        print_cache_status()
-    
+        print_cache_status(args)
+
+    elif command == "verify":
+        if not verify_artifacts(args):
+            sys.exit(1)
+
     elif command == "rebuild":
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("❌ 환경변수 OPENAI_API_KEY가 설정되어 있지 않습니다.")
+        if not args:
+            print("❌ 다시 만들 산출물을 지정하세요 (예: rebuild multicultural, rebuild stale)")
             return
-        
-        print("캐시를 강제로 재생성합니다...")
-        try:
-            vector_db = force_rebuild_cache(api_key)
-            print("✅ 캐시 재생성 완료!")
-            print_cache_status()
-        except Exception as e:
-            print(f"❌ 캐시 재생성 실패: {e}")
-    
+        rebuild_artifacts(args, os.getenv("GEMINI_API_KEY"))
+        print_cache_status(None if args == ["stale"] else args)
+
+    elif command == "warm":
+        warm_artifacts(args)
+
+    elif command == "gc":
+        gc_artifacts(dry_run="--dry-run" in args)
+
     elif command == "clear":
         print("캐시를 삭제합니다...")
         clear_cache()
         print("✅ 캐시 삭제 완료!")
-        print_cache_status()
-    
+        print_cache_status(["vector_db"])
+
     else:
         print(f"❌ 알 수 없는 명령어: {command}")
-        print("사용 가능한 명령어: status, rebuild, clear")
+        print("사용 가능한 명령어: status, verify, rebuild, warm, gc, clear")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
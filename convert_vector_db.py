@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+벡터DB 변환 스크립트
+SimpleVectorDB pickle(.pkl)을 메모리 맵 디렉터리 포맷(.vdb)으로 변환합니다.
+"""
+
+import os
+import sys
+# pickle이 __main__.SimpleVectorDB를 참조하는 경우를 위해 네임스페이스에 가져옴
+from rag_utils import SimpleVectorDB, convert_pickle_to_mmap, mmap_dir_for
+
+DEFAULT_PKL_PATHS = ["다문화.pkl", "외국인근로자.pkl"]
+
+def main():
+    pkl_paths = sys.argv[1:] or DEFAULT_PKL_PATHS
+    for pkl_path in pkl_paths:
+        if not os.path.exists(pkl_path):
+            print(f"❌ 파일이 존재하지 않습니다: {pkl_path}")
+            continue
+        try:
+            convert_pickle_to_mmap(pkl_path, mmap_dir_for(pkl_path))
+        except Exception as e:
+            print(f"❌ 변환 실패 ({pkl_path}): {e}")
+
+if __name__ == "__main__":
+    main()
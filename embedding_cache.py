@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+임베딩 캐시
+질문(쿼리) 임베딩을 프로세스 내 LRU + TTL 캐시에 보관하고, 선택적으로 SQLite 디스크 계층에 저장합니다.
+문서(청크) 임베딩은 (모델, 텍스트 sha256)을 키로 하는 SQLite 캐시에 저장해 벡터DB 빌드 간에 재사용합니다.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+# 환경변수로 조정 가능한 기본 설정 (QUERY_CACHE_DB_PATH가 비어 있으면 디스크 계층 비활성화)
+QUERY_CACHE_MAX_SIZE = int(os.getenv("QUERY_CACHE_MAX_SIZE", "2048"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+QUERY_CACHE_DB_PATH = os.getenv("QUERY_CACHE_DB_PATH", "")
+
+def normalize_text(text):
+    """캐시 키용 텍스트 정규화 (유니코드 NFC + 공백 정리)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def _cache_key(model, task_type, text):
+    return hashlib.sha256(f"{model}\x1f{task_type}\x1f{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+class QueryEmbeddingCache:
+    """(모델, task_type, 정규화된 텍스트)를 키로 하는 스레드 안전 LRU + TTL 임베딩 캐시."""
+
+    def __init__(self, max_size=QUERY_CACHE_MAX_SIZE, ttl_seconds=QUERY_CACHE_TTL_SECONDS, db_path=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries = OrderedDict()  # key -> (저장 시각, float32 벡터)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_disk_tier(db_path)
+
+    def _open_disk_tier(self, db_path):
+        try:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, task_type TEXT, created_at REAL, embedding BLOB)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"쿼리 임베딩 디스크 캐시를 열 수 없습니다 ({db_path}): {e}")
+            self._conn = None
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, model, task_type, text):
+        """캐시된 임베딩(list)을 반환하고, 없거나 만료되었으면 None을 반환합니다."""
+        key = _cache_key(model, task_type, text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1].tolist()
+                del self._entries[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT created_at, embedding FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._is_expired(row[0], now):
+                    vector = np.frombuffer(row[1], dtype=np.float32)
+                    self._remember(key, row[0], vector)
+                    self.disk_hits += 1
+                    return vector.tolist()
+            self.misses += 1
+            return None
+
+    def put(self, model, task_type, text, embedding):
+        """임베딩을 메모리(및 디스크) 캐시에 저장합니다."""
+        key = _cache_key(model, task_type, text)
+        now = time.time()
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, now, vector)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?, ?)",
+                        (key, model, task_type, now, vector.tobytes())
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"쿼리 임베딩 디스크 캐시 저장 실패: {e}")
+
+    def _remember(self, key, created_at, vector):
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """적중/미스 통계를 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """메모리 캐시와 통계를 비웁니다 (디스크 계층은 유지)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+_default_query_cache = None
+_default_query_cache_lock = threading.Lock()
+
+def get_default_query_cache():
+    """프로세스 전체에서 공유하는 쿼리 임베딩 캐시를 반환합니다."""
+    global _default_query_cache
+    with _default_query_cache_lock:
+        if _default_query_cache is None:
+            _default_query_cache = QueryEmbeddingCache(db_path=QUERY_CACHE_DB_PATH or None)
+        return _default_query_cache
+
+# 문서 임베딩 영구 캐시 (모델 + 청크 텍스트 sha256 → 벡터). 모든 벡터DB 빌드 경로가 공유합니다.
+DOC_EMBEDDING_CACHE_PATH = os.getenv("DOC_EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+# 모델 정보가 없는 예전 벡터DB의 임베딩을 캐시에 넣을 때 차원을 검증하기 위한 값
+KNOWN_EMBEDDING_DIMS = {"models/embedding-001": 768}
+# SQLite 바인딩 변수 제한(999)보다 작게 조회
+_LOOKUP_CHUNK_SIZE = 500
+
+def text_hash(text):
+    """청크 텍스트의 sha256 (캐시 키)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class DocumentEmbeddingStore:
+    """(임베딩 모델, 청크 텍스트 sha256)을 키로 문서 임베딩을 저장하는 SQLite 캐시. 연결은 처음 사용할 때 엽니다."""
+
+    def __init__(self, db_path=DOC_EMBEDDING_CACHE_PATH):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_embeddings ("
+                "model TEXT, text_hash TEXT, dim INTEGER, embedding BLOB, PRIMARY KEY (model, text_hash))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, model, texts):
+        """텍스트 순서대로 캐시된 임베딩(list)을 반환합니다. 없는 항목은 None입니다."""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            unique_hashes = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique_hashes), _LOOKUP_CHUNK_SIZE):
+                chunk = unique_hashes[start:start + _LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, embedding FROM doc_embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + chunk
+                ).fetchall()
+                for row_hash, blob in rows:
+                    found[row_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return [found.get(h) for h in hashes]
+
+    def model_dim(self, model):
+        """캐시에 저장된 해당 모델의 임베딩 차원을 반환합니다 (없으면 None)."""
+        with self._lock:
+            row = self._connection().execute("SELECT dim FROM doc_embeddings WHERE model = ? LIMIT 1", (model,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, model, texts, embeddings):
+        """임베딩들을 저장합니다. 이미 저장된 차원과 다른 벡터는 저장하지 않고 저장한 개수를 반환합니다."""
+        expected_dim = self.model_dim(model) or KNOWN_EMBEDDING_DIMS.get(model)
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            vector = np.asarray(embedding, dtype=np.float32)
+            if expected_dim is None:
+                expected_dim = vector.shape[0]
+            if vector.shape[0] != expected_dim:
+                continue
+            rows.append((model, text_hash(text), int(vector.shape[0]), vector.tobytes()))
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO doc_embeddings VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+    def count(self, model=None):
+        """저장된 임베딩 수를 반환합니다."""
+        with self._lock:
+            conn = self._connection()
+            if model is None:
+                return conn.execute("SELECT COUNT(*) FROM doc_embeddings").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM doc_embeddings WHERE model = ?", (model,)).fetchone()[0]
+
+_default_document_store = None
+
+def get_default_document_store():
+    """프로세스 전체에서 공유하는 문서 임베딩 캐시를 반환합니다."""
+    global _default_document_store
+    with _default_query_cache_lock:
+        if _default_document_store is None:
+            _default_document_store = DocumentEmbeddingStore()
+        return _default_document_store
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+파일 지문(fingerprint) 매니페스트
+소스 파일마다 (크기, mtime_ns, 내용 해시)를 기록해 두고, 크기와 mtime_ns가 그대로면 파일을 읽지 않고 기록된 해시를 씁니다.
+벡터DB 같은 산출물(artifact)은 만들 때 사용한 소스 해시와 함께 기록하여, 상태 확인이 stat 호출만으로 끝나게 합니다.
+"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 저장
+    fcntl = None
+
+CACHE_MANIFEST_PATH = os.getenv("CACHE_MANIFEST_PATH", "cache_manifest.json")
+MANIFEST_VERSION = 1
+# 내용 해시 알고리즘. 기존 cache_info.json과 벡터DB 소스 매니페스트에 기록된 MD5와 호환되도록 MD5를 사용
+FINGERPRINT_HASH = "md5"
+# 파일을 읽는 버퍼 크기와, 이 크기 이상이면 mmap으로 한 번에 해시
+FINGERPRINT_READ_SIZE = 1 << 20
+FINGERPRINT_MMAP_MIN_SIZE = 16 << 20
+# 산출물마다 기억해 두는 이전 객체(artifact_store 객체 이름) 수
+ARTIFACT_HISTORY_SIZE = 2
+
+def hash_file(file_path):
+    """파일 내용 해시(hex)를 계산합니다. 큰 파일은 mmap, 나머지는 1MB 단위로 읽습니다."""
+    digest = hashlib.new(FINGERPRINT_HASH)
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= FINGERPRINT_MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            buffer = bytearray(FINGERPRINT_READ_SIZE)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+    return digest.hexdigest()
+
+def _manifest_key(path):
+    return os.path.normpath(path)
+
+class FileManifest:
+    """JSON 파일에 저장되는 파일 지문/산출물 매니페스트. 스레드 안전하며, 바뀐 내용이 있을 때만 저장합니다.
+
+    files: {경로: {"size", "mtime_ns", "hash"}}
+    artifacts: {경로: {"size", "mtime_ns", "sources": {소스 경로: 해시}, "recorded_at", "object", "history", ...부가 정보}}
+    """
+
+    def __init__(self, path=CACHE_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # 저장하지 않은 변경 (저장할 때 디스크의 최신 내용에 이 항목만 덮어씀)
+        self._dirty_files = set()
+        self._dirty_artifacts = set()
+        self.files, self.artifacts = self._read()
+
+    def _read(self):
+        """디스크의 매니페스트를 (files, artifacts)로 읽습니다. 없거나 읽을 수 없으면 빈 dict."""
+        if not os.path.exists(self.path):
+            return {}, {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION and data.get("hash") == FINGERPRINT_HASH:
+                return data.get("files", {}), data.get("artifacts", {})
+        except (OSError, ValueError) as e:
+            print(f"캐시 매니페스트를 읽지 못해 새로 만듭니다 ({self.path}): {e}")
+        return {}, {}
+
+    def fingerprint(self, file_path):
+        """파일의 {"size", "mtime_ns", "hash"}를 반환합니다. 파일이 없으면 None.
+
+        크기와 mtime_ns가 기록과 같으면 파일을 읽지 않고, 다를 때만 해시를 다시 계산해 기록합니다.
+        """
+        key = _manifest_key(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.files.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": hash_file(file_path)}
+        with self._lock:
+            self.files[key] = entry
+            self._dirty_files.add(key)
+        return entry
+
+    def file_hash(self, file_path):
+        """파일 내용 해시. 파일이 없으면 None."""
+        entry = self.fingerprint(file_path)
+        return entry["hash"] if entry else None
+
+    def record_artifact(self, artifact_path, sources=None, **info):
+        """산출물을 만든 소스들의 해시({소스 경로: 해시}, 생략하면 현재 해시)와 산출물의 stat을 기록합니다."""
+        try:
+            stat = os.stat(_artifact_stat_path(artifact_path))
+        except OSError:
+            return None
+        if sources is None:
+            sources = {}
+        elif not isinstance(sources, dict):
+            sources = {path: self.file_hash(path) for path in sources}
+        entry = dict(info)
+        entry.update({
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sources": {_manifest_key(path): file_hash for path, file_hash in sources.items()},
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        key = _manifest_key(artifact_path)
+        with self._lock:
+            # 저장소 객체가 바뀌면 이전 객체를 history에 남김 (artifact_store.gc가 보존)
+            previous = self.artifacts.get(key) or {}
+            history = list(previous.get("history", []))
+            if previous.get("object") and previous.get("object") != entry.get("object"):
+                history.insert(0, previous["object"])
+            if history:
+                entry["history"] = [name for name in history if name != entry.get("object")][:ARTIFACT_HISTORY_SIZE]
+            self.artifacts[key] = entry
+            self._dirty_artifacts.add(key)
+        return entry
+
+    def ensure_artifact(self, artifact_path, sources=None, **info):
+        """산출물 기록이 없거나 기록 이후 산출물이 바뀌었을 때만 record_artifact를 호출합니다."""
+        try:
+            stat = os.stat(_artifact_stat_path(artifact_path))
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.artifacts.get(_manifest_key(artifact_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        return self.record_artifact(artifact_path, sources, **info)
+
+    def artifact_status(self, artifact_path):
+        """산출물 상태를 반환합니다.
+
+        status: "not_exists"(산출물 없음), "no_cache_info"(기록 없음), "modified"(기록 이후 산출물이 다른 곳에서 바뀜),
+        "invalid"(소스가 바뀌거나 사라짐), "valid"
+        """
+        key = _manifest_key(artifact_path)
+        status = {"path": key}
+        try:
+            stat = os.stat(_artifact_stat_path(artifact_path))
+        except OSError:
+            return dict(status, status="not_exists", message="산출물이 존재하지 않습니다.", is_valid=False)
+        status.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        with self._lock:
+            entry = self.artifacts.get(key)
+        if entry is None:
+            return dict(status, status="no_cache_info", message="캐시 정보가 없습니다.", is_valid=False)
+        status.update({name: value for name, value in entry.items() if name not in ("size", "mtime_ns", "sources")})
+        status["source_count"] = len(entry["sources"])
+        changed = []
+        missing = []
+        for source_path, recorded_hash in entry["sources"].items():
+            current = self.fingerprint(source_path)
+            if current is None:
+                missing.append(source_path)
+            elif current["hash"] != recorded_hash:
+                changed.append(source_path)
+        status.update(changed_sources=changed, missing_sources=missing)
+        if changed or missing:
+            return dict(status, status="invalid", message=f"소스 변경 {len(changed)}개, 누락 {len(missing)}개", is_valid=False)
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return dict(status, status="modified", message="기록 이후 산출물이 다시 저장되었습니다.", is_valid=False)
+        return dict(status, status="valid", message="캐시가 유효합니다.", is_valid=True)
+
+    def save(self):
+        """바뀐 항목이 있으면 매니페스트를 저장합니다.
+
+        여러 프로세스가 같은 매니페스트를 쓰므로, 파일 잠금 안에서 디스크의 최신 내용을 다시 읽어 바뀐 항목만 덮어쓰고
+        프로세스마다 다른 임시 파일에 쓴 뒤 교체합니다.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty_files and not self._dirty_artifacts:
+                    return False
+                files = {key: self.files[key] for key in self._dirty_files}
+                artifacts = {key: self.artifacts[key] for key in self._dirty_artifacts}
+                self._dirty_files.clear()
+                self._dirty_artifacts.clear()
+            with _interprocess_lock(self.path + ".lock"):
+                disk_files, disk_artifacts = self._read()
+                disk_files.update(files)
+                disk_artifacts.update(artifacts)
+                data = {
+                    "version": MANIFEST_VERSION,
+                    "hash": FINGERPRINT_HASH,
+                    "files": disk_files,
+                    "artifacts": disk_artifacts,
+                }
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, ensure_ascii=False, indent=2)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+            # 다른 프로세스가 기록한 항목도 메모리에 반영 (그 사이 이 프로세스에서 바뀐 항목은 유지)
+            with self._lock:
+                for key, entry in disk_files.items():
+                    if key not in self._dirty_files:
+                        self.files[key] = entry
+                for key, entry in disk_artifacts.items():
+                    if key not in self._dirty_artifacts:
+                        self.artifacts[key] = entry
+            return True
+
+@contextmanager
+def _interprocess_lock(lock_path):
+    """다른 프로세스와의 동시 저장을 막는 파일 잠금 (fcntl이 없는 환경에서는 잠그지 않음)."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _artifact_stat_path(artifact_path):
+    """산출물의 버전을 대표하는 파일 (.vdb 같은 디렉터리 산출물은 meta.json)."""
+    if os.path.isdir(artifact_path):
+        return os.path.join(artifact_path, "meta.json")
+    return artifact_path
+
+_default_manifest = None
+_default_manifest_lock = threading.Lock()
+
+def get_default_manifest():
+    """프로세스 전역 매니페스트 (CACHE_MANIFEST_PATH)."""
+    global _default_manifest
+    with _default_manifest_lock:
+        if _default_manifest is None:
+            _default_manifest = FileManifest()
+        return _default_manifest
@@ -1,6 +1,5 @@
 import os
 import json
-import pickle
 import numpy as np
 from typing import Dict, List, Any, Optional
 from langgraph.graph import StateGraph, END
@@ -11,11 +10,13 @@ from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.outputs import ChatResult, ChatGeneration
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 import google.generativeai as genai
 from pydantic import Field
+from rag_utils import load_vector_db, vector_db_to_faiss
+from token_chunker import pack_context
+from llm_client import OllamaClient
 
 class ChatOllamaCloud(BaseChatModel):
     model_name: str = "gemma4:31b-cloud"
@@ -39,26 +40,8 @@ class ChatOllamaCloud(BaseChatModel):
                 role = "user"
             ollama_messages.append({"role": role, "content": msg.content})
             
-        import requests
-        url = "https://ollama.com/api/chat"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model_name,
-            "messages": ollama_messages,
-            "stream": False,
-            "options": {
-                "temperature": self.temperature
-            }
-        }
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=60)
-        response.raise_for_status()
-        res_json = response.json()
-        content = res_json.get("message", {}).get("content", "")
+        content = OllamaClient(self.api_key, self.model_name).chat(
+            ollama_messages, temperature=self.temperature, timeout=60, label="Ollama LangGraph")
         
         ai_message = AIMessage(content=content)
         generation = ChatGeneration(message=ai_message)
@@ -90,40 +73,12 @@ class LangGraphRAG:
         self.vector_store = None
         self.conversation_memory = []
         
-    def load_vector_store(self, vector_db_path: str):
-        """기존 벡터DB를 LangChain 벡터스토어로 변환"""
+    def load_vector_store(self, vector_db_path):
+        """기존 벡터DB(경로 또는 SimpleVectorDB 객체)를 LangChain 벡터스토어로 변환 (저장된 임베딩 재사용)"""
         try:
-            with open(vector_db_path, 'rb') as f:
-                vector_db = pickle.load(f)
-            
-            # 문서와 임베딩 추출
-            documents = []
-            embeddings_list = []
-            
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'page_content' in doc:
-                    documents.append(doc['page_content'])
-                    if hasattr(vector_db, 'doc_embeddings') and vector_db.doc_embeddings:
-                        # 기존 임베딩이 있으면 사용
-                        doc_idx = vector_db.documents.index(doc)
-                        if doc_idx < len(vector_db.doc_embeddings):
-                            embeddings_list.append(vector_db.doc_embeddings[doc_idx])
-            
-            # FAISS 벡터스토어 생성
-            if embeddings_list:
-                self.vector_store = FAISS.from_embeddings(
-                    embeddings_list, 
-                    documents, 
-                    self.embeddings
-                )
-            else:
-                # 임베딩이 없으면 새로 생성
-                self.vector_store = FAISS.from_texts(
-                    documents, 
-                    self.embeddings
-                )
-            
-            print(f"벡터스토어 로드 완료: {len(documents)}개 문서")
+            vector_db = load_vector_db(vector_db_path) if isinstance(vector_db_path, str) else vector_db_path
+            self.vector_store = vector_db_to_faiss(vector_db, self.embeddings)
+            print(f"벡터스토어 로드 완료: {len(self.vector_store.index_to_docstore_id)}개 문서")
             return True
             
         except Exception as e:
@@ -141,7 +96,7 @@ class LangGraphRAG:
             
             if self.vector_store:
                 docs = self.vector_store.similarity_search(query, k=k)
-                context = "\n\n".join([doc.page_content for doc in docs])
+                context = pack_context(docs)
                 return {"context": context, "documents": docs}
             else:
                 return {"context": "", "documents": []}
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+공유 LLM(Ollama Cloud) HTTP 클라이언트
+모든 Ollama 채팅 호출이 keep-alive 연결 풀을 가진 하나의 requests.Session을 같이 써서, 호출마다 TCP/TLS 연결을 새로 맺지 않습니다.
+호출별 타임아웃, 지터(jitter)를 넣은 지수 백오프 재시도, 한 가지 예외 계층(LLMError)을 제공합니다.
+stream_tokens() 안에서 일어나는 호출은 스트리밍 모드로 바뀌어, 생성 중인 답변을 토큰이 도착할 때마다 콜백으로 전달합니다.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+OLLAMA_CHAT_URL = os.getenv("OLLAMA_CHAT_URL", "https://ollama.com/api/chat")
+DEFAULT_OLLAMA_MODEL = "gemma4:31b-cloud"
+# 연결 타임아웃(초)과 기본 응답 대기 타임아웃(초)
+CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 90
+# 재시도: 최대 시도 횟수, 백오프 기본값/상한(초). 대기 시간은 0 ~ min(상한, 기본값 × 2^시도) 사이의 임의 값
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 8.0
+# 연결 풀 크기 (동시에 유지할 keep-alive 연결 수)
+POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "16"))
+# 재시도할 HTTP 상태 코드
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+class LLMError(Exception):
+    """LLM 호출 실패. retryable은 같은 요청을 다시 보내면 성공할 수 있는 오류인지 나타냅니다."""
+
+    retryable = False
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LLMConfigError(LLMError, ValueError):
+    """API 키가 없는 등 설정 오류 (예전 코드와의 호환을 위해 ValueError이기도 함)."""
+
+class LLMTimeoutError(LLMError):
+    retryable = True
+
+class LLMConnectionError(LLMError):
+    retryable = True
+
+class LLMHTTPError(LLMError):
+    """HTTP 오류 응답. 429/5xx 등 RETRY_STATUS_CODES만 재시도합니다."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message, status_code)
+        self.retryable = status_code in RETRY_STATUS_CODES
+
+class LLMResponseError(LLMError):
+    """응답 본문이 JSON이 아니거나 (allow_empty=False일 때) 내용이 비어 있음."""
+
+    retryable = True
+
+# 스레드별 스트리밍 콜백 (stream_tokens 참고)
+_stream_state = threading.local()
+
+@contextmanager
+def stream_tokens(on_text):
+    """이 블록 안에서 현재 스레드가 하는 LLM 호출을 스트리밍 모드로 바꿉니다.
+
+    토큰이 도착할 때마다 on_text(지금까지 생성된 텍스트)를 호출합니다. 한 번의 답변 생성에서 LLM을 여러 번 호출하면
+    호출마다 빈 텍스트부터 다시 전달되므로, 화면에는 항상 현재 생성 중인 답변이 보입니다.
+    RAG 답변 함수처럼 LLM 호출이 깊숙이 있는 코드도 인자를 바꾸지 않고 스트리밍할 수 있습니다.
+    """
+    previous = getattr(_stream_state, "on_text", None)
+    _stream_state.on_text = on_text
+    try:
+        yield
+    finally:
+        _stream_state.on_text = previous
+
+def current_stream_callback():
+    """현재 스레드에 설정된 스트리밍 콜백 (없으면 None)."""
+    return getattr(_stream_state, "on_text", None)
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """모든 LLM 호출이 공유하는 requests.Session (keep-alive 연결 풀)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _backoff_delay(attempt, retry_after=None):
+    """attempt번째 실패 후 대기 시간 (full jitter). 서버가 Retry-After를 주면 상한 안에서 그 값을 따릅니다."""
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class OllamaClient:
+    """Ollama Cloud 채팅 API 클라이언트. 인스턴스마다 API 키/모델이 다를 수 있지만 연결 풀은 모두 공유합니다."""
+
+    def __init__(self, api_key=None, model=None, url=OLLAMA_CHAT_URL):
+        self.api_key = api_key
+        self.model = model or DEFAULT_OLLAMA_MODEL
+        self.url = url
+
+    def chat(self, messages, temperature=0.3, timeout=DEFAULT_READ_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+             allow_empty=True, options=None, label="Ollama", stream=None):
+        """채팅 메시지 리스트([{"role", "content"}])를 보내고 응답 내용을 반환합니다.
+
+        재시도할 수 있는 오류(타임아웃, 연결 오류, 429/5xx, 빈 응답)는 지터를 넣은 백오프 후 다시 시도하고,
+        끝내 실패하면 마지막 LLMError를 던집니다.
+        stream: None이면 stream_tokens() 블록 안에서만 스트리밍, False면 항상 한 번에 받음,
+        호출 가능한 값이면 그 값을 콜백으로 스트리밍. 스트리밍해도 반환값은 전체 응답 내용입니다.
+        """
+        if not self.api_key:
+            raise LLMConfigError("Ollama Cloud API Key (OLLAMA_API_KEY) is missing. Gemini LLM is disabled.")
+        on_text = current_stream_callback() if stream is None else (stream or None)
+        payload, headers = self._request(messages, temperature, options, stream=on_text is not None)
+        for attempt in range(max_attempts):
+            try:
+                if on_text is not None:
+                    return self._post_stream(payload, headers, timeout, allow_empty, on_text)
+                return self._post(payload, headers, timeout, allow_empty)
+            except LLMError as e:
+                if not e.retryable or attempt == max_attempts - 1:
+                    print(f"[{label} 호출 오류] {e}")
+                    raise
+                delay = _backoff_delay(attempt, getattr(e, "retry_after", None))
+                print(f"[{label} 호출 오류] 시도 {attempt + 1}/{max_attempts} 실패, {delay:.1f}초 후 재시도: {e}")
+                time.sleep(delay)
+
+    def stream_chat(self, messages, temperature=0.3, timeout=DEFAULT_READ_TIMEOUT, options=None):
+        """응답 토큰(내용 조각)을 도착하는 대로 내보내는 제너레이터. 재시도하지 않습니다 (재시도가 필요하면 chat(stream=콜백))."""
+        if not self.api_key:
+            raise LLMConfigError("Ollama Cloud API Key (OLLAMA_API_KEY) is missing. Gemini LLM is disabled.")
+        payload, headers = self._request(messages, temperature, options, stream=True)
+        yield from self._iter_stream(payload, headers, timeout)
+
+    def generate(self, prompt, system_instruction=None, **kwargs):
+        """프롬프트 하나(와 선택적 시스템 지시문)로 chat을 호출합니다."""
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        return self.chat(messages, **kwargs)
+
+    def _request(self, messages, temperature, options, stream):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "options": dict(options or {}, temperature=temperature),
+        }
+        return payload, {"Authorization": f"Bearer {self.api_key}"}
+
+    def _post(self, payload, headers, timeout, allow_empty):
+        """요청 한 번을 보내고 응답 내용을 반환합니다."""
+        response = self._open(payload, headers, timeout)
+        try:
+            content = (response.json().get("message") or {}).get("content") or ""
+        except ValueError as e:
+            raise LLMResponseError(f"JSON이 아닌 응답: {response.text[:200]}") from e
+        content = content.strip()
+        if not content and not allow_empty:
+            raise LLMResponseError("빈 응답")
+        return content
+
+    def _open(self, payload, headers, timeout, stream=False):
+        """요청을 보내고 응답 객체를 반환합니다. requests 예외와 HTTP 오류 응답은 LLMError로 바꿉니다."""
+        try:
+            response = get_session().post(self.url, json=payload, headers=headers,
+                                          timeout=(CONNECT_TIMEOUT, timeout), stream=stream)
+        except requests.exceptions.Timeout as e:
+            raise LLMTimeoutError(f"응답 시간 초과 ({timeout}초): {e}") from e
+        except requests.exceptions.ConnectionError as e:
+            raise LLMConnectionError(f"연결 오류: {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise LLMError(f"요청 오류: {e}") from e
+        if response.status_code >= 400:
+            error = LLMHTTPError(f"HTTP {response.status_code}: {response.text[:200]}", status_code=response.status_code)
+            error.retry_after = _retry_after_seconds(response)
+            response.close()
+            raise error
+        return response
+
+    def _iter_stream(self, payload, headers, timeout):
+        """스트리밍 응답(한 줄에 JSON 하나, NDJSON)의 내용 조각을 내보냅니다. timeout은 조각 사이의 최대 대기 시간입니다."""
+        response = self._open(payload, headers, timeout, stream=True)
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError as e:
+                    raise LLMResponseError(f"JSON이 아닌 스트림 응답: {line[:200]!r}") from e
+                if chunk.get("error"):
+                    raise LLMResponseError(f"스트림 오류: {chunk['error']}")
+                piece = (chunk.get("message") or {}).get("content")
+                if piece:
+                    yield piece
+                if chunk.get("done"):
+                    break
+        except requests.exceptions.Timeout as e:
+            raise LLMTimeoutError(f"스트림 응답 시간 초과 ({timeout}초): {e}") from e
+        except requests.exceptions.RequestException as e:
+            raise LLMConnectionError(f"스트림 연결 오류: {e}") from e
+        finally:
+            response.close()
+
+    def _post_stream(self, payload, headers, timeout, allow_empty, on_text):
+        """스트리밍 요청 한 번을 보내고, 조각이 올 때마다 on_text(누적 텍스트)를 호출한 뒤 전체 내용을 반환합니다.
+
+        이미 화면에 일부가 나간 뒤의 실패는 처음부터 다시 보내면 내용이 바뀌므로 재시도하지 않습니다.
+        """
+        text = ""
+        try:
+            for piece in self._iter_stream(payload, headers, timeout):
+                text += piece
+                try:
+                    on_text(text)
+                except Exception as e:
+                    # 화면 갱신 실패가 답변 생성을 멈추지 않도록 함
+                    print(f"[스트리밍 콜백 오류] {e}")
+        except LLMError as e:
+            if text:
+                e.retryable = False
+            raise
+        content = text.strip()
+        if not content and not allow_empty:
+            raise LLMResponseError("빈 응답")
+        return content
+
+def get_default_client():
+    """config의 OLLAMA_API_KEY / OLLAMA_MODEL_NAME을 쓰는 클라이언트. 설정을 호출 시점에 읽습니다."""
+    # config 임포트를 지연 로딩(lazy import)하여 순환 참조 방지
+    from config import OLLAMA_API_KEY, OLLAMA_MODEL_NAME
+    return OllamaClient(OLLAMA_API_KEY, OLLAMA_MODEL_NAME)
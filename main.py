@@ -1,5 +1,4 @@
 import os
-import pickle
 import shutil
 
 # 환경변수에서 firebase_key.json 내용을 읽어서 파일로 저장
@@ -27,7 +26,7 @@ from pages.nationality_select import NationalitySelectPage
 from pages.home import HomePage
 from pages.create_room import CreateRoomPage
 from pages.room_list import RoomListPage
-from pages.chat_room import ChatRoomPage
+from pages.chat_room import ChatRoomPage, get_room_metadata
 from pages.foreign_country_select import ForeignCountrySelectPage
 from pages.mbti_tourism import MBTITourismPage
 import openai
@@ -38,13 +37,17 @@ import io
 import base64
 import geocoder
 import time
+import json
+import threading
 import firebase_admin
 from firebase_admin import credentials, db
 from rag_utils import get_or_create_vector_db, answer_with_rag, answer_with_rag_foreign_worker, answer_with_rag_busan_food, answer_with_busan_food_json
-from rag_utils import SimpleVectorDB, GeminiEmbeddings, answer_with_langgraph_rag
+from rag_utils import SimpleVectorDB, answer_with_langgraph_rag
 from rag_utils import is_waste_related_query, extract_district_from_query, get_waste_info_from_json, get_district_selection_prompt
 from rag_utils import is_alien_registration_related_query, get_detailed_alien_registration_guide, translate_waste_text
 from rag_utils import foreign_worker_rag_answer
+from rag_utils import load_vector_db, resolve_vector_db_path, vector_db_version
+from resource_registry import ResourceRegistry
 
 
 IS_SERVER = os.environ.get("CLOUDTYPE") == "1"  # Cloudtype 환경변수 등으로 구분
@@ -56,42 +59,53 @@ BASE_URL = "https://port-0-buchat-m0t1itev3f2879ad.sel4.cloudtype.app"
 RAG_ROOM_ID = "rag_korean_guide"
 RAG_ROOM_TITLE = "다문화가족 한국생활안내"
 
+# 무거운 리소스(Firebase, 벡터DB, JSON 데이터)는 import 시점이 아니라 처음 사용할 때 로드
+# RESOURCE_PREWARM: 백그라운드로 미리 로드할 리소스 이름 (쉼표 구분, "all"이면 전부, 비우면 사용 안 함)
+RESOURCE_PREWARM = os.getenv("RESOURCE_PREWARM", "")
+resources = ResourceRegistry()
+
 # --- Firebase 초기화 ---
-FIREBASE_AVAILABLE = False
-try:
-    print(f"Firebase 초기화 시도...")
-    print(f"FIREBASE_DB_URL: {FIREBASE_DB_URL}")
-    print(f"FIREBASE_KEY_PATH: {FIREBASE_KEY_PATH}")
-    
-    if not FIREBASE_DB_URL or FIREBASE_DB_URL == "None":
-        print("FIREBASE_DB_URL이 설정되지 않았습니다.")
-        raise Exception("FIREBASE_DB_URL is not set")
-    
-    if not os.path.exists(FIREBASE_KEY_PATH):
-        print(f"Firebase 키 파일이 존재하지 않습니다: {FIREBASE_KEY_PATH}")
-        raise Exception(f"Firebase key file not found: {FIREBASE_KEY_PATH}")
-    
-    cred = credentials.Certificate(FIREBASE_KEY_PATH)
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': FIREBASE_DB_URL
-    })
-    FIREBASE_AVAILABLE = True
-    print("Firebase 초기화 성공")
-except Exception as e:
-    print(f"Firebase 초기화 실패: {e}")
-    print("Firebase 기능이 비활성화됩니다. 채팅방 생성 및 메시지 저장이 불가능합니다.")
-    FIREBASE_AVAILABLE = False
+def _init_firebase():
+    """Firebase 앱을 초기화하고 사용 가능 여부를 반환합니다."""
+    try:
+        print(f"Firebase 초기화 시도...")
+        print(f"FIREBASE_DB_URL: {FIREBASE_DB_URL}")
+        print(f"FIREBASE_KEY_PATH: {FIREBASE_KEY_PATH}")
+        
+        if not FIREBASE_DB_URL or FIREBASE_DB_URL == "None":
+            print("FIREBASE_DB_URL이 설정되지 않았습니다.")
+            raise Exception("FIREBASE_DB_URL is not set")
+        
+        if not os.path.exists(FIREBASE_KEY_PATH):
+            print(f"Firebase 키 파일이 존재하지 않습니다: {FIREBASE_KEY_PATH}")
+            raise Exception(f"Firebase key file not found: {FIREBASE_KEY_PATH}")
+        
+        cred = credentials.Certificate(FIREBASE_KEY_PATH)
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': FIREBASE_DB_URL
+        })
+        print("Firebase 초기화 성공")
+        return True
+    except Exception as e:
+        print(f"Firebase 초기화 실패: {e}")
+        print("Firebase 기능이 비활성화됩니다. 채팅방 생성 및 메시지 저장이 불가능합니다.")
+        return False
+
+resources.register("firebase", _init_firebase)
+
+def firebase_available():
+    """Firebase 사용 가능 여부 (처음 호출할 때 초기화)."""
+    return resources.get("firebase")
 
 # OpenAI 관련 client = openai.OpenAI(api_key=OPENAI_API_KEY) 제거
 
 # RAG용 벡터DB 준비 (무조건 병합본만 사용)
-print("RAG 벡터DB 준비 중...")
+# convert_vector_db.py로 만든 .vdb 디렉터리가 있으면 메모리 맵으로 로드 (없으면 pickle)
 VECTOR_DB_MERGED_PATH = "다문화.pkl"
 VECTOR_DB_FOREIGN_WORKER_PATH = "외국인근로자.pkl"
-VECTOR_DB_BUSAN_FOOD_PATH = "부산의맛.pkl"
-vector_db_multicultural = None
-vector_db_foreign_worker = None
-vector_db_busan_food = None
+# 검색 행렬 압축: "" (사용 안 함), "float16", "int8". 압축 시 후보는 정확 행렬로 다시 점수화 (VECTOR_DB_RESCORE=0이면 생략)
+VECTOR_DB_QUANTIZATION = os.getenv("VECTOR_DB_QUANTIZATION", "")
+VECTOR_DB_RESCORE = os.getenv("VECTOR_DB_RESCORE", "1") != "0"
 
 # 부산 맛집 JSON 파일 경로
 BUSAN_FOOD_JSON_PATH = "부산의맛(2025).json"
@@ -100,105 +114,99 @@ TAEK_SULLING_JSON_PATH = "택슐랭(2025).json"
 # 외국인 근로자 안전 관련 JSON 파일 경로
 JANGMACHUL_JSON_PATH = "jangmachul.json"
 ONYUL_JSON_PATH = "onyul.json"
-busan_food_json_data = None
-taek_sulling_json_data = None
-jangmachul_json_data = None
-onyul_json_data = None
 
-# 다문화가족 한국생활안내 벡터DB 로드
-try:
-    if os.path.exists(VECTOR_DB_MERGED_PATH):
-        print("다문화가족 벡터DB 파일을 로드합니다...")
-        print(f"벡터DB 파일 크기: {os.path.getsize(VECTOR_DB_MERGED_PATH)} bytes")
-        with open(VECTOR_DB_MERGED_PATH, "rb") as f:
-            vector_db_multicultural = pickle.load(f)
-        print(f"벡터DB 로드 완료. 문서 수: {len(vector_db_multicultural.documents) if hasattr(vector_db_multicultural, 'documents') else '알 수 없음'}")
-        vector_db_multicultural.embeddings = GeminiEmbeddings(
-            gemini_api_key=GEMINI_API_KEY
-        )
-        print("다문화가족 벡터DB 로드 완료!")
-    else:
-        print("다문화가족 벡터DB 파일이 없습니다.")
-except Exception as e:
-    print(f"다문화가족 벡터DB 로드 중 오류 발생: {e}")
-    vector_db_multicultural = None
+# 리소스 이름 → 벡터DB pickle 경로
+VECTOR_DB_RESOURCES = {
+    "vector_db_multicultural": (VECTOR_DB_MERGED_PATH, "다문화가족"),
+    "vector_db_foreign_worker": (VECTOR_DB_FOREIGN_WORKER_PATH, "외국인 권리구제"),
+}
+# 로드된 벡터DB 스냅샷의 버전 (핫 스왑 판단용)
+_vector_db_versions = {}
 
-# 외국인 권리구제 벡터DB 로드
-try:
-    if os.path.exists(VECTOR_DB_FOREIGN_WORKER_PATH):
-        print("외국인 권리구제 벡터DB 파일을 로드합니다...")
-        print(f"벡터DB 파일 크기: {os.path.getsize(VECTOR_DB_FOREIGN_WORKER_PATH)} bytes")
-        with open(VECTOR_DB_FOREIGN_WORKER_PATH, "rb") as f:
-            vector_db_foreign_worker = pickle.load(f)
-        print(f"벡터DB 로드 완료. 문서 수: {len(vector_db_foreign_worker.documents) if hasattr(vector_db_foreign_worker, 'documents') else '알 수 없음'}")
-        vector_db_foreign_worker.embeddings = GeminiEmbeddings(
-            gemini_api_key=GEMINI_API_KEY
-        )
-        print("외국인 권리구제 벡터DB 로드 완료!")
-    else:
-        print("외국인 권리구제 벡터DB 파일이 없습니다.")
-except Exception as e:
-    print(f"외국인 권리구제 벡터DB 로드 중 오류 발생: {e}")
-    vector_db_foreign_worker = None
+def _vector_db_loader(name):
+    pkl_path, label = VECTOR_DB_RESOURCES[name]
+
+    def _load():
+        db_path = resolve_vector_db_path(pkl_path)
+        if not os.path.exists(db_path):
+            print(f"{label} 벡터DB 파일이 없습니다.")
+            return None
+        print(f"{label} 벡터DB를 로드합니다: {db_path}")
+        version = vector_db_version(db_path)
+        vector_db = load_vector_db(db_path, gemini_api_key=GEMINI_API_KEY,
+                                   quantization=VECTOR_DB_QUANTIZATION, rescore=VECTOR_DB_RESCORE)
+        _vector_db_versions[name] = version
+        print(f"{label} 벡터DB 로드 완료! 문서 수: {len(vector_db.documents)}")
+        return vector_db
+    return _load
+
+for _name in VECTOR_DB_RESOURCES:
+    resources.register(_name, _vector_db_loader(_name))
+
+def _json_loader(path, describe):
+    def _load():
+        if not os.path.exists(path):
+            print(f"{path} 파일이 없습니다.")
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        print(f"{path} 로드 완료 - {describe(data)}")
+        return data
+    return _load
 
 # 부산 맛집 벡터DB는 더 이상 사용하지 않음 (JSON 파일 직접 사용)
-print("부산 맛집 기능은 JSON 파일을 직접 사용합니다.")
+resources.register("busan_food_json_data", _json_loader(BUSAN_FOOD_JSON_PATH, lambda data: f"데이터 크기: {len(data)} keys"))
+resources.register("taek_sulling_json_data", _json_loader(TAEK_SULLING_JSON_PATH, lambda data: f"데이터 크기: {len(data.get('restaurants', []))} restaurants"))
+resources.register("jangmachul_json_data", _json_loader(JANGMACHUL_JSON_PATH, lambda data: "외국인 근로자 안전 정보"))
+resources.register("onyul_json_data", _json_loader(ONYUL_JSON_PATH, lambda data: "외국인 근로자 안전 정보"))
 
-# 부산 맛집 JSON 파일 로드
-print("부산 맛집 JSON 파일 로드 중...")
-try:
-    import json
-    
-    # 부산의맛(2025).json 로드
-    try:
-        if os.path.exists(BUSAN_FOOD_JSON_PATH):
-            with open(BUSAN_FOOD_JSON_PATH, "r", encoding="utf-8") as f:
-                busan_food_json_data = json.load(f)
-            print(f"부산의맛(2025).json 로드 완료 - 데이터 크기: {len(busan_food_json_data)} keys")
-        else:
-            print(f"{BUSAN_FOOD_JSON_PATH} 파일이 없습니다.")
-            busan_food_json_data = None
-    except Exception as e:
-        print(f"부산의맛(2025).json 로드 중 오류: {e}")
-        busan_food_json_data = None
-    
-    # 택슐랭(2025).json 로드
-    try:
-        if os.path.exists(TAEK_SULLING_JSON_PATH):
-            with open(TAEK_SULLING_JSON_PATH, "r", encoding="utf-8") as f:
-                taek_sulling_json_data = json.load(f)
-            print(f"택슐랭(2025).json 로드 완료 - 데이터 크기: {len(taek_sulling_json_data.get('restaurants', []))} restaurants")
-        else:
-            print(f"{TAEK_SULLING_JSON_PATH} 파일이 없습니다.")
-            taek_sulling_json_data = None
-    except Exception as e:
-        print(f"택슐랭(2025).json 로드 중 오류: {e}")
-        taek_sulling_json_data = None
-    
-    # jangmachul.json 로드
-    if os.path.exists(JANGMACHUL_JSON_PATH):
-        with open(JANGMACHUL_JSON_PATH, "r", encoding="utf-8") as f:
-            jangmachul_json_data = json.load(f)
-        print(f"jangmachul.json 로드 완료")
-    else:
-        print(f"{JANGMACHUL_JSON_PATH} 파일이 없습니다.")
-        
-    # onyul.json 로드
-    if os.path.exists(ONYUL_JSON_PATH):
-        with open(ONYUL_JSON_PATH, "r", encoding="utf-8") as f:
-            onyul_json_data = json.load(f)
-        print(f"onyul.json 로드 완료")
-    else:
-        print(f"{ONYUL_JSON_PATH} 파일이 없습니다.")
-        
-except Exception as e:
-    print(f"JSON 파일 로드 중 오류 발생: {e}")
+# 부산 맛집 버튼 활성화 여부는 파일 존재로만 판단 (JSON은 첫 질문 때 로드)
+BUSAN_FOOD_RAG_AVAILABLE = os.path.exists(BUSAN_FOOD_JSON_PATH) and os.path.exists(TAEK_SULLING_JSON_PATH)
+
+# 벡터DB 핫 스왑: 파일이 갱신되면(update_vector_db_sources + save_vector_db) 재시작 없이 새 스냅샷으로 교체
+# 새 스냅샷을 다 로드한 뒤 레지스트리 값만 한 번에 바꾸므로, 처리 중인 질문은 이전 스냅샷으로 끝까지 답변합니다.
+# 아직 한 번도 로드되지 않은 벡터DB는 처음 사용할 때 최신 파일을 읽으므로 감시하지 않습니다.
+VECTOR_DB_RELOAD_INTERVAL = int(os.getenv("VECTOR_DB_RELOAD_INTERVAL", "60"))
+_vector_db_reload_lock = threading.Lock()
+
+def reload_vector_dbs_if_changed():
+    """로드된 벡터DB의 파일 버전이 바뀌었으면 새 스냅샷을 로드해 교체하고, 교체한 경로 목록을 반환합니다."""
+    swapped = []
+    with _vector_db_reload_lock:
+        for name, (pkl_path, label) in VECTOR_DB_RESOURCES.items():
+            if not resources.is_loaded(name):
+                continue
+            db_path = resolve_vector_db_path(pkl_path)
+            version = vector_db_version(db_path)
+            if version is None or version == _vector_db_versions.get(name):
+                continue
+            try:
+                new_db = load_vector_db(db_path, gemini_api_key=GEMINI_API_KEY,
+                                        quantization=VECTOR_DB_QUANTIZATION, rescore=VECTOR_DB_RESCORE)
+            except Exception as e:
+                # 쓰는 중이거나 깨진 파일이면 이전 스냅샷을 유지하고 다음 주기에 다시 시도
+                print(f"벡터DB 다시 로드 실패, 이전 스냅샷을 유지합니다 ({db_path}): {e}")
+                continue
+            resources.set(name, new_db)
+            _vector_db_versions[name] = version
+            swapped.append(db_path)
+            print(f"{label} 벡터DB 스냅샷 교체 완료: {db_path} (문서 수: {len(new_db.documents)})")
+    return swapped
+
+def _watch_vector_dbs():
+    while True:
+        time.sleep(VECTOR_DB_RELOAD_INTERVAL)
+        try:
+            reload_vector_dbs_if_changed()
+        except Exception as e:
+            print(f"벡터DB 변경 감시 중 오류: {e}")
 
-# RAG 기능 사용 가능 여부 설정 (vector_db 정의 후)
-RAG_AVAILABLE = vector_db_multicultural is not None and vector_db_foreign_worker is not None
-BUSAN_FOOD_RAG_AVAILABLE = busan_food_json_data is not None and taek_sulling_json_data is not None
+if VECTOR_DB_RELOAD_INTERVAL > 0:
+    threading.Thread(target=_watch_vector_dbs, daemon=True).start()
 
-print("RAG 벡터DB 및 JSON 파일 준비 완료!")
+if RESOURCE_PREWARM:
+    prewarm_names = None if RESOURCE_PREWARM == "all" else [name.strip() for name in RESOURCE_PREWARM.split(",") if name.strip()]
+    resources.prewarm(prewarm_names)
 
 FIND_ROOM_TEXTS = {
     "ko": {
@@ -445,6 +453,8 @@ QR_SHARE_TEXTS = {
 }
 
 def main(page: ft.Page):
+    # 페이지들이 firebase_admin.db를 직접 사용하므로 첫 세션에서 Firebase를 초기화 (이후에는 캐시된 결과 사용)
+    firebase_available()
     # 시스템 다크모드 감지(또는 강제 다크/라이트)
     page.theme_mode = ft.ThemeMode.SYSTEM
     page.theme = ft.Theme(
@@ -517,8 +527,7 @@ def main(page: ft.Page):
         # 고정 채팅방인지 확인
         is_persistent = False
         try:
-            room_ref = db.reference(f'/rooms/{room_id}')
-            room_data = room_ref.get()
+            room_data = get_room_metadata(room_id)
             if room_data and room_data.get('is_persistent'):
                 is_persistent = True
         except:
@@ -609,7 +618,7 @@ def main(page: ft.Page):
             new_room_id = uuid.uuid4().hex[:8]
         
         # Firebase 사용 가능 여부 확인
-        if not FIREBASE_AVAILABLE:
+        if not firebase_available():
             print("Firebase가 초기화되지 않아 방을 생성할 수 없습니다.")
             # 사용자에게 오류 메시지 표시 (간단한 팝업)
             page.snack_bar = ft.SnackBar(
@@ -852,7 +861,7 @@ def main(page: ft.Page):
         
         try:
             # Firebase 연결 확인
-            if not FIREBASE_AVAILABLE:
+            if not firebase_available():
                 page.snack_bar = ft.SnackBar(
                     content=ft.Text("Firebase 연결이 불가능합니다. 네트워크를 확인해주세요."),
                     duration=3000
@@ -861,8 +870,7 @@ def main(page: ft.Page):
                 page.update()
                 return
             
-            room_ref = db.reference(f'/rooms/{room_id}')
-            room_data = room_ref.get()
+            room_data = get_room_metadata(room_id)
             if room_data:
                 go_chat(
                     user_lang=room_data.get('user_lang', 'ko'),
@@ -906,6 +914,8 @@ def main(page: ft.Page):
                     try:
                         print(f"부산 맛집 JSON 기반 질문: {query}")
                         print(f"타겟 언어: {target_lang}")
+                        busan_food_json_data = resources.get("busan_food_json_data")
+                        taek_sulling_json_data = resources.get("taek_sulling_json_data")
                         if busan_food_json_data is None or taek_sulling_json_data is None:
                             print("부산 맛집 JSON 데이터가 None입니다.")
                             # 다국어 오류 메시지
@@ -956,7 +966,7 @@ def main(page: ft.Page):
                     on_back=lambda e: go_room_list(lang),
                     on_share=on_share_clicked,
                     custom_translate_message=busan_food_rag_answer,
-                    firebase_available=FIREBASE_AVAILABLE,
+                    firebase_available=firebase_available(),
                     is_busan_food_rag=True
                 ))
             # 외국인 근로자 RAG 채팅방인지 확인
@@ -969,11 +979,11 @@ def main(page: ft.Page):
                     return foreign_worker_rag_answer(
                         query=query, 
                         target_lang=target_lang, 
-                        vector_db_foreign_worker=vector_db_foreign_worker, 
+                        vector_db_foreign_worker=resources.get("vector_db_foreign_worker"), 
                         gemini_api_key=GEMINI_API_KEY, 
                         conversation_context=conversation_context,
-                        jangmachul_json_data=jangmachul_json_data,
-                        onyul_json_data=onyul_json_data
+                        jangmachul_json_data=resources.get("jangmachul_json_data"),
+                        onyul_json_data=resources.get("onyul_json_data")
                     )
                 
                 page.views.append(ChatRoomPage(
@@ -985,7 +995,7 @@ def main(page: ft.Page):
                     on_back=lambda e: go_room_list(lang),
                     on_share=on_share_clicked,
                     custom_translate_message=foreign_worker_rag_answer_wrapper,
-                    firebase_available=FIREBASE_AVAILABLE,
+                    firebase_available=firebase_available(),
                     is_foreign_worker_rag=True
                 ))
             # 기존 다문화 가족 RAG 채팅방인지 확인
@@ -999,6 +1009,7 @@ def main(page: ft.Page):
                     try:
                         print(f"다문화 가족 RAG 질문: {query}")
                         print(f"타겟 언어: {target_lang}")
+                        vector_db_multicultural = resources.get("vector_db_multicultural")
                         if vector_db_multicultural is None:
                             print("다문화가족 벡터DB가 None입니다.")
                             # 다국어 오류 메시지
@@ -1644,7 +1655,7 @@ def main(page: ft.Page):
                     on_back=lambda e: go_home(lang),
                     on_share=on_share_clicked,
                     custom_translate_message=multicultural_rag_answer,
-                    firebase_available=FIREBASE_AVAILABLE
+                    firebase_available=firebase_available()
                 ))
             else:
                 page.views.append(ChatRoomPage(
@@ -1655,7 +1666,7 @@ def main(page: ft.Page):
                     target_lang=target_lang,
                     on_back=lambda e: go_home(lang),
                     on_share=on_share_clicked,
-                    firebase_available=FIREBASE_AVAILABLE
+                    firebase_available=firebase_available()
                 ))
             page.go(f"/chat/{room_id}")
         def on_share_clicked(e):
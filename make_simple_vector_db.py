@@ -1,38 +1,48 @@
 import os
 import pickle
-from rag_utils import SimpleVectorDB, OpenAIEmbeddings, chunk_pdf_to_text_chunks
+import numpy as np
+from rag_utils import SimpleVectorDB, GeminiEmbeddings, iter_pdf_chunks
+from vector_index import normalize_rows
 
 PDF_DIR = r"C:\Users\yonom\Downloads\다누리"
 OUTPUT_PATH = "vector_db_merged.pkl"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 임베딩 도중 중단되면 다시 실행했을 때 이 체크포인트부터 이어서 진행
+CHECKPOINT_PATH = OUTPUT_PATH + ".ckpt.jsonl"
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# PDF 파일 목록 수집
-pdf_files = [os.path.join(PDF_DIR, f) for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')]
-pdf_files.sort()
+def main():
+    # PDF 파일 목록 수집
+    pdf_files = [os.path.join(PDF_DIR, f) for f in os.listdir(PDF_DIR) if f.lower().endswith('.pdf')]
+    pdf_files.sort()
 
-print(f"PDF 파일 {len(pdf_files)}개 발견:")
-for f in pdf_files:
-    print(f"- {f}")
+    print(f"PDF 파일 {len(pdf_files)}개 발견:")
+    for f in pdf_files:
+        print(f"- {f}")
 
-all_chunks = []
-for pdf_path in pdf_files:
-    print(f"청크 분할: {pdf_path}")
-    chunks = chunk_pdf_to_text_chunks(pdf_path)
-    all_chunks.extend(chunks)
-    print(f"  → {len(chunks)}개 청크 생성")
+    # 여러 프로세스에서 페이지 묶음 단위로 파싱/청크 분할하고 (PDF 순서는 유지),
+    # PDF 하나가 끝날 때마다 바로 임베딩해 정규화된 행렬 블록만 모음 (완료된 배치는 체크포인트에 기록)
+    embeddings = GeminiEmbeddings(GEMINI_API_KEY)
+    all_chunks = []
+    blocks = []
+    for pdf_path, chunks in iter_pdf_chunks(pdf_files):
+        print(f"청크 분할: {pdf_path} → {len(chunks)}개 청크 생성, 임베딩 중...")
+        if not chunks:
+            continue
+        chunk_embeddings = embeddings.embed_documents([doc['page_content'] for doc in chunks], checkpoint_path=CHECKPOINT_PATH)
+        blocks.append(normalize_rows(chunk_embeddings))
+        all_chunks.extend(chunks)
 
-print(f"총 청크 개수: {len(all_chunks)}")
+    print(f"총 청크 개수: {len(all_chunks)}")
 
-# 임베딩 생성
-embeddings = OpenAIEmbeddings(
-    openai_api_key=OPENAI_API_KEY,
-    model="text-embedding-3-small"
-)
-print("문서 임베딩 생성 중...")
-doc_embeddings = embeddings.embed_documents([doc['page_content'] for doc in all_chunks])
+    # SimpleVectorDB 생성 및 저장
+    matrix = np.ascontiguousarray(np.concatenate(blocks)) if blocks else None
+    vector_db = SimpleVectorDB.from_matrix(all_chunks, matrix, embeddings, embeddings.model)
+    with open(OUTPUT_PATH, "wb") as f:
+        pickle.dump(vector_db, f)
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    print(f"SimpleVectorDB 저장 완료: {OUTPUT_PATH}")
 
-# SimpleVectorDB 생성 및 저장
-vector_db = SimpleVectorDB(all_chunks, embeddings, doc_embeddings)
-with open(OUTPUT_PATH, "wb") as f:
-    pickle.dump(vector_db, f)
-print(f"SimpleVectorDB 저장 완료: {OUTPUT_PATH}") 
\ No newline at end of file
+# 프로세스 풀이 이 스크립트를 다시 import해도 작업이 중복 실행되지 않도록 메인 가드 사용
+if __name__ == "__main__":
+    main()
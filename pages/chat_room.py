@@ -6,11 +6,25 @@ import time
 from firebase_admin import db
 import uuid
 import threading
+import random
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 import atexit
 import re
+from llm_client import OllamaClient, LLMError, LLMTimeoutError, stream_tokens
+from translation_cache import get_default_translation_cache, SingleFlight
 
 IS_SERVER = os.environ.get("CLOUDTYPE") == "1"
+# RAG 답변 스트리밍 시 말풍선을 다시 그리는 최소 간격(초). 토큰마다 그리면 UI 업데이트가 너무 잦아짐
+STREAM_UPDATE_INTERVAL = 0.1
+# 보낸 메시지를 백그라운드에서 번역하는 작업자 수 (모든 채팅방이 공유)
+TRANSLATION_MAX_WORKERS = int(os.getenv("TRANSLATION_MAX_WORKERS", "4"))
+# 채팅방 입장 시와 맨 위로 스크롤할 때마다 불러오는 메시지 수, 맨 위에서 이 픽셀 이내면 이전 메시지 로드
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+HISTORY_LOAD_THRESHOLD = 40
+# 메시지 키는 보내는 쪽 시계로 만들어지므로, 늦게 저장되거나 시계가 느린 메시지는 커서보다 앞 키로 들어올 수 있음
+# 새 메시지를 가져올 때 커서 앞 LIVE_REWIND_COUNT개도 다시 확인해서 아직 표시하지 않은 메시지를 채움
+LIVE_REWIND_COUNT = int(os.getenv("CHAT_LIVE_REWIND_COUNT", "20"))
 
 # 부적절한 단어 필터링 (욕설, 스팸 등)
 INAPPROPRIATE_WORDS = [
@@ -70,45 +84,114 @@ def translate_message(text, target_lang):
     target_lang_name = lang_map.get(target_lang, target_lang)
     prompt = f"Translate the following text to {target_lang_name} and return only the translation.\n{text}"
     
-    # 1. Ollama Cloud API 사용
+    # 0. 번역 캐시 (같은 문장/언어/모델이면 LLM 호출 없이 반환)
+    cache = get_default_translation_cache()
+    cached = cache.get(text, target_lang, OLLAMA_MODEL_NAME)
+    if cached is not None:
+        return cached
+    
+    # 1. Ollama Cloud API 사용 (공유 연결 풀 클라이언트)
     if OLLAMA_API_KEY:
-        import requests
-        import time
-        url = "https://ollama.com/api/chat"
-        headers = {
-            "Authorization": f"Bearer {OLLAMA_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": OLLAMA_MODEL_NAME or "gemma4:31b-cloud",
-            "messages": [{"role": "user", "content": prompt}],
-            "stream": False,
-            "options": {
-                "temperature": 0.2
-            }
-        }
-        
-        max_retries = 3
-        timeout = 60  # 타임아웃을 60초로 증가
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-                response.raise_for_status()
-                translated_text = response.json().get("message", {}).get("content", "").strip()
-                if translated_text:
-                    return translated_text
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                print(f"[Ollama 번역 타임아웃/연결 오류] 시도 {attempt + 1}/{max_retries} 실패: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # 지수 백오프 적용: 1초, 2초
-                    continue
-                return f"[번역 오류] 연결 시간 초과 (서버 응답 지연)"
-            except Exception as e:
-                print(f"[Ollama 번역 오류] {e}")
-                return f"[번역 오류] {e}"
+        try:
+            translated = OllamaClient(OLLAMA_API_KEY, OLLAMA_MODEL_NAME).generate(
+                prompt, temperature=0.2, timeout=60, allow_empty=False, label="Ollama 번역")
+            # 오류 메시지는 캐시하지 않음
+            cache.put(text, target_lang, OLLAMA_MODEL_NAME, translated)
+            return translated
+        except LLMTimeoutError:
+            return f"[번역 오류] 연결 시간 초과 (서버 응답 지연)"
+        except LLMError as e:
+            return f"[번역 오류] {e}"
     else:
         return "[번역 오류] Ollama API Key가 설정되지 않았습니다."
 
+_translation_executor = None
+_translation_executor_lock = threading.Lock()
+
+def get_translation_executor():
+    """보낸 메시지 번역에 쓰는 프로세스 전역 작업자 풀 (최대 TRANSLATION_MAX_WORKERS개 스레드)."""
+    global _translation_executor
+    with _translation_executor_lock:
+        if _translation_executor is None:
+            _translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_MAX_WORKERS, thread_name_prefix="translate")
+        return _translation_executor
+
+# 같은 메시지를 같은 언어로 번역하는 동시 요청(같은 방의 같은 언어 사용자들)을 LLM 호출 하나로 합침
+_translation_flights = SingleFlight()
+
+def translate_and_store(room_id, msg_id, text, target_lang):
+    """메시지를 target_lang으로 번역해 rooms/{room_id}/messages/{msg_id}/translations/{target_lang}에 저장하는 작업을 번역 작업자 풀에 넣고 Future를 반환합니다.
+
+    같은 (방, 메시지, 언어)에 대한 동시 요청은 풀에 넣기 전에 합칩니다. 이미 저장된 번역이 있으면 LLM을 호출하지 않습니다
+    (캐시 길이 제한을 넘는 긴 메시지도 다시 번역하지 않음). 번역 오류는 저장하지 않아 다음 요청이 다시 시도합니다.
+    """
+    def translate():
+        ref = db.reference(f'rooms/{room_id}/messages/{msg_id}/translations/{target_lang}')
+        try:
+            stored = ref.get()
+        except Exception as e:
+            print(f"저장된 번역 확인 오류: {e}")
+            stored = None
+        if isinstance(stored, str) and stored:
+            return stored
+        try:
+            translated = translate_message(text, target_lang)
+        except Exception as e:
+            return f"[번역 오류: {e}]"
+        if translated and not translated.startswith("[번역 오류"):
+            try:
+                # 번역과 head/translation을 한 번에 갱신해 다른 화면(head 리스너)에도 알림
+                db.reference(f'rooms/{room_id}').update({
+                    f'messages/{msg_id}/translations/{target_lang}': translated,
+                    'head/translation': {'id': msg_id, 'lang': target_lang, 'text': translated},
+                })
+            except Exception as e:
+                print(f"번역 저장 오류: {e}")
+        return translated
+    return _translation_flights.submit((room_id, msg_id, target_lang), get_translation_executor(), translate)
+
+def write_room_message(room_id, msg_id, message_data):
+    """메시지를 저장하면서 rooms/{room_id}/head/message를 그 키로 갱신합니다 (다중 경로 업데이트 한 번).
+
+    채팅방 화면은 메시지 노드 전체 대신 작은 head 노드를 구독하고, head가 바뀌면 마지막으로 받은 키 다음 메시지만 가져옵니다.
+    """
+    db.reference(f'rooms/{room_id}').update({f'messages/{msg_id}': message_data, 'head/message': msg_id})
+
+def get_room_metadata(room_id):
+    """방 정보(title, user_lang, target_lang, is_rag, is_persistent, created_by 등)만 읽습니다. 방이 없으면 None.
+
+    얕은 읽기(shallow)라 messages 같은 하위 노드는 내용 없이 True로만 오므로, 방 입장 시간이 메시지 기록 길이에 비례하지 않습니다.
+    """
+    return db.reference(f'rooms/{room_id}').get(shallow=True)
+
+# Firebase push ID 생성 (Firebase 클라이언트 SDK와 같은 방식: 밀리초 시각 8자 + 임의 12자, 시간순으로 정렬됨)
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_id_lock = threading.Lock()
+_last_push_time = [0]
+_last_rand_chars = [0] * 12
+
+def generate_push_id():
+    """저장하기 전에 메시지 키를 알 수 있도록 push ID를 직접 만듭니다. 같은 밀리초 안에서도 증가하는 값을 보장합니다."""
+    with _push_id_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time[0]:
+            # 같은 밀리초면 임의 부분을 1 증가
+            i = 11
+            while i >= 0 and _last_rand_chars[i] == 63:
+                _last_rand_chars[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand_chars[i] += 1
+        else:
+            _last_push_time[0] = now
+            for i in range(12):
+                _last_rand_chars[i] = random.randrange(64)
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return "".join(reversed(time_chars)) + "".join(PUSH_CHARS[c] for c in _last_rand_chars)
+
 # 언어 코드에 따른 전체 언어 이름 매핑
 LANG_NAME_MAP = {
     "ko": "한국어", "en": "영어", "ja": "일본어", "zh": "중국어",
@@ -2175,6 +2258,29 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             )
         ], alignment=ft.MainAxisAlignment.END if is_me else ft.MainAxisAlignment.START)
 
+    # --- RAG 답변 스트리밍: 생성 중인 답변을 로딩 말풍선에 표시 ---
+    def answer_with_streaming(bubble, answer_fn, *args):
+        """answer_fn(*args)를 실행하는 동안 LLM이 생성 중인 답변을 bubble 본문에 STREAM_UPDATE_INTERVAL초 간격으로 표시합니다."""
+        if bubble is None:
+            return answer_fn(*args)
+        text_control = bubble.controls[0].content.controls[1]
+        last_update = [0.0]
+
+        def on_text(text):
+            now = time.monotonic()
+            if now - last_update[0] < STREAM_UPDATE_INTERVAL:
+                return
+            last_update[0] = now
+            text_control.value = safe_text(text).replace('**', '')
+            try:
+                text_control.update()
+            except Exception as e:
+                print(f"스트리밍 말풍선 업데이트 오류: {e}")
+
+        # 답변이 끝나면 호출한 쪽이 최종 말풍선(지도/영상 버튼 포함)으로 교체하므로 마지막 조각을 따로 그리지 않음
+        with stream_tokens(on_text):
+            return answer_fn(*args)
+
     # --- 시스템 안내 메시지(가운데 정렬) 생성 함수 ---
     def create_system_message_bubble(text):
         return ft.Row([
@@ -2187,20 +2293,192 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             )
         ], alignment=ft.MainAxisAlignment.CENTER)
 
+    # --- 메시지 ID → 말풍선 (낙관적 렌더링과 번역 패치용) ---
+    message_bubbles = {}
+
+    def register_message_bubble(msg_id, bubble, msg_data, is_me, translation_lang=None):
+        """말풍선에 메시지 데이터를 붙이고 메시지 ID로 찾을 수 있게 등록합니다. translation_lang은 말풍선에 보여줄 번역 언어입니다."""
+        setattr(bubble, 'timestamp', str(msg_data.get('timestamp', '')))
+        setattr(bubble, 'msg_data', msg_data)
+        setattr(bubble, 'is_me', is_me)
+        setattr(bubble, 'translation_lang', translation_lang)
+        if msg_id:
+            # 이전 메시지를 불러온 뒤 scroll_to(key=...)로 위치를 유지하는 데 사용
+            bubble.key = msg_id
+            message_bubbles[msg_id] = bubble
+
+    def translation_lang_for(data, is_me):
+        """이 화면에서 메시지를 번역해 보여줄 언어 (번역하지 않으면 None).
+
+        내가 보낸 메시지는 선택한 번역 대상 언어로, 받은 메시지는 내 언어(user_lang)로 번역합니다.
+        """
+        if translate_switch is None or not translate_switch.value:
+            return None
+        if data.get('nickname') in ('시스템', 'RAG'):
+            return None
+        lang = current_target_lang[0] if is_me else user_lang
+        if not lang or lang == data.get('lang'):
+            return None
+        return lang
+
+    def displayed_translation(data, lang):
+        """저장된 메시지에서 lang 번역문을 꺼냅니다. translations가 없는 예전 메시지는 translated 필드를 그대로 씁니다."""
+        translations = data.get('translations')
+        if not isinstance(translations, dict):
+            return data.get('translated', '')
+        return translations.get(lang, '') if lang else ''
+
+    def apply_translation(msg_id, lang, translated):
+        """이미 표시된 메시지에 번역문을 채웁니다 (말풍선을 번역문이 포함된 것으로 교체). 말풍선의 번역 언어와 다르면 무시합니다."""
+        bubble = message_bubbles.get(msg_id)
+        if bubble is None or not translated or not isinstance(translated, str):
+            return
+        if bubble.translation_lang != lang or bubble.msg_data.get('translated') == translated:
+            return
+        msg_data = dict(bubble.msg_data, translated=translated)
+        new_bubble = create_message_bubble(msg_data, bubble.is_me)
+        if new_bubble is None:
+            return
+        try:
+            idx = chat_messages.controls.index(bubble)
+        except ValueError:
+            return
+        register_message_bubble(msg_id, new_bubble, msg_data, bubble.is_me, lang)
+        chat_messages.controls[idx] = new_bubble
+        page.update()
+
+    def request_translation(msg_id, message_text, lang):
+        """번역 작업자 풀에서 메시지를 lang으로 번역해 저장하고, 끝나면 화면에 채웁니다 (같은 요청은 프로세스 안에서 한 번만 번역)."""
+        def on_done(future):
+            try:
+                apply_translation(msg_id, lang, future.result())
+            except Exception as e:
+                print(f"번역 표시 오류: {e}")
+        translate_and_store(room_id, msg_id, message_text, lang).add_done_callback(on_done)
+
+    def send_chat_message(message_text, nickname):
+        """원문(과 보낸 사람 언어)을 바로 표시하고 Firebase에 저장합니다.
+
+        번역은 받는 쪽이 각자 자기 언어로 요청해 translations/{언어}에 채웁니다.
+        내 화면에 보여줄 번역(선택한 번역 대상 언어)만 여기서 작업자 풀에 요청합니다.
+        """
+        msg_id = generate_push_id()
+        message_data = {
+            'text': message_text,
+            'nickname': nickname,
+            'timestamp': time.time(),
+            'lang': user_lang
+        }
+        # 낙관적 렌더링: 저장/번역을 기다리지 않고 먼저 표시 (리스너로 돌아오는 같은 메시지는 ID로 건너뜀)
+        seen_message_ids.add(msg_id)
+        lang = translation_lang_for(message_data, True)
+        msg_data = dict(message_data, translated='')
+        message_bubble = create_message_bubble(dict(msg_data), True)
+        if message_bubble:
+            register_message_bubble(msg_id, message_bubble, msg_data, True, lang)
+            chat_messages.controls.append(message_bubble)
+            page.update()
+        try:
+            write_room_message(room_id, msg_id, message_data)
+        except Exception as e:
+            print(f"Firebase 저장 오류: {e}")
+            return
+        if lang:
+            request_translation(msg_id, message_text, lang)
+
     # --- 입장/퇴장 감지용 유저 세트 ---
     current_users = set()
 
-    # --- Firebase 리스너 콜백 ---
+    # --- 실시간 수신 상태: 마지막으로 받은 메시지 키(커서)와 이미 표시한 메시지 ID 집합 ---
+    # head_seen: head 노드를 한 번이라도 받았는지 (head가 없는 예전 방의 첫 스냅샷을 기록 초기화로 오해하지 않도록)
+    live_state = {'cursor': None, 'head_seen': False}
+    seen_message_ids = set()
+    live_lock = threading.Lock()
+
+    def reset_live_view():
+        """화면의 메시지와 수신 커서/기록 상태를 비웁니다 (채팅 기록 초기화)."""
+        with live_lock:
+            chat_messages.controls.clear()
+            # 현재 사용자 목록도 초기화 (입장/퇴장 메시지 방지)
+            current_users.clear()
+            seen_message_ids.clear()
+            message_bubbles.clear()
+            live_state.update(cursor=None, head_seen=False)
+            history_state.update(oldest_key=None, has_more=False)
+        page.update()
+
+    def advance_cursor(msg_id):
+        if live_state['cursor'] is None or msg_id > live_state['cursor']:
+            live_state['cursor'] = msg_id
+
+    def fetch_messages_after(cursor, rewind=False):
+        """cursor 다음 메시지를 키 순서로 모두 가져옵니다 (HISTORY_PAGE_SIZE개씩 나눠서). cursor가 없으면 최근 한 페이지만.
+
+        rewind=True((재)연결 시)이면 커서 앞 LIVE_REWIND_COUNT개 중 아직 표시하지 않은 메시지도 함께 돌려주므로,
+        늦게 들어온 메시지가 빠지지 않습니다. 새 메시지 알림마다 하지는 않음 (매번 메시지 여러 개를 다시 받게 됨).
+        """
+        if cursor is None:
+            result = db.reference(f'rooms/{room_id}/messages').order_by_key().limit_to_last(HISTORY_PAGE_SIZE).get()
+            return sorted((result or {}).items())
+        messages = []
+        if rewind and LIVE_REWIND_COUNT > 0:
+            result = db.reference(f'rooms/{room_id}/messages').order_by_key().end_at(cursor).limit_to_last(LIVE_REWIND_COUNT).get()
+            oldest_key = history_state['oldest_key']
+            # 로드한 기록보다 오래된 키는 이전 메시지를 불러올 때 표시됨
+            messages.extend((key, value) for key, value in sorted((result or {}).items())
+                            if key != cursor and key not in seen_message_ids and (oldest_key is None or key > oldest_key))
+        while True:
+            # start_at은 cursor를 포함하므로 하나 더 가져와서 뺌
+            result = db.reference(f'rooms/{room_id}/messages').order_by_key().start_at(cursor).limit_to_first(HISTORY_PAGE_SIZE + 1).get()
+            page_items = [(key, value) for key, value in sorted((result or {}).items()) if key != cursor]
+            messages.extend(page_items)
+            if len(page_items) < HISTORY_PAGE_SIZE:
+                return messages
+            cursor = page_items[-1][0]
+
+    def catch_up_messages(rewind=False):
+        """커서 다음 메시지를 가져와 표시하고 커서를 옮깁니다. 리스너가 다시 연결될 때 빠진 메시지도 여기서 채워집니다."""
+        with live_lock:
+            for msg_id, data in fetch_messages_after(live_state['cursor'], rewind):
+                show_live_message(msg_id, data)
+                advance_cursor(msg_id)
+
+    # --- Firebase 리스너 콜백 (rooms/{room_id}/head) ---
     def on_message(event):
-        if not event or not event.data:
-            return  # 데이터가 없으면 무시
-        
+        """head 노드 리스너. 연결(재연결) 시에는 head 전체가, 이후에는 바뀐 필드(message: 새 메시지 키, translation: 새 번역)가 옵니다.
+
+        Admin SDK의 Query는 listen을 지원하지 않으므로 메시지 노드 대신 head를 구독하고, 메시지는 커서 이후만 쿼리로 가져옵니다.
+        """
+        if not event:
+            return
+        try:
+            path_parts = [part for part in (getattr(event, 'path', '') or '').split('/') if part]
+            if not path_parts and event.data is None:
+                # head가 지워짐: 누군가 채팅 기록을 초기화함 (head를 받은 적이 없으면 head가 없는 예전 방의 첫 스냅샷)
+                if live_state['head_seen']:
+                    reset_live_view()
+                return
+            live_state['head_seen'] = True
+            changes = event.data if not path_parts else {path_parts[0]: event.data}
+            if not isinstance(changes, dict):
+                changes = {}
+            translation = changes.get('translation')
+            if isinstance(translation, dict):
+                apply_translation(translation.get('id'), translation.get('lang'), translation.get('text'))
+            # 새 메시지 알림이거나 (재)연결 스냅샷이면 커서 다음 메시지를 가져옴 (스냅샷일 때만 커서 앞도 다시 확인)
+            if not path_parts or 'message' in changes:
+                catch_up_messages(rewind=not path_parts)
+        except Exception as e:
+            print(f"메시지 처리 오류: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def show_live_message(msg_id, data):
+        """리스너로 받은 메시지 하나를 표시합니다. 이미 표시한 메시지 ID는 건너뜁니다."""
+        if msg_id in seen_message_ids:
+            return  # 이미 표시한 메시지 (기록 로드, 내가 보낸 메시지의 낙관적 렌더링 등)
+        seen_message_ids.add(msg_id)
         try:
-            data = event.data
-            if isinstance(data, str):
-                import json
-                data = json.loads(data)
-            
             # 데이터가 유효한지 확인
             if not isinstance(data, dict):
                 print(f"유효하지 않은 메시지 데이터 형식: {type(data)}")
@@ -2210,7 +2488,7 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 'text': data.get('text', ''),
                 'nickname': data.get('nickname', '익명'),
                 'timestamp': str(data.get('timestamp', '')),
-                'translated': data.get('translated', '')
+                'lang': data.get('lang'),
             }
             
             # 차단된 사용자의 메시지는 무시
@@ -2226,22 +2504,6 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                     page.update()
                 return
             
-            # 중복 메시지 방지: 최근 5개 메시지의 (nickname, text, timestamp)와 비교 (일반 메시지에만 적용)
-            def get_msg_id(msg):
-                return f"{msg['nickname']}|{msg['text']}|{msg['timestamp']}"
-            new_id = get_msg_id(msg_data)
-            for c in chat_messages.controls[-5:]:
-                if hasattr(c, 'content') and hasattr(c.content, 'controls'):
-                    try:
-                        last_nickname = c.content.controls[0].value
-                        last_text = c.content.controls[1].value
-                        last_timestamp = getattr(c, 'timestamp', None) or ''
-                        last_id = f"{last_nickname}|{last_text}|{last_timestamp}"
-                        if last_id == new_id:
-                            return  # 중복
-                    except Exception:
-                        continue
-            
             # --- 입장/퇴장 감지 및 안내 메시지 ---
             nickname = msg_data['nickname']
             if nickname != '익명' and nickname != 'RAG' and nickname != '시스템':
@@ -2249,15 +2511,19 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 # (입장 메시지는 push_join_system_message()에서 한 번만 처리)
                 current_users.add(nickname)
             
-            # 메시지 말풍선 생성
+            # 메시지 말풍선 생성 (내 언어 번역이 아직 없으면 번역 요청)
             is_me = msg_data['nickname'] == (page.session.get('nickname') or '')
+            lang = translation_lang_for(data, is_me)
+            msg_data['translated'] = displayed_translation(data, lang)
             message_bubble = create_message_bubble(msg_data, is_me)
             
             # message_bubble이 유효한 경우에만 처리
             if message_bubble:
-                setattr(message_bubble, 'timestamp', msg_data['timestamp'])
+                register_message_bubble(msg_id, message_bubble, msg_data, is_me, lang)
                 chat_messages.controls.append(message_bubble)
                 page.update()
+                if lang and msg_id and not msg_data['translated']:
+                    request_translation(msg_id, msg_data['text'], lang)
             else:
                 print(f"메시지 버블 생성 실패: {msg_data}")
                 
@@ -2349,7 +2615,9 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
 
                 # Firebase에 추방 알림 메시지 전송
                 if firebase_available:
-                    db.reference(f'rooms/{room_id}/messages').push(kick_msg_data)
+                    kick_msg_id = generate_push_id()
+                    seen_message_ids.add(kick_msg_id)
+                    write_room_message(room_id, kick_msg_id, kick_msg_data)
 
                 page.update()
             except Exception as e:
@@ -2421,29 +2689,23 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         input_box.value = ""
         page.update()
         
-        # 번역 처리
-        translated_text = ""
-        if translate_switch and translate_switch.value and current_target_lang[0]:
-            try:
-                translated_text = translate_message(message_text, current_target_lang[0])
-            except Exception as e:
-                translated_text = f"[번역 오류: {e}]"
+        translate_lang = current_target_lang[0] if translate_switch and translate_switch.value and current_target_lang[0] else None
+        is_rag_room = is_busan_food_rag or room_id == "busan_food_search_rag" or is_foreign_worker_rag or room_id == "foreign_worker_rights_rag"
         
-        # Firebase에 메시지 저장 (RAG 방이 아닐 때만)
-        if firebase_available and not (is_busan_food_rag or room_id == "busan_food_search_rag" or is_foreign_worker_rag or room_id == "foreign_worker_rights_rag"):
-            try:
-                message_data = {
-                    'text': message_text,
-                    'nickname': nickname,
-                    'timestamp': time.time(),
-                    'translated': translated_text
-                }
-                db.reference(f'rooms/{room_id}/messages').push(message_data)
-            except Exception as e:
-                print(f"Firebase 저장 오류: {e}")
+        # Firebase에 메시지 저장 (RAG 방이 아닐 때만): 원문을 바로 표시/저장하고 번역은 백그라운드에서 채움
+        if firebase_available and not is_rag_room:
+            send_chat_message(message_text, nickname)
         
         # RAG 방이면 사용자 메시지와 RAG 답변을 직접 추가
-        if is_busan_food_rag or room_id == "busan_food_search_rag" or is_foreign_worker_rag or room_id == "foreign_worker_rights_rag":
+        if is_rag_room:
+            # 번역 처리 (RAG 방은 답변 생성과 함께 동기 처리)
+            translated_text = ""
+            if translate_lang:
+                try:
+                    translated_text = translate_message(message_text, translate_lang)
+                except Exception as e:
+                    translated_text = f"[번역 오류: {e}]"
+            
             # 사용자 메시지 추가
             user_msg_data = {
                 'text': message_text,
@@ -2503,15 +2765,16 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 page.update()
                 
                 # RAG 방에서는 선택된 언어로 답변 생성
+                # 생성 중인 답변은 로딩 말풍선에 스트리밍으로 표시
                 if is_busan_food_rag or room_id == "busan_food_search_rag":
                     selected_lang = current_target_lang[0] if current_target_lang[0] else user_lang
-                    rag_answer = custom_translate_message(message_text, selected_lang)
+                    rag_answer = answer_with_streaming(loading_bubble, custom_translate_message, message_text, selected_lang)
                 elif is_foreign_worker_rag or room_id == "foreign_worker_rights_rag":
                     selected_lang = current_target_lang[0] if current_target_lang[0] else user_lang
-                    rag_answer = custom_translate_message(message_text, selected_lang)
+                    rag_answer = answer_with_streaming(loading_bubble, custom_translate_message, message_text, selected_lang)
                 else:
                     # 일반 RAG 방에서는 기존 방식 사용
-                    rag_answer = custom_translate_message(message_text, user_lang)
+                    rag_answer = answer_with_streaming(loading_bubble, custom_translate_message, message_text, user_lang)
                 
                 # 로딩 메시지 위치에 답변을 insert (replace)
                 idx = chat_messages.controls.index(loading_bubble)
@@ -2620,9 +2883,9 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                     setattr(loading_bubble, 'timestamp', loading_msg_data['timestamp'])
                     chat_messages.controls.append(loading_bubble)
                 page.update()
-                # RAG 답변 생성 (선택된 언어로)
+                # RAG 답변 생성 (선택된 언어로, 생성 중인 답변은 로딩 말풍선에 스트리밍)
                 selected_lang = current_target_lang[0] if current_target_lang[0] else user_lang
-                rag_answer = custom_translate_message(message_text, selected_lang)
+                rag_answer = answer_with_streaming(loading_bubble, custom_translate_message, message_text, selected_lang)
                 # 로딩 메시지 제거
                 chat_messages.controls.remove(loading_bubble)
                 if rag_answer and rag_answer.strip():  # 답변이 있을 때만 추가
@@ -2696,70 +2959,125 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
 
     # --- 뒤로가기 함수 ---
     def go_back(e):
+        # 방을 나가면 head 리스너를 닫음
+        if firebase_listener:
+            try:
+                firebase_listener.close()
+            except Exception as close_error:
+                print(f"리스너 종료 오류: {close_error}")
         if on_back:
             on_back(e)
 
+    # --- 채팅 기록 페이지 로드 ---
+    # 가장 오래된 로드된 메시지 키 / 더 오래된 메시지가 남았는지 / 로드 중인지
+    history_state = {'oldest_key': None, 'has_more': False, 'loading': False}
+    history_lock = threading.Lock()
+
+    def fetch_history_page(end_key=None):
+        """end_key 이전(미포함) 메시지를 키 순서로 최대 HISTORY_PAGE_SIZE개 가져옵니다 (오래된 순 (키, 데이터) 리스트)."""
+        query = db.reference(f'rooms/{room_id}/messages').order_by_key()
+        if end_key is None:
+            result = query.limit_to_last(HISTORY_PAGE_SIZE).get()
+        else:
+            # end_at은 end_key를 포함하므로 하나 더 가져와서 뺌
+            result = query.end_at(end_key).limit_to_last(HISTORY_PAGE_SIZE + 1).get()
+        return sorted((key, value) for key, value in (result or {}).items() if key != end_key)
+
+    def build_history_bubbles(messages):
+        """(키, 데이터) 리스트를 말풍선 리스트로 만듭니다. 차단된 사용자의 메시지는 뺍니다."""
+        bubbles = []
+        current_user = page.session.get('nickname') or ''
+        for msg_id, msg_data in messages:
+            seen_message_ids.add(msg_id)
+            if not isinstance(msg_data, dict):
+                continue
+            msg_data['msg_id'] = msg_id
+            try:
+                # 차단된 사용자의 메시지는 무시
+                if is_user_blocked(msg_data.get('nickname', '')):
+                    continue
+                
+                # 시스템 메시지 처리
+                if msg_data.get('nickname') == '시스템':
+                    system_bubble = create_system_message_bubble(msg_data.get('text', ''))
+                    if system_bubble:
+                        bubbles.append(system_bubble)
+                    continue
+                
+                # 일반 메시지 처리
+                is_me = msg_data.get('nickname') == current_user
+                lang = translation_lang_for(msg_data, is_me)
+                msg_data['translated'] = displayed_translation(msg_data, lang)
+                message_bubble = create_message_bubble(msg_data, is_me)
+                if message_bubble:
+                    register_message_bubble(msg_id, message_bubble, msg_data, is_me, lang)
+                    bubbles.append(message_bubble)
+                    if lang and not msg_data['translated']:
+                        request_translation(msg_id, msg_data.get('text', ''), lang)
+            except Exception as e:
+                print(f"메시지 로드 중 오류: {e}")
+        return bubbles
+
+    def remember_history_page(messages):
+        if messages:
+            history_state['oldest_key'] = messages[0][0]
+        history_state['has_more'] = len(messages) >= HISTORY_PAGE_SIZE
+
+    def load_existing_messages():
+        """최근 메시지 HISTORY_PAGE_SIZE개만 로드합니다. 이전 메시지는 맨 위로 스크롤하면 load_older_messages가 불러옵니다."""
+        try:
+            messages = fetch_history_page()
+            if not messages:
+                print("기존 메시지가 없습니다.")
+                return
+            chat_messages.controls.extend(build_history_bubbles(messages))
+            remember_history_page(messages)
+            # 실시간 리스너는 마지막으로 로드한 키 다음부터 받음
+            advance_cursor(messages[-1][0])
+            print(f"기존 메시지 로딩 완료: {len(messages)}개 (이전 메시지 {'있음' if history_state['has_more'] else '없음'})")
+            page.update()
+        except Exception as e:
+            print(f"기존 메시지 로드 오류: {e}")
+
+    def load_older_messages():
+        """가장 오래된 로드된 메시지 이전 페이지를 불러와 맨 위에 붙입니다. 이미 로드 중이거나 더 없으면 아무것도 하지 않습니다."""
+        if not firebase_available:
+            return
+        with history_lock:
+            if history_state['loading'] or not history_state['has_more'] or history_state['oldest_key'] is None:
+                return
+            history_state['loading'] = True
+        try:
+            anchor = chat_messages.controls[0] if chat_messages.controls else None
+            messages = fetch_history_page(history_state['oldest_key'])
+            bubbles = build_history_bubbles(messages)
+            chat_messages.controls[0:0] = bubbles
+            remember_history_page(messages)
+            if not messages:
+                history_state['has_more'] = False
+            page.update()
+            # 붙이기 전 맨 위에 있던 메시지가 계속 보이도록 스크롤 위치 유지
+            if bubbles and anchor is not None and getattr(anchor, 'key', None):
+                chat_column.scroll_to(key=anchor.key, duration=0)
+        except Exception as e:
+            print(f"이전 메시지 로드 오류: {e}")
+        finally:
+            history_state['loading'] = False
+
+    def on_chat_scroll(e):
+        """맨 위 근처까지 스크롤하면 이전 메시지를 불러옵니다."""
+        if e.pixels is not None and e.pixels <= e.min_scroll_extent + HISTORY_LOAD_THRESHOLD:
+            load_older_messages()
+
     # --- Firebase 리스너 설정 ---
     firebase_listener = None  # 리스너 객체 저장용 변수
     if firebase_available:
         try:
-            # 기존 메시지들을 먼저 로드
-            def load_existing_messages():
-                try:
-                    messages_ref = db.reference(f'rooms/{room_id}/messages')
-                    existing_messages = messages_ref.get()
-                    
-                    if existing_messages:
-                        print(f"기존 메시지 {len(existing_messages)}개 발견, 로딩 중...")
-                        
-                        # 메시지를 timestamp 순으로 정렬
-                        sorted_messages = []
-                        for msg_id, msg_data in existing_messages.items():
-                            if isinstance(msg_data, dict):
-                                msg_data['msg_id'] = msg_id
-                                sorted_messages.append(msg_data)
-                        
-                        sorted_messages.sort(key=lambda x: x.get('timestamp', 0))
-                        
-                        # 각 메시지를 UI에 추가
-                        for msg_data in sorted_messages:
-                            try:
-                                # 차단된 사용자의 메시지는 무시
-                                if is_user_blocked(msg_data.get('nickname', '')):
-                                    continue
-                                
-                                # 시스템 메시지 처리
-                                if msg_data.get('nickname') == '시스템':
-                                    system_bubble = create_system_message_bubble(msg_data.get('text', ''))
-                                    if system_bubble:
-                                        chat_messages.controls.append(system_bubble)
-                                    continue
-                                
-                                # 일반 메시지 처리
-                                current_user = page.session.get('nickname') or ''
-                                is_me = msg_data.get('nickname') == current_user
-                                
-                                message_bubble = create_message_bubble(msg_data, is_me)
-                                if message_bubble:
-                                    chat_messages.controls.append(message_bubble)
-                                    
-                            except Exception as e:
-                                print(f"메시지 로드 중 오류: {e}")
-                                continue
-                        
-                        print(f"기존 메시지 로딩 완료: {len(sorted_messages)}개")
-                        page.update()
-                    else:
-                        print("기존 메시지가 없습니다.")
-                        
-                except Exception as e:
-                    print(f"기존 메시지 로드 오류: {e}")
-            
-            # 기존 메시지 로드
+            # 최근 메시지들을 먼저 로드
             load_existing_messages()
             
-            # Firebase 리스너 설정 (새로운 메시지용)
-            firebase_listener = db.reference(f'rooms/{room_id}/messages').listen(on_message)
+            # Firebase 리스너 설정 (새로운 메시지용): 로드와 구독 사이에 온 메시지는 첫 head 이벤트의 catch_up이 채움
+            firebase_listener = db.reference(f'rooms/{room_id}/head').listen(on_message)
             
         except Exception as e:
             print(f"Firebase 초기화 오류: {e}")
@@ -3391,28 +3709,12 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             return
         
         def confirm_clear(e):
-            nonlocal firebase_listener  # 외부 변수 접근
             try:
-                # Firebase에서 메시지 삭제
-                db.reference(f'rooms/{room_id}/messages').delete()
-                
-                # 화면 메시지 초기화
-                chat_messages.controls.clear()
+                # 화면과 수신 상태를 먼저 비움 (이 화면의 head 리스너는 아래 삭제 알림을 받아도 다시 비우지 않음)
+                reset_live_view()
                 
-                # 현재 사용자 목록도 초기화 (입장/퇴장 메시지 방지)
-                current_users.clear()
-                
-                # Firebase 리스너 재설정 (기존 리스너 제거 후 새로 설정)
-                if firebase_listener and firebase_available:
-                    try:
-                        firebase_listener.close()  # 기존 리스너 제거
-                    except:
-                        pass
-                    # 새 리스너 설정
-                    firebase_listener = db.reference(f'rooms/{room_id}/messages').listen(on_message)
-                
-                # 페이지 업데이트
-                page.update()
+                # Firebase에서 메시지와 head를 한 번에 삭제: head 리스너로 방을 보고 있는 모든 화면이 초기화됨
+                db.reference(f'rooms/{room_id}').update({'messages': None, 'head': None})
                 
                 # 확인 메시지 표시 (Firebase에 저장하지 않고 화면에만 표시)
                 clear_msg_data = {
@@ -3562,13 +3864,17 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             controls=[get_rag_guide_message(), chat_messages],
             expand=True,
             spacing=0,
-            scroll=ft.ScrollMode.ALWAYS
+            scroll=ft.ScrollMode.ALWAYS,
+            on_scroll=on_chat_scroll,
+            on_scroll_interval=200,
         )
     else:
         chat_column = ft.Column(
             controls=[chat_messages],
             expand=True,
-            scroll=ft.ScrollMode.ALWAYS
+            scroll=ft.ScrollMode.ALWAYS,
+            on_scroll=on_chat_scroll,
+            on_scroll_interval=200,
         )
 
     # chat_area는 scroll 없이 Container만 사용
@@ -3591,7 +3897,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             return
         try:
             messages_ref = db.reference(f'rooms/{room_id}/messages')
-            messages = messages_ref.get()
+            # 전체 기록 대신 최근 메시지만 확인 (5분 내 입장 메시지 확인에 충분)
+            messages = messages_ref.order_by_key().limit_to_last(HISTORY_PAGE_SIZE).get()
             import time
             now = time.time()
             # 1. 방장(최초 입장자)만 예외 처리: 방에 메시지가 0개이고, 내가 방을 만든 사람일 때만 return
@@ -3616,7 +3923,7 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 'timestamp': now,
                 'translated': ''
             }
-            messages_ref.push(system_msg)
+            write_room_message(room_id, generate_push_id(), system_msg)
         except Exception as e:
             print(f"입장 시스템 메시지 push 오류: {e}")
 
@@ -3675,8 +3982,7 @@ def is_user_blocked(nickname):
 def is_room_owner(room_id, nickname, user_id=None):
     """방장인지 확인"""
     try:
-        room_ref = db.reference(f'/rooms/{room_id}')
-        room_data = room_ref.get()
+        room_data = get_room_metadata(room_id)
         if room_data:
             # 닉네임으로 확인
             if room_data.get('created_by') == nickname:
@@ -4,9 +4,23 @@ import json
 import pickle
 import numpy as np
 import re
+import time
+import random
+import threading
+import weakref
 import google.generativeai as genai
 import shutil
+import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pypdf import PdfReader
+from embedding_cache import get_default_query_cache, get_default_document_store
+from vector_index import IVFIndex, QuantizedMatrix, ANN_MIN_DOCUMENTS, RESCORE_FACTOR, ann_index_path_for, normalize_rows, top_k_indices
+from text_index import DocumentMetadataIndex, CharNgramBM25Index, reciprocal_rank_fusion
+from file_manifest import get_default_manifest, hash_file
+from artifact_store import get_default_store, source_files
+from llm_client import OllamaClient, get_default_client
+from token_chunker import TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP, split_text_into_token_chunks, pack_context
 
 # LangGraph 관련 import 추가
 try:
@@ -25,54 +39,14 @@ except ImportError:
 PDF_PATH = "pdf/ban.pdf"
 VECTOR_DB_PATH = "vector_db.pkl"
 CACHE_INFO_PATH = "cache_info.json"
+# 캐시 상태 확인 대상 벡터DB (get_cache_statuses)
+CACHE_ARTIFACT_PATHS = [VECTOR_DB_PATH, "다문화.pkl", "외국인근로자.pkl"]
 
 WASTE_INFO_JSON_PATH = "부산광역시_쓰레기처리정보.json"
 
 def generate_text_with_llm(prompt, system_instruction=None, temperature=0.3, max_tokens=1500, gemini_api_key=None):
-    """Ollama를 사용하여 텍스트를 생성합니다."""
-    # config 임포트를 지연 로딩(lazy import)하여 순환 참조 방지
-    from config import OLLAMA_API_KEY, OLLAMA_MODEL_NAME
-    
-    if not OLLAMA_API_KEY:
-        raise ValueError("Ollama Cloud API Key (OLLAMA_API_KEY) is missing. Gemini LLM is disabled.")
-        
-    import requests
-    import time
-    url = "https://ollama.com/api/chat"
-    headers = {
-        "Authorization": f"Bearer {OLLAMA_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    messages = []
-    if system_instruction:
-        messages.append({"role": "system", "content": system_instruction})
-    messages.append({"role": "user", "content": prompt})
-    
-    payload = {
-        "model": OLLAMA_MODEL_NAME or "gemma4:31b-cloud",
-        "messages": messages,
-        "stream": False,
-        "options": {
-            "temperature": temperature
-        }
-    }
-    
-    max_retries = 3
-    timeout = 90  # 생성 응답용 타임아웃을 90초로 증가
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-            response.raise_for_status()
-            return response.json().get("message", {}).get("content", "").strip()
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            print(f"[Ollama 호출 타임아웃/연결 오류] 시도 {attempt + 1}/{max_retries} 실패: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # 지수 백오프 적용: 1초, 2초
-                continue
-            raise e
-        except Exception as e:
-            print(f"Ollama API 호출 오류: {e}")
-            raise e
+    """Ollama를 사용하여 텍스트를 생성합니다 (공유 연결 풀 클라이언트, llm_client.py 참고)."""
+    return get_default_client().generate(prompt, system_instruction=system_instruction, temperature=temperature)
 
 if LANGGRAPH_AVAILABLE:
     from langchain_core.language_models.chat_models import BaseChatModel
@@ -102,41 +76,8 @@ if LANGGRAPH_AVAILABLE:
                     role = "user"
                 ollama_messages.append({"role": role, "content": msg.content})
                 
-            import requests
-            url = "https://ollama.com/api/chat"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": self.model_name,
-                "messages": ollama_messages,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature
-                }
-            }
-            
-            import time
-            max_retries = 3
-            timeout = 90  # 생성 응답용 타임아웃을 90초로 증가
-            for attempt in range(max_retries):
-                try:
-                    response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-                    response.raise_for_status()
-                    res_json = response.json()
-                    content = res_json.get("message", {}).get("content", "")
-                    break
-                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                    print(f"[Ollama LangGraph 호출 타임아웃/연결 오류] 시도 {attempt + 1}/{max_retries} 실패: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
-                        continue
-                    raise e
-                except Exception as e:
-                    print(f"Ollama LangGraph API 호출 오류: {e}")
-                    raise e
+            content = OllamaClient(self.api_key, self.model_name).chat(
+                ollama_messages, temperature=self.temperature, label="Ollama LangGraph")
             
             ai_message = AIMessage(content=content)
             generation = ChatGeneration(message=ai_message)
@@ -902,6 +843,10 @@ BUSAN_DISTRICTS = [
     "해운대구", "사하구", "금정구", "강서구", "연제구", "수영구", "사상구", "기장군"
 ]
 
+# 쓰레기 처리 문서를 본문으로 찾을 때 쓰는 키워드 (구군명과 함께 메타데이터 인덱스의 포스팅 리스트로 미리 색인)
+WASTE_CONTENT_KEYWORDS = ['쓰레기', '폐기물', '배출', '종량제', '봉투', '수거']
+METADATA_INDEX_TERMS = WASTE_CONTENT_KEYWORDS + BUSAN_DISTRICTS
+
 # 쓰레기 처리 관련 키워드 (다국어 지원)
 WASTE_KEYWORDS = [
     # 한국어 키워드
@@ -1036,12 +981,12 @@ ERROR_MESSAGES = {
 
 # 파일 해시 계산 함수
 def calculate_file_hash(file_path):
-    """파일의 MD5 해시를 계산합니다."""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    """파일의 MD5 해시를 계산합니다 (큰 버퍼/mmap으로 읽음). 반복 확인에는 파일 지문 매니페스트를 쓰는 cached_file_hash를 사용하세요."""
+    return hash_file(file_path)
+
+def cached_file_hash(file_path):
+    """파일 지문 매니페스트를 통해 해시를 반환합니다. 크기와 mtime이 기록과 같으면 파일을 읽지 않습니다."""
+    return get_default_manifest().file_hash(file_path)
 
 # 캐시 정보 저장/로드 함수
 def save_cache_info(file_hash, chunk_count):
@@ -1064,116 +1009,641 @@ def load_cache_info():
     except (json.JSONDecodeError, FileNotFoundError):
         return None
 
+def migrate_legacy_cache_info(manifest):
+    """예전 cache_info.json(단일 PDF 해시)을 매니페스트의 산출물 기록으로 옮깁니다. 옮겼으면 True."""
+    cache_info = load_cache_info()
+    if cache_info is None or not cache_info.get("file_hash"):
+        return False
+    manifest.record_artifact(VECTOR_DB_PATH, {PDF_PATH: cache_info["file_hash"]},
+                             chunk_count=cache_info.get("chunk_count"), created_at=cache_info.get("created_at"))
+    manifest.save()
+    return True
+
 def is_cache_valid():
-    """현재 PDF 파일의 해시와 캐시된 해시를 비교하여 캐시가 유효한지 확인합니다."""
+    """벡터DB를 만들 때 기록한 PDF 해시와 현재 PDF를 비교하여 캐시가 유효한지 확인합니다 (PDF가 그대로면 stat만 확인)."""
     if not os.path.exists(PDF_PATH):
         print(f"PDF 파일이 존재하지 않습니다: {PDF_PATH}")
         return False
-    
-    if not os.path.exists(VECTOR_DB_PATH):
-        print("벡터DB 파일이 존재하지 않습니다.")
+    status = get_cache_status()
+    if status["status"] in ("not_exists", "no_cache_info"):
+        print(status["message"])
         return False
-    
-    current_hash = calculate_file_hash(PDF_PATH)
-    cache_info = load_cache_info()
-    
-    if cache_info is None:
-        print("캐시 정보가 없습니다.")
+    if status["status"] == "invalid":
+        print(f"PDF 파일이 변경되었습니다. (이전 해시: {status['cached_hash']}, 현재 해시: {status['current_hash']})")
         return False
-    
-    if cache_info.get("file_hash") != current_hash:
-        print(f"PDF 파일이 변경되었습니다. (이전 해시: {cache_info.get('file_hash')[:8]}..., 현재 해시: {current_hash[:8]}...)")
-        return False
-    
-    print(f"캐시가 유효합니다. (파일 해시: {current_hash[:8]}...)")
+    print(f"캐시가 유효합니다. (파일 해시: {status['current_hash']})")
     return True
 
 # 1. PDF 청크 분할 함수 (pypdf 사용)
-def chunk_pdf_to_text_chunks(pdf_path, chunk_size=1000, chunk_overlap=100):
-    """PDF를 텍스트 청크로 분할합니다."""
+# PDF 파싱 프로세스 수와 작업 하나가 맡는 페이지 수
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", str(os.cpu_count() or 1)))
+INGEST_PAGES_PER_TASK = 16
+# 청크 분할 방식: "chars"(글자 수 기준, 기존 벡터DB와 같은 방식) 또는 "tokens"(토큰 예산 + 문장/문단 경계)
+CHUNK_MODE = os.getenv("CHUNK_MODE", "chars")
+CHUNK_MODES = ("chars", "tokens")
+CHAR_CHUNK_SIZE = 1000
+CHAR_CHUNK_OVERLAP = 100
+
+def split_text_into_chunks(text, chunk_size=1000, chunk_overlap=100):
+    """텍스트를 단어 단위로 chunk_size 글자 이내 청크로 나누고, 이전 청크의 끝 chunk_overlap 글자를 앞에 붙입니다.
+
+    단어 리스트를 모아 한 번에 join하므로 페이지 길이에 선형 시간입니다.
+    """
+    chunks = []
+    current_words = []
+    current_len = 0  # 예전 구현의 len(current_chunk)와 같은 값 (단어마다 공백 1칸 포함)
+    for word in text.split():
+        if current_len + len(word) + 1 <= chunk_size:
+            current_words.append(word)
+            current_len += len(word) + 1
+        else:
+            if current_words:
+                chunks.append(" ".join(current_words))
+            current_words = [word]
+            current_len = len(word) + 1
+    if current_words:
+        chunks.append(" ".join(current_words))
+
+    # 청크 오버랩 처리
+    if chunk_overlap <= 0:
+        return chunks
+    final_chunks = chunks[:1]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # 이전 청크의 끝 부분을 현재 청크 앞에 추가
+        overlap_text = previous[-chunk_overlap:] if len(previous) > chunk_overlap else previous
+        final_chunks.append(overlap_text + " " + chunk)
+    return final_chunks
+
+def _resolve_chunking(mode, chunk_size, chunk_overlap):
+    """청크 분할 방식과 크기/오버랩을 정합니다. 크기를 주지 않으면 방식별 기본값(글자 또는 토큰)을 씁니다."""
+    mode = mode or CHUNK_MODE
+    if mode not in CHUNK_MODES:
+        raise ValueError(f"지원하지 않는 청크 분할 방식입니다: {mode} (가능: {', '.join(CHUNK_MODES)})")
+    if mode == "tokens":
+        defaults = (TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP)
+    else:
+        defaults = (CHAR_CHUNK_SIZE, CHAR_CHUNK_OVERLAP)
+    return (mode,
+            defaults[0] if chunk_size is None else chunk_size,
+            defaults[1] if chunk_overlap is None else chunk_overlap)
+
+# 프로세스(작업자)마다 최근에 연 PdfReader를 보관: 같은 PDF의 페이지 묶음 작업이 파일을 다시 열고 파싱하지 않도록 함
+# 작업은 PDF 순서대로 들어오므로 작업자 하나가 동시에 다루는 PDF는 몇 개뿐임
+INGEST_READER_CACHE_SIZE = 2
+_pdf_readers = OrderedDict()
+_pdf_readers_lock = threading.Lock()
+
+def _open_pdf(pdf_path):
+    """이 프로세스에서 이미 연 PdfReader가 있으면 재사용하고, 없으면 열어서 보관합니다 (파일이 바뀌었으면 다시 엶)."""
+    key = (os.path.abspath(pdf_path), os.path.getmtime(pdf_path))
+    with _pdf_readers_lock:
+        reader = _pdf_readers.get(key)
+        if reader is not None:
+            _pdf_readers.move_to_end(key)
+            return reader
     reader = PdfReader(pdf_path)
+    with _pdf_readers_lock:
+        _pdf_readers[key] = reader
+        while len(_pdf_readers) > INGEST_READER_CACHE_SIZE:
+            _pdf_readers.popitem(last=False)
+    return reader
+
+def _pdf_page_count(pdf_path):
+    """PDF 페이지 수 (프로세스 풀 작업 단위, 연 PdfReader는 같은 작업자의 페이지 작업이 재사용)."""
+    return len(_open_pdf(pdf_path).pages)
+
+def _chunk_pdf_pages(pdf_path, start_page, end_page, chunk_size, chunk_overlap, mode="chars"):
+    """PDF의 [start_page, end_page) 페이지를 파싱해 청크 dict 리스트를 반환합니다 (프로세스 풀 작업 단위).
+
+    mode="tokens"이면 chunk_size/chunk_overlap은 토큰 수이고, 메타데이터에 token_count를 기록합니다.
+    """
+    reader = _open_pdf(pdf_path)
     text_chunks = []
-    
-    for page_num, page in enumerate(reader.pages):
-        text = page.extract_text()
-        if not text.strip():
+    for page_num in range(start_page, min(end_page, len(reader.pages))):
+        text = reader.pages[page_num].extract_text()
+        if not text or not text.strip():
             continue
-            
-        # 텍스트를 청크로 분할
-        words = text.split()
-        current_chunk = ""
-        chunks = []
-        
-        for word in words:
-            if len(current_chunk) + len(word) + 1 <= chunk_size:
-                current_chunk += (word + " ")
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = word + " "
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        # 청크 오버랩 처리
-        final_chunks = []
-        for i, chunk in enumerate(chunks):
-            if i > 0 and chunk_overlap > 0:
-                # 이전 청크의 끝 부분을 현재 청크 앞에 추가
-                overlap_text = chunks[i-1][-chunk_overlap:] if len(chunks[i-1]) > chunk_overlap else chunks[i-1]
-                chunk = overlap_text + " " + chunk
-            
+        if mode == "tokens":
+            for chunk, token_count in split_text_into_token_chunks(text, chunk_size, chunk_overlap):
+                text_chunks.append({
+                    'page_content': chunk,
+                    'metadata': {'page': page_num + 1, 'token_count': token_count}
+                })
+            continue
+        for chunk in split_text_into_chunks(text, chunk_size, chunk_overlap):
             # Document 객체 대신 딕셔너리 사용
-            final_chunks.append({
+            text_chunks.append({
                 'page_content': chunk,
                 'metadata': {'page': page_num + 1}
             })
-        
-        text_chunks.extend(final_chunks)
-    
     return text_chunks
 
+def chunk_pdf_to_text_chunks(pdf_path, chunk_size=None, chunk_overlap=None, mode=None):
+    """PDF를 텍스트 청크로 분할합니다. mode를 주지 않으면 CHUNK_MODE를 따릅니다."""
+    mode, chunk_size, chunk_overlap = _resolve_chunking(mode, chunk_size, chunk_overlap)
+    return _chunk_pdf_pages(pdf_path, 0, _pdf_page_count(pdf_path), chunk_size, chunk_overlap, mode)
+
+def iter_pdf_chunks(pdf_paths, chunk_size=None, chunk_overlap=None, max_workers=None, mode=None):
+    """여러 PDF를 페이지 묶음 단위로 프로세스 풀에서 파싱하며, PDF 순서대로 (pdf_path, 청크 리스트)를 하나씩 내보냅니다.
+
+    동시에 진행 중인 작업 수를 제한하므로, 소비하는 쪽(임베딩)이 느려도 파싱 결과가 한꺼번에 쌓이지 않습니다.
+    """
+    mode, chunk_size, chunk_overlap = _resolve_chunking(mode, chunk_size, chunk_overlap)
+    max_workers = max_workers or INGEST_MAX_WORKERS
+
+    def _tasks(page_counts):
+        for pdf_path, page_count in zip(pdf_paths, page_counts):
+            starts = list(range(0, page_count, INGEST_PAGES_PER_TASK)) or [0]
+            for start in starts:
+                yield pdf_path, start, start + INGEST_PAGES_PER_TASK, start == starts[-1]
+
+    if max_workers <= 1:
+        pending_chunks = []
+        for pdf_path, start, end, is_last in _tasks(map(_pdf_page_count, pdf_paths)):
+            pending_chunks.extend(_chunk_pdf_pages(pdf_path, start, end, chunk_size, chunk_overlap, mode))
+            if is_last:
+                yield pdf_path, pending_chunks
+                pending_chunks = []
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        # 페이지 수도 작업자에서 병렬로 셈 (PDF 순서대로 받으며, 앞 PDF의 페이지 작업은 뒤 PDF를 세는 동안 시작됨)
+        task_iter = _tasks(executor.map(_pdf_page_count, pdf_paths))
+        pending_chunks = []
+
+        def _submit_next():
+            task = next(task_iter, None)
+            if task is not None:
+                pdf_path, start, end, is_last = task
+                future = executor.submit(_chunk_pdf_pages, pdf_path, start, end, chunk_size, chunk_overlap, mode)
+                in_flight.append((pdf_path, is_last, future))
+
+        for _ in range(max_workers * 2):
+            _submit_next()
+        while in_flight:
+            pdf_path, is_last, future = in_flight.popleft()
+            pending_chunks.extend(future.result())
+            _submit_next()
+            if is_last:
+                yield pdf_path, pending_chunks
+                pending_chunks = []
+
+# Gemini 배치 임베딩 API의 요청당 최대 텍스트 수
+EMBED_BATCH_SIZE = 100
+# 문서 임베딩 병렬 처리 설정
+EMBED_MAX_WORKERS = 4
+EMBED_REQUESTS_PER_MINUTE = 300
+EMBED_MAX_RETRIES = 5
+
+class _RateLimiter:
+    """여러 스레드가 공유하는 요청 간격 제한기 (분당 요청 수 기준)."""
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(self._next_time, now)
+            self._next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+def _embedding_batch_hash(model, texts):
+    """체크포인트에서 배치를 식별하기 위한 (모델 + 배치 텍스트) 해시."""
+    return hashlib.sha256((model + "\x1f" + "\x1e".join(texts)).encode("utf-8")).hexdigest()
+
+def _load_embedding_checkpoint(checkpoint_path):
+    """임베딩 체크포인트(JSONL)를 읽어 {배치 해시: 임베딩 리스트}를 반환합니다. 마지막 줄이 잘렸으면 무시합니다."""
+    completed = {}
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return completed
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                completed[record["hash"]] = record["embeddings"]
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return completed
+
 # Gemini 임베딩 클래스
 class GeminiEmbeddings:
-    def __init__(self, gemini_api_key, model="models/embedding-001"):
+    def __init__(self, gemini_api_key, model="models/embedding-001", query_cache=None, doc_store=None):
         self.api_key = gemini_api_key
         self.model = model
+        # 질문 임베딩 캐시 (기본값: 프로세스 공유 LRU + TTL 캐시, embedding_cache.py 참고)
+        self.query_cache = query_cache if query_cache is not None else get_default_query_cache()
+        # 문서 임베딩 캐시 (None이면 처음 사용할 때 공유 SQLite 캐시를 사용)
+        self.doc_store = doc_store
         genai.configure(api_key=gemini_api_key)
 
     def embed_query(self, text):
+        cached = self.query_cache.get(self.model, "retrieval_query", text)
+        if cached is not None:
+            return cached
         response = genai.embed_content(model=self.model, content=text, task_type="retrieval_query")
+        self.query_cache.put(self.model, "retrieval_query", text, response["embedding"])
         return response["embedding"]
 
-    def embed_documents(self, texts):
-        embeddings = []
-        for text in texts:
-            response = genai.embed_content(model=self.model, content=text, task_type="retrieval_document")
-            embeddings.append(response["embedding"])
-        return embeddings
+    def embed_queries(self, texts):
+        """여러 쿼리를 배치 호출로 임베딩합니다. 캐시에 없는 쿼리만 EMBED_BATCH_SIZE개씩 요청합니다."""
+        embeddings = [self.query_cache.get(self.model, "retrieval_query", text) for text in texts]
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        fetched = {}
+        for start in range(0, len(missing), EMBED_BATCH_SIZE):
+            batch = missing[start:start + EMBED_BATCH_SIZE]
+            response = genai.embed_content(model=self.model, content=batch, task_type="retrieval_query")
+            for text, embedding in zip(batch, response["embedding"]):
+                self.query_cache.put(self.model, "retrieval_query", text, embedding)
+                fetched[text] = embedding
+        return [embedding if embedding is not None else fetched[text] for text, embedding in zip(texts, embeddings)]
+
+    def embed_documents(self, texts, checkpoint_path=None, max_workers=EMBED_MAX_WORKERS, requests_per_minute=EMBED_REQUESTS_PER_MINUTE):
+        """문서들을 임베딩합니다. 문서 임베딩 캐시에 있는 청크는 재사용하고, 새 청크만 API로 임베딩합니다."""
+        texts = list(texts)
+        store = self.doc_store if self.doc_store is not None else get_default_document_store()
+        try:
+            embeddings = store.get_many(self.model, texts)
+        except Exception as e:
+            print(f"문서 임베딩 캐시를 사용할 수 없습니다: {e}")
+            store, embeddings = None, [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if texts:
+            print(f"문서 임베딩 캐시 적중: {len(texts) - len(missing)}/{len(texts)}개 (새로 임베딩할 청크 {len(missing)}개)")
+        fetched = {}
+        if missing:
+            new_embeddings = self._embed_documents_batched(missing, checkpoint_path, max_workers, requests_per_minute, store)
+            fetched = dict(zip(missing, new_embeddings))
+        return [embedding if embedding is not None else fetched[text] for text, embedding in zip(texts, embeddings)]
+
+    def _embed_documents_batched(self, texts, checkpoint_path, max_workers, requests_per_minute, store=None):
+        """문서들을 EMBED_BATCH_SIZE개 배치로 나눠 스레드 풀에서 병렬 임베딩합니다.
+
+        checkpoint_path를 주면 완료된 배치를 JSONL로 기록하고, 다시 실행하면 기록된 배치는 건너뜁니다.
+        완료된 배치는 문서 임베딩 캐시(store)에도 바로 저장합니다.
+        """
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        results = [None] * len(batches)
+        completed = _load_embedding_checkpoint(checkpoint_path)
+        pending = []
+        for i, batch in enumerate(batches):
+            batch_hash = _embedding_batch_hash(self.model, batch)
+            if len(completed.get(batch_hash, [])) == len(batch):
+                results[i] = completed[batch_hash]
+            else:
+                pending.append((i, batch_hash, batch))
+        if completed:
+            print(f"임베딩 체크포인트에서 {len(batches) - len(pending)}/{len(batches)}개 배치를 복원했습니다.")
+
+        limiter = _RateLimiter(requests_per_minute)
+        checkpoint_file = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path and pending else None
+        first_error = None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {
+                    executor.submit(self._embed_batch_with_retry, batch, limiter): (i, batch_hash, batch)
+                    for i, batch_hash, batch in pending
+                }
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    i, batch_hash, batch = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        # 실패한 배치가 있어도 나머지 완료 배치는 체크포인트에 남기고 마지막에 예외 발생
+                        first_error = first_error or e
+                        continue
+                    if store is not None:
+                        store.put_many(self.model, batch, results[i])
+                    if checkpoint_file:
+                        checkpoint_file.write(json.dumps({"hash": batch_hash, "embeddings": results[i]}) + "\n")
+                        checkpoint_file.flush()
+                    if done_count % 10 == 0 or done_count == len(pending):
+                        print(f"문서 임베딩 진행: {done_count}/{len(pending)} 배치")
+        finally:
+            if checkpoint_file:
+                checkpoint_file.close()
+        if first_error is not None:
+            raise first_error
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    def _embed_batch_with_retry(self, batch, limiter):
+        """한 배치를 임베딩합니다. 실패하면 지수 백오프(+지터)로 EMBED_MAX_RETRIES번까지 재시도합니다."""
+        for attempt in range(EMBED_MAX_RETRIES):
+            limiter.wait()
+            try:
+                response = genai.embed_content(model=self.model, content=batch, task_type="retrieval_document")
+                return response["embedding"]
+            except Exception as e:
+                if attempt == EMBED_MAX_RETRIES - 1:
+                    raise
+                delay = min(60, 2 ** attempt) + random.uniform(0, 1)
+                print(f"[임베딩 배치 오류] 시도 {attempt + 1}/{EMBED_MAX_RETRIES} 실패: {e} ({delay:.1f}초 후 재시도)")
+                time.sleep(delay)
+
+def _doc_text(doc):
+    """문서(dict 또는 문자열)에서 본문 텍스트를 꺼냅니다."""
+    return doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc)
+
+def _embed_queries(embeddings, texts):
+    """임베딩 객체 종류에 맞게 여러 쿼리를 가능한 한 한 번의 배치 호출로 임베딩합니다."""
+    if hasattr(embeddings, 'embed_queries'):
+        return embeddings.embed_queries(texts)
+    try:
+        # LangChain GoogleGenerativeAIEmbeddings는 task_type을 지정한 배치 임베딩을 지원
+        return embeddings.embed_documents(list(texts), task_type="retrieval_query")
+    except TypeError:
+        return [embeddings.embed_query(text) for text in texts]
 
 # SimpleVectorDB는 동일하게 사용 (임베딩 객체만 교체)
 class SimpleVectorDB:
-    def __init__(self, documents, embeddings=None, doc_embeddings=None):
+    def __init__(self, documents, embeddings=None, doc_embeddings=None, embedding_model=None):
         self.documents = documents
         self.embeddings = embeddings
         self.doc_embeddings = doc_embeddings
+        # doc_embeddings를 만든 임베딩 모델 (예전 pickle에는 없음)
+        self.embedding_model = embedding_model or getattr(embeddings, 'model', None)
+        # 소스별 매니페스트: [{"path", "hash", "start", "end"}] (documents[start:end]가 해당 소스의 청크)
+        self.sources = []
+        self.ann_index = None
+        self._metadata_index = None
+        # 선택적 압축 검색 행렬 (quantize 참고)
+        self.quantized = None
+        self.rescore = True
+        # 파일에서 로드한 경우 코퍼스 id(확장자 뺀 절대 경로)와 스냅샷 버전 (load_vector_db에서 설정)
+        self.corpus_id = None
+        self.version = None
+        self._build_search_matrix()
+
+    def _build_search_matrix(self):
+        """doc_embeddings를 정규화된 float32 행렬로 한 번만 변환해 둡니다.
+
+        변환 후 doc_embeddings도 같은 행렬을 가리키게 하여, float 리스트를 메모리에 따로 들고 있지 않습니다.
+        """
+        if self.doc_embeddings is None or len(self.doc_embeddings) == 0:
+            self._matrix = None
+            return
+        self._matrix = normalize_rows(self.doc_embeddings)
+        self.doc_embeddings = self._matrix
+
+    def _ensure_search_matrix(self):
+        """검색 행렬이 없으면 (저장된 임베딩이 없는 경우) 문서를 한 번 임베딩해 둡니다.
+
+        정확 행렬을 내려놓은 경우 (quantize(rescore=False)) 압축 행렬을 반환합니다. 행 인덱싱은 필요한 행만 복원하므로
+        전체 행렬을 매번 복원하지 않습니다 (행렬곱에는 쓰지 않음).
+        """
+        if getattr(self, '_matrix', None) is None:
+            if getattr(self, 'quantized', None) is not None:
+                return self.quantized
+            if self.doc_embeddings is None or len(self.doc_embeddings) == 0:
+                self.doc_embeddings = self.embeddings.embed_documents([_doc_text(doc) for doc in self.documents])
+            self._build_search_matrix()
+        return self._matrix
+
+    @classmethod
+    def from_matrix(cls, documents, matrix, embeddings=None, embedding_model=None):
+        """이미 정규화된 float32 행렬(메모리 맵 포함)로 벡터DB를 만듭니다. 행렬은 복사하지 않습니다."""
+        vector_db = cls.__new__(cls)
+        vector_db.documents = documents
+        vector_db.embeddings = embeddings
+        vector_db.doc_embeddings = matrix
+        vector_db.embedding_model = embedding_model
+        vector_db.sources = []
+        vector_db._matrix = matrix
+        vector_db.ann_index = None
+        vector_db._metadata_index = None
+        vector_db.quantized = None
+        vector_db.rescore = True
+        vector_db.corpus_id = None
+        vector_db.version = None
+        return vector_db
+
+    def build_ann_index(self, n_lists=None, nprobe=None, **kwargs):
+        """검색 행렬로 IVF 인덱스를 빌드해 연결하고 반환합니다."""
+        index = IVFIndex.build(self._ensure_search_matrix(), n_lists=n_lists, **kwargs)
+        if nprobe:
+            index.nprobe = nprobe
+        self.ann_index = index
+        return index
+
+    def attach_ann_index(self, index):
+        """미리 빌드된 IVF 인덱스를 연결합니다. 문서 수가 다르면 연결하지 않습니다."""
+        if index.count != len(self.documents):
+            print(f"ANN 인덱스 문서 수({index.count})가 벡터DB({len(self.documents)})와 달라 정확 검색을 사용합니다.")
+            return False
+        self.ann_index = index
+        return True
+
+    def quantize(self, dtype="int8", rescore=True):
+        """검색 행렬을 float16 또는 int8(행별 scale)로 압축해 후보 검색에 사용합니다.
+
+        rescore=True이면 압축 행렬로 k × RESCORE_FACTOR개 후보를 고른 뒤 정확한 float32 행렬로 다시 점수화합니다.
+        정확 행렬이 메모리 맵(.vdb)이면 후보 행만 디스크에서 읽으므로 상주 메모리는 압축 행렬 크기입니다.
+        정확 행렬이 메모리에 있으면(pickle) 임시 파일로 내보내고 메모리 맵으로 다시 열어, 메모리에서 내려놓습니다.
+        rescore=False이면 정확 행렬을 메모리에서 내려놓습니다.
+        """
+        self.quantized = QuantizedMatrix.build(self._ensure_search_matrix(), dtype)
+        self.rescore = rescore
+        if not rescore:
+            self._matrix = None
+            self.doc_embeddings = None
+        elif not isinstance(self._matrix, np.memmap):
+            self._spill_exact_matrix()
+        return self.quantized
+
+    def _spill_exact_matrix(self):
+        """메모리에 있는 정확 행렬을 임시 .npy 파일로 쓰고 메모리 맵으로 바꿉니다 (재점수화할 후보 행만 디스크에서 읽음)."""
+        fd, spill_path = tempfile.mkstemp(prefix="vector_db_", suffix=".npy")
+        os.close(fd)
+        try:
+            np.save(spill_path, self._matrix)
+            self._matrix = np.load(spill_path, mmap_mode='r')
+            self.doc_embeddings = self._matrix
+        except OSError as e:
+            print(f"정확 행렬을 메모리 맵으로 옮기지 못했습니다. 메모리에 유지합니다: {e}")
+            return
+        try:
+            # 매핑은 파일을 지워도 유지됨 (지울 수 없는 OS에서는 임시 디렉터리에 남음)
+            os.remove(spill_path)
+        except OSError:
+            pass
+
+    def _rescore(self, candidates, query, k):
+        """압축 행렬로 고른 후보 행만 정확 행렬로 다시 점수화해 상위 k개를 반환합니다."""
+        candidates = np.sort(candidates)  # 메모리 맵 행렬을 순차적으로 읽도록 정렬
+        exact_scores = np.asarray(self._matrix[candidates], dtype=np.float32) @ query
+        top = top_k_indices(exact_scores, k)
+        return candidates[top], exact_scores[top]
+
+    def _search_quantized(self, scores, query, k):
+        """압축 행렬 점수에서 후보를 고르고, 정확 행렬이 있으면 후보만 다시 점수화합니다."""
+        if not self.rescore or getattr(self, '_matrix', None) is None:
+            top_indices = top_k_indices(scores, k)
+            return top_indices, scores[top_indices]
+        return self._rescore(top_k_indices(scores, k * RESCORE_FACTOR), query, k)
+
+    def _search_quantized_ann(self, ann_index, query, k, nprobe=None):
+        """IVF 후보를 압축 행렬로 점수화하고 (압축 행렬 인덱싱은 복원한 float32 행을 돌려줌), 정확 행렬이 있으면 다시 점수화합니다."""
+        if not self.rescore or getattr(self, '_matrix', None) is None:
+            return ann_index.search(self.quantized, query, k, nprobe=nprobe)
+        candidates, _ = ann_index.search(self.quantized, query, k * RESCORE_FACTOR, nprobe=nprobe)
+        return self._rescore(candidates, query, k)
+
+    def similarity_search_by_vector(self, query_embedding, k=3, nprobe=None, exact=False):
+        """쿼리 임베딩으로 상위 k개 문서의 (인덱스 배열, 코사인 점수 배열)을 반환합니다.
+
+        ANN 인덱스가 연결되어 있고 문서가 ANN_MIN_DOCUMENTS개 이상이면 IVF 검색을, 아니면 정확 검색을 사용합니다.
+        압축 행렬이 있으면(quantize) 후보 점수화에 압축 행렬을 사용합니다.
+        """
+        query = normalize_rows(query_embedding)[0]
+        quantized = getattr(self, 'quantized', None)
+        if exact and quantized is not None and getattr(self, '_matrix', None) is None:
+            raise ValueError("정확 행렬을 내려놓은 벡터DB(quantize(rescore=False))에서는 정확 검색을 할 수 없습니다.")
+        matrix = quantized if quantized is not None and not exact else self._ensure_search_matrix()
+        ann_index = getattr(self, 'ann_index', None)
+        if ann_index is not None and not exact and matrix.shape[0] >= ANN_MIN_DOCUMENTS:
+            if matrix is quantized:
+                return self._search_quantized_ann(ann_index, query, k, nprobe)
+            return ann_index.search(matrix, query, k, nprobe=nprobe)
+        if matrix is quantized:
+            return self._search_quantized(quantized.dot(query), query, k)
+        scores = matrix @ query
+        top_indices = top_k_indices(scores, k)
+        return top_indices, scores[top_indices]
+
+    def similarity_search_by_vectors(self, query_embeddings, ks):
+        """여러 쿼리 임베딩을 한 번의 행렬곱으로 점수화해 쿼리별 (인덱스 배열, 점수 배열)을 반환합니다."""
+        queries = normalize_rows(query_embeddings)
+        quantized = getattr(self, 'quantized', None)
+        matrix = quantized if quantized is not None else self._ensure_search_matrix()
+        ann_index = getattr(self, 'ann_index', None)
+        if ann_index is not None and matrix.shape[0] >= ANN_MIN_DOCUMENTS:
+            if matrix is quantized:
+                return [self._search_quantized_ann(ann_index, query, k) for query, k in zip(queries, ks)]
+            return [ann_index.search(matrix, query, k) for query, k in zip(queries, ks)]
+        if matrix is quantized:
+            scores = quantized.dot(queries)
+            return [self._search_quantized(row, query, k) for row, query, k in zip(scores, queries, ks)]
+        scores = queries @ matrix.T
+        results = []
+        for row, k in zip(scores, ks):
+            top_indices = top_k_indices(row, k)
+            results.append((top_indices, row[top_indices]))
+        return results
+
+    def similarity_search_many(self, queries, k=3):
+        """여러 쿼리를 배치 임베딩 1회 + 행렬곱 1회로 검색해 쿼리별 문서 리스트를 반환합니다. k는 정수 또는 쿼리별 리스트입니다."""
+        ks = list(k) if isinstance(k, (list, tuple)) else [k] * len(queries)
+        if not queries:
+            return []
+        if self.embeddings is None:
+            print("임베딩 객체가 없습니다. 새로 생성합니다...")
+            return [self.documents[:n] for n in ks]
+        query_embeddings = _embed_queries(self.embeddings, queries)
+        results = self.similarity_search_by_vectors(query_embeddings, ks)
+        return [[self.documents[i] for i in top_indices] for top_indices, _ in results]
 
     def similarity_search(self, query, k=3):
         if self.embeddings is None:
             print("임베딩 객체가 없습니다. 새로 생성합니다...")
             return self.documents[:k]
         query_embedding = self.embeddings.embed_query(query)
-        doc_texts = [doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in self.documents]
-        doc_embeddings = self.doc_embeddings or self.embeddings.embed_documents(doc_texts)
-        similarities = [np.dot(query_embedding, doc_emb) / (np.linalg.norm(query_embedding) * np.linalg.norm(doc_emb)) for doc_emb in doc_embeddings]
-        top_indices = np.argsort(similarities)[-k:][::-1]
+        top_indices, _ = self.similarity_search_by_vector(query_embedding, k=k)
         return [self.documents[i] for i in top_indices]
+
+    def get_metadata_index(self):
+        """메타데이터 인덱스(category → gu_name → 문서 id, 키워드 포스팅)를 처음 호출 때 한 번 만들어 반환합니다."""
+        index = getattr(self, '_metadata_index', None)
+        if index is None:
+            index = DocumentMetadataIndex(self.documents, terms=METADATA_INDEX_TERMS)
+            self._metadata_index = index
+        return index
+
+    def source_paths(self):
+        """매니페스트에 기록된 소스 경로 → 항목 dict를 반환합니다."""
+        return {entry['path']: entry for entry in getattr(self, 'sources', None) or []}
+
+    def add_source(self, path, source_hash, chunks, chunk_embeddings):
+        """새 소스의 청크를 추가한 새 스냅샷을 반환합니다 (기존 객체는 바뀌지 않음)."""
+        if path in self.source_paths():
+            raise ValueError(f"이미 등록된 소스입니다: {path}")
+        return self._with_sources_changed([], [(path, source_hash, chunks, chunk_embeddings)])
+
+    def remove_source(self, path):
+        """해당 소스의 청크를 뺀 새 스냅샷을 반환합니다."""
+        return self._with_sources_changed([path], [])
+
+    def replace_source(self, path, source_hash, chunks, chunk_embeddings):
+        """해당 소스의 청크를 새 청크로 바꾼 새 스냅샷을 반환합니다 (없으면 추가)."""
+        return self._with_sources_changed([path], [(path, source_hash, chunks, chunk_embeddings)])
+
+    def _with_sources_changed(self, removed_paths, updates):
+        """removed_paths와 갱신 대상 소스를 빼고, updates [(path, hash, chunks, embeddings)]를 뒤에 붙인 새 벡터DB를 만듭니다.
+
+        남는 소스의 청크와 정규화된 임베딩 행은 그대로 복사하므로 다시 임베딩하지 않습니다.
+        어느 소스에도 속하지 않는 청크(예전 벡터DB를 병합한 경우 등)는 관리되지 않는 블록으로 맨 앞에 그대로 유지합니다.
+        """
+        drop = set(removed_paths) | {update[0] for update in updates}
+        documents, blocks, sources = [], [], []
+        matrix = self._ensure_search_matrix() if self.documents else None
+        entries = getattr(self, 'sources', None) or []
+        covered = np.zeros(len(self.documents), dtype=bool)
+        for entry in entries:
+            covered[entry['start']:entry['end']] = True
+        unmanaged = np.flatnonzero(~covered)
+        if len(unmanaged):
+            print(f"소스 매니페스트에 없는 청크 {len(unmanaged)}개는 그대로 유지합니다.")
+            documents.extend(self.documents[i] for i in unmanaged)
+            blocks.append(np.asarray(matrix[unmanaged], dtype=np.float32))
+        for entry in entries:
+            if entry['path'] in drop:
+                continue
+            start = len(documents)
+            documents.extend(self.documents[entry['start']:entry['end']])
+            if entry['end'] > entry['start']:
+                blocks.append(np.asarray(matrix[entry['start']:entry['end']], dtype=np.float32))
+            sources.append(dict(entry, start=start, end=len(documents)))
+        for path, source_hash, chunks, chunk_embeddings in updates:
+            if len(chunks) != len(chunk_embeddings):
+                raise ValueError(f"청크 수({len(chunks)})와 임베딩 수({len(chunk_embeddings)})가 다릅니다: {path}")
+            start = len(documents)
+            documents.extend(chunks)
+            if chunks:
+                blocks.append(normalize_rows(chunk_embeddings))
+            sources.append({"path": path, "hash": source_hash, "start": start, "end": len(documents)})
+        new_matrix = np.ascontiguousarray(np.concatenate(blocks)) if blocks else None
+        vector_db = SimpleVectorDB.from_matrix(documents, new_matrix, self.embeddings, self.embedding_model)
+        vector_db.sources = sources
+        return vector_db
+
     def __getstate__(self):
         state = self.__dict__.copy()
         state['embeddings'] = None
+        # 검색 행렬과 ANN 인덱스는 다시 만들거나 따로 저장하므로 pickle에 넣지 않음
+        state.pop('_matrix', None)
+        state.pop('ann_index', None)
+        state.pop('_metadata_index', None)
+        # 압축 행렬은 로드할 때 다시 만들되, 정확 행렬을 내려놓았다면 복원해서 저장 (메모리 맵은 일반 배열로 저장됨)
+        if state.get('quantized') is not None and state.get('doc_embeddings') is None:
+            state['doc_embeddings'] = self.quantized[:]
+        elif isinstance(state.get('doc_embeddings'), np.memmap):
+            state['doc_embeddings'] = np.array(state['doc_embeddings'])
+        state['quantized'] = None
+        state['rescore'] = True
         return state
+
     def __setstate__(self, state):
         self.__dict__.update(state)
+        self.__dict__.setdefault('sources', [])
+        self.ann_index = None
+        self._metadata_index = None
+        self.quantized = None
+        self.rescore = True
+        self._build_search_matrix()
 
 # 2. 임베딩 및 벡터DB 저장/로드 함수
 def get_or_create_vector_db(gemini_api_key):
@@ -1185,36 +1655,297 @@ def get_or_create_vector_db(gemini_api_key):
     vector_db.embeddings = embeddings
     return vector_db
 
+# 메모리 맵 벡터DB 포맷 (디렉터리: meta.json + embeddings.npy + documents.jsonl)
+VECTOR_DB_FORMAT_VERSION = 1
+VECTOR_DB_DIR_SUFFIX = ".vdb"
+VECTOR_DB_META_FILE = "meta.json"
+VECTOR_DB_EMBEDDINGS_FILE = "embeddings.npy"
+VECTOR_DB_DOCUMENTS_FILE = "documents.jsonl"
+
+def save_vector_db_mmap(vector_db, out_dir, model="models/embedding-001"):
+    """SimpleVectorDB를 메모리 맵 디렉터리 포맷으로 저장합니다 (정규화된 float32 행렬 + 문서 JSONL)."""
+    has_vectors = getattr(vector_db, '_matrix', None) is not None or getattr(vector_db, 'quantized', None) is not None
+    if not has_vectors and (vector_db.doc_embeddings is None or len(vector_db.doc_embeddings) == 0):
+        raise ValueError("저장된 문서 임베딩이 없는 벡터DB는 변환할 수 없습니다.")
+    matrix = vector_db._ensure_search_matrix()
+    if matrix.shape[0] != len(vector_db.documents):
+        raise ValueError(f"문서 수({len(vector_db.documents)})와 임베딩 수({matrix.shape[0]})가 다릅니다.")
+    if isinstance(matrix, QuantizedMatrix):
+        print(f"정확 행렬이 없어 압축 행렬({matrix.dtype})을 복원해 저장합니다.")
+
+    # 임시 디렉터리에 모두 쓴 뒤 교체하여, 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함
+    tmp_dir = out_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    # 블록 단위로 써서 압축 행렬/메모리 맵 행렬을 한 번에 다 올리지 않음
+    out = np.lib.format.open_memmap(os.path.join(tmp_dir, VECTOR_DB_EMBEDDINGS_FILE), mode='w+', dtype=np.float32, shape=matrix.shape)
+    for start in range(0, matrix.shape[0], 8192):
+        out[start:start + 8192] = matrix[start:start + 8192]
+    out.flush()
+    del out
+    with open(os.path.join(tmp_dir, VECTOR_DB_DOCUMENTS_FILE), 'w', encoding='utf-8') as f:
+        for doc in vector_db.documents:
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    meta = {
+        "format_version": VECTOR_DB_FORMAT_VERSION,
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "dtype": "float32",
+        "normalized": True,
+        "model": getattr(vector_db, 'embedding_model', None) or model,
+        "sources": getattr(vector_db, 'sources', []),
+    }
+    with open(os.path.join(tmp_dir, VECTOR_DB_META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    old_dir = out_dir + ".old"
+    if os.path.exists(out_dir):
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    return meta
+
+def load_vector_db_mmap(db_dir, embeddings=None, mmap=True):
+    """메모리 맵 디렉터리 포맷 벡터DB를 로드합니다. 임베딩 행렬은 OS 페이지 캐시를 공유합니다."""
+    with open(os.path.join(db_dir, VECTOR_DB_META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get("format_version") != VECTOR_DB_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 벡터DB 포맷 버전입니다: {meta.get('format_version')}")
+    matrix = np.load(os.path.join(db_dir, VECTOR_DB_EMBEDDINGS_FILE), mmap_mode='r' if mmap else None)
+    with open(os.path.join(db_dir, VECTOR_DB_DOCUMENTS_FILE), 'r', encoding='utf-8') as f:
+        documents = [json.loads(line) for line in f if line.strip()]
+    if len(documents) != matrix.shape[0]:
+        raise ValueError(f"문서 수({len(documents)})와 임베딩 수({matrix.shape[0]})가 다릅니다: {db_dir}")
+    vector_db = SimpleVectorDB.from_matrix(documents, matrix, embeddings, embedding_model=meta.get("model"))
+    vector_db.sources = meta.get("sources", [])
+    return vector_db
+
+def mmap_dir_for(pkl_path):
+    """pickle 경로에 대응하는 메모리 맵 디렉터리 경로를 반환합니다 (예: 다문화.pkl → 다문화.vdb)."""
+    return os.path.splitext(pkl_path)[0] + VECTOR_DB_DIR_SUFFIX
+
+def convert_pickle_to_mmap(pkl_path, out_dir=None):
+    """기존 SimpleVectorDB pickle을 메모리 맵 디렉터리 포맷으로 변환합니다."""
+    out_dir = out_dir or mmap_dir_for(pkl_path)
+    with open(pkl_path, 'rb') as f:
+        vector_db = pickle.load(f)
+    meta = save_vector_db_mmap(vector_db, out_dir)
+    print(f"벡터DB 변환 완료: {pkl_path} → {out_dir} (문서 {meta['count']}개, 차원 {meta['dim']})")
+    return out_dir
+
+def resolve_vector_db_path(pkl_path):
+    """pickle보다 오래되지 않은 메모리 맵 디렉터리가 있으면 그 경로를, 없으면 pickle 경로를 반환합니다."""
+    db_dir = mmap_dir_for(pkl_path)
+    meta_path = os.path.join(db_dir, VECTOR_DB_META_FILE)
+    if os.path.exists(meta_path):
+        if not os.path.exists(pkl_path) or os.path.getmtime(meta_path) >= os.path.getmtime(pkl_path):
+            return db_dir
+    return pkl_path
+
+def load_vector_db(path, gemini_api_key=None, quantization=None, rescore=True):
+    """벡터DB를 로드합니다. 디렉터리면 메모리 맵 포맷으로, 파일이면 pickle로 읽습니다.
+
+    quantization("float16" 또는 "int8")을 주면 검색 행렬을 압축합니다 (SimpleVectorDB.quantize 참고).
+    """
+    if os.path.isdir(path):
+        vector_db = load_vector_db_mmap(path)
+    else:
+        with open(path, 'rb') as f:
+            vector_db = pickle.load(f)
+    # 오프라인으로 빌드된 ANN 인덱스가 옆에 있으면 연결 (vector_index.py 참고)
+    index_path = ann_index_path_for(path)
+    if os.path.exists(index_path):
+        data_path = os.path.join(path, VECTOR_DB_META_FILE) if os.path.isdir(path) else path
+        if os.path.getmtime(index_path) < os.path.getmtime(data_path):
+            print(f"ANN 인덱스가 벡터DB보다 오래되어 사용하지 않습니다: {index_path}")
+        else:
+            try:
+                vector_db.attach_ann_index(IVFIndex.load(index_path))
+            except Exception as e:
+                print(f"ANN 인덱스 로드 실패, 정확 검색을 사용합니다: {e}")
+    if quantization:
+        quantized = vector_db.quantize(quantization, rescore=rescore)
+        print(f"검색 행렬 압축({quantization}): {quantized.nbytes / 1e6:.1f}MB, 정확 재점수화 {'사용' if rescore else '안 함'}")
+    # 메타데이터 인덱스는 로드 시점에 만들어 첫 질문이 문서 전체를 훑지 않도록 함
+    vector_db.get_metadata_index()
+    # RAG 시스템 캐시 키 (pickle과 .vdb는 같은 코퍼스로 취급)
+    vector_db.corpus_id = os.path.splitext(os.path.abspath(path))[0]
+    vector_db.version = vector_db_version(path)
+    if gemini_api_key is not None:
+        vector_db.embeddings = GeminiEmbeddings(gemini_api_key)
+    return vector_db
+
+def save_vector_db(vector_db, path):
+    """벡터DB를 원자적으로 저장합니다 (.vdb 디렉터리면 메모리 맵 포맷, 아니면 임시 파일에 pickle 후 교체).
+
+    저장 후 소스 해시를 캐시 매니페스트에 기록합니다.
+    """
+    if path.endswith(VECTOR_DB_DIR_SUFFIX):
+        save_vector_db_mmap(vector_db, path)
+    else:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(vector_db, f)
+        os.replace(tmp_path, path)
+    _record_vector_db_artifact(vector_db, path)
+    return path
+
+def vector_db_artifact_sources(vector_db, path):
+    """벡터DB 산출물로 기록할 {소스 경로: 해시}.
+
+    소스 매니페스트가 없는 예전 벡터DB는 소스를 알 수 없으므로 벡터DB 파일 자체의 지문을 소스로 기록합니다
+    (빈 소스로 기록하면 파일이 바뀌어도 항상 valid로 보임).
+    """
+    sources = {entry['path']: entry['hash'] for entry in vector_db.source_paths().values()}
+    if not sources:
+        data_path = os.path.join(path, VECTOR_DB_META_FILE) if os.path.isdir(path) else path
+        sources = {data_path: get_default_manifest().file_hash(data_path)}
+    return sources
+
+def _record_vector_db_artifact(vector_db, path):
+    """저장 직후 벡터DB를 산출물 저장소에 보관하고 소스 해시를 캐시 매니페스트에 기록합니다.
+
+    로드 경로에서는 기록하지 않습니다 (기존 배포본은 cache_manager.py warm으로 기록).
+    """
+    try:
+        get_default_store().commit(path, vector_db_artifact_sources(vector_db, path), chunk_count=len(vector_db.documents))
+    except OSError as e:
+        print(f"캐시 매니페스트 기록 실패 ({path}): {e}")
+
+def rebuild_vector_db_artifact(path, gemini_api_key, source_paths=None):
+    """벡터DB를 소스 PDF에서 다시 만들어 저장합니다. 바뀐 소스만 다시 청크/임베딩합니다 (update_vector_db_sources).
+
+    source_paths를 생략하면 벡터DB의 소스 매니페스트, 그것도 없으면 캐시 매니페스트에 기록된 소스를 사용합니다.
+    반환값은 (벡터DB, 변경 여부)입니다.
+    """
+    vector_db = load_vector_db(path) if os.path.exists(path) else None
+    if source_paths is None:
+        source_paths = list(vector_db.source_paths()) if vector_db is not None else []
+        if not source_paths:
+            # 기록된 소스 중 PDF만 사용 (예전 벡터DB는 자기 파일 지문이 소스로 기록되어 있음)
+            recorded = get_default_manifest().artifacts.get(os.path.normpath(path), {}).get("sources", {})
+            source_paths = [source for source in recorded if source.lower().endswith(".pdf")]
+    if not source_paths:
+        raise ValueError(f"소스 목록이 없어 다시 만들 수 없습니다: {path} (merge_vector_dbs 또는 make_simple_vector_db.py로 만드세요)")
+    new_db, changed = update_vector_db_sources(vector_db, source_paths, gemini_api_key)
+    if changed or vector_db is None:
+        save_vector_db(new_db, path)
+    else:
+        _record_vector_db_artifact(new_db, path)
+    return new_db, changed
+
+def rebuild_ann_index_artifact(db_path, n_lists=None, nprobe=None):
+    """벡터DB 옆의 ANN 인덱스를 다시 빌드해 저장하고, 벡터DB 파일들을 소스로 기록합니다."""
+    vector_db = load_vector_db(db_path)
+    index = vector_db.build_ann_index(n_lists=n_lists, nprobe=nprobe)
+    index_path = ann_index_path_for(db_path)
+    index.save(index_path)
+    get_default_store().commit(index_path, source_files(db_path), n_lists=index.n_lists, count=index.count)
+    print(f"ANN 인덱스 저장 완료: {index_path} (리스트 {index.n_lists}개, 문서 {index.count}개)")
+    return index_path
+
+def rebuild_mmap_artifact(pkl_path):
+    """pickle 벡터DB를 메모리 맵 디렉터리 포맷으로 다시 변환하고, pickle을 소스로 기록합니다."""
+    out_dir = convert_pickle_to_mmap(pkl_path, mmap_dir_for(pkl_path))
+    get_default_store().commit(out_dir, [pkl_path])
+    return out_dir
+
+def vector_db_version(path):
+    """벡터DB 스냅샷 버전(데이터 파일의 mtime_ns)을 반환합니다. 파일이 없으면 None."""
+    data_path = os.path.join(path, VECTOR_DB_META_FILE) if os.path.isdir(path) else path
+    try:
+        return os.stat(data_path).st_mtime_ns
+    except OSError:
+        return None
+
+def update_vector_db_sources(vector_db, pdf_paths, gemini_api_key):
+    """소스 매니페스트와 PDF 해시를 비교해 바뀐 소스만 다시 청크/임베딩한 새 스냅샷을 만듭니다.
+
+    반환값은 (벡터DB, 변경 여부)입니다. 매니페스트가 없는 예전 벡터DB는 전체를 다시 만들지만,
+    문서 임베딩 캐시에 있는 청크는 다시 임베딩하지 않습니다.
+    """
+    embeddings = GeminiEmbeddings(gemini_api_key)
+    if vector_db is not None and vector_db.source_paths():
+        base = vector_db
+    else:
+        if vector_db is not None and vector_db.documents:
+            print("소스 매니페스트가 없는 벡터DB입니다. 모든 소스를 다시 구성합니다.")
+            seed_document_embedding_cache(vector_db, model=embeddings.model)
+        base = SimpleVectorDB([], embeddings, embedding_model=embeddings.model)
+    manifest = base.source_paths()
+
+    current = {}
+    for pdf_path in pdf_paths:
+        if not os.path.exists(pdf_path):
+            print(f"PDF 파일이 존재하지 않습니다: {pdf_path}")
+            continue
+        current[pdf_path] = cached_file_hash(pdf_path)
+    get_default_manifest().save()
+    removed = [path for path in manifest if path not in current]
+    changed = [path for path, file_hash in current.items() if manifest.get(path, {}).get('hash') != file_hash]
+    if not removed and not changed:
+        print(f"변경된 소스가 없습니다. (소스 {len(manifest)}개, 청크 {len(base.documents)}개)")
+        base.embeddings = embeddings
+        return base, False
+
+    # 프로세스 풀이 다음 PDF들을 파싱하는 동안, 먼저 끝난 PDF의 청크를 바로 배치 임베딩
+    updates = []
+    for pdf_path, chunks in iter_pdf_chunks(changed):
+        for chunk in chunks:
+            chunk['metadata']['source'] = pdf_path
+        chunk_embeddings = embeddings.embed_documents([chunk['page_content'] for chunk in chunks]) if chunks else []
+        updates.append((pdf_path, current[pdf_path], chunks, chunk_embeddings))
+        print(f"{pdf_path} → 청크 {len(chunks)}개 ({'교체' if pdf_path in manifest else '추가'})")
+    for path in removed:
+        print(f"{path} → 삭제")
+    new_db = base._with_sources_changed(removed, updates)
+    new_db.embeddings = embeddings
+    new_db.embedding_model = embeddings.model
+    print(f"벡터DB 갱신: 변경 {len(changed)}개, 삭제 {len(removed)}개, 총 청크 {len(new_db.documents)}개")
+    return new_db, True
+
 # 캐시 관리 유틸리티 함수들
+def get_artifact_status(artifact_path, manifest=None):
+    """벡터DB 등 산출물의 캐시 상태를 반환합니다. 소스가 바뀌지 않았으면 파일을 읽지 않고 stat만 확인합니다."""
+    manifest = manifest or get_default_manifest()
+    status = manifest.artifact_status(artifact_path)
+    if status["status"] == "no_cache_info" and artifact_path == VECTOR_DB_PATH and migrate_legacy_cache_info(manifest):
+        status = manifest.artifact_status(artifact_path)
+    # 해시를 새로 계산한 소스가 있으면 다음 확인부터는 stat만으로 끝나도록 저장
+    manifest.save()
+    return status
+
 def get_cache_status():
-    """현재 캐시 상태를 반환합니다."""
-    if not os.path.exists(VECTOR_DB_PATH):
-        return {"status": "not_exists", "message": "벡터DB가 존재하지 않습니다."}
-    
-    cache_info = load_cache_info()
-    if cache_info is None:
-        return {"status": "no_cache_info", "message": "캐시 정보가 없습니다."}
-    
-    current_hash = calculate_file_hash(PDF_PATH)
-    is_valid = cache_info.get("file_hash") == current_hash
-    
-    return {
-        "status": "valid" if is_valid else "invalid",
-        "current_hash": current_hash[:8] + "...",
-        "cached_hash": cache_info.get("file_hash", "")[:8] + "...",
-        "chunk_count": cache_info.get("chunk_count"),
-        "created_at": cache_info.get("created_at"),
-        "is_valid": is_valid
-    }
+    """단일 PDF 벡터DB(VECTOR_DB_PATH)의 캐시 상태를 반환합니다."""
+    status = get_artifact_status(VECTOR_DB_PATH)
+    if status["status"] in ("not_exists", "no_cache_info"):
+        if status["status"] == "not_exists":
+            status["message"] = "벡터DB가 존재하지 않습니다."
+        return status
+    manifest = get_default_manifest()
+    cached_hash = manifest.artifacts[os.path.normpath(VECTOR_DB_PATH)]["sources"].get(os.path.normpath(PDF_PATH)) or ""
+    current_hash = manifest.file_hash(PDF_PATH) or ""
+    status.update(current_hash=current_hash[:8] + "...", cached_hash=cached_hash[:8] + "...")
+    return status
+
+def get_cache_statuses(artifact_paths=None):
+    """여러 벡터DB(기본: CACHE_ARTIFACT_PATHS)의 캐시 상태 리스트를 반환합니다."""
+    manifest = get_default_manifest()
+    return [get_artifact_status(path, manifest) for path in (artifact_paths or CACHE_ARTIFACT_PATHS)]
 
 def force_rebuild_cache(gemini_api_key):
-    """캐시를 강제로 재생성합니다."""
+    """캐시를 강제로 재생성합니다 (PDF_PATH에서 VECTOR_DB_PATH를 처음부터 다시 만듦)."""
     print("캐시를 강제로 재생성합니다...")
     if os.path.exists(VECTOR_DB_PATH):
         os.remove(VECTOR_DB_PATH)
         print("기존 벡터DB를 삭제했습니다.")
     
-    return get_or_create_vector_db(gemini_api_key)
+    vector_db, _ = rebuild_vector_db_artifact(VECTOR_DB_PATH, gemini_api_key, source_paths=[PDF_PATH])
+    return vector_db
 
 def clear_cache():
     """캐시를 완전히 삭제합니다."""
@@ -1224,6 +1955,28 @@ def clear_cache():
     else:
         print("삭제할 캐시가 없습니다.")
 
+def similarity_search_many(vector_store, queries, k=3):
+    """벡터스토어 종류와 무관하게 여러 쿼리를 배치로 검색합니다. 같은 쿼리는 한 번만 검색합니다."""
+    ks = list(k) if isinstance(k, (list, tuple)) else [k] * len(queries)
+    unique_ks = {}
+    for query, n in zip(queries, ks):
+        unique_ks[query] = max(unique_ks.get(query, 0), n)
+    texts = list(unique_ks)
+    if not texts:
+        return []
+    if hasattr(vector_store, 'similarity_search_many'):
+        found = vector_store.similarity_search_many(texts, [unique_ks[text] for text in texts])
+    else:
+        # LangChain 벡터스토어(FAISS 등): 임베딩은 배치로 한 번에, 검색은 벡터로 수행
+        embeddings = getattr(vector_store, 'embeddings', None) or vector_store.embedding_function
+        vectors = _embed_queries(embeddings, texts)
+        found = [
+            vector_store.similarity_search_by_vector(vector, k=unique_ks[text]) if unique_ks[text] > 0 else []
+            for text, vector in zip(texts, vectors)
+        ]
+    found_by_query = dict(zip(texts, found))
+    return [found_by_query[query][:n] if n > 0 else [] for query, n in zip(queries, ks)]
+
 # 3. 유사 청크 검색 함수
 def retrieve_relevant_chunks(query, vector_db, k=3):
     print(f"  - 유사 청크 검색 시작 (k={k})")
@@ -1734,7 +2487,7 @@ def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=No
             return "관련 정보를 찾을 수 없습니다."
         
         # 컨텍스트 구성
-        context = "\n\n".join([doc['page_content'] for doc in docs])
+        context = pack_context(docs)
         
         # 프롬프트 템플릿 선택
         prompt_template = get_multicultural_prompt_template(target_lang)
@@ -2315,7 +3068,7 @@ def answer_with_rag_busan_food(query, vector_db, gemini_api_key, model=None, tar
     if not relevant_chunks:
         return "참고 정보에서 관련 내용을 찾을 수 없습니다."
     
-    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+    context = pack_context(relevant_chunks)
     busan_food_prompt_template = get_busan_food_prompt_template(prompt_lang)
     prompt = busan_food_prompt_template.format(context=context, query=query)
     
@@ -2325,6 +3078,29 @@ def answer_with_rag_busan_food(query, vector_db, gemini_api_key, model=None, tar
     clean_answer = clean_markdown_text(answer)
     return clean_answer
 
+def find_waste_documents(vector_db, district):
+    """구군의 쓰레기 처리 문서를 찾습니다. 메타데이터(category/gu_name)로 먼저 찾고, 없으면 본문의 구군명 + 쓰레기 키워드로 찾습니다."""
+    index = vector_db.get_metadata_index() if hasattr(vector_db, 'get_metadata_index') else None
+    if index is not None and index.has_term(district):
+        doc_ids = index.lookup('쓰레기처리', district)
+        if not doc_ids:
+            print(f"  - 메타데이터로 {district} 관련 쓰레기 처리 문서를 찾지 못함, 내용 기반 검색 시도")
+            doc_ids = index.match_content(district, WASTE_CONTENT_KEYWORDS)
+        return [vector_db.documents[i] for i in doc_ids]
+
+    # 인덱스가 없는 벡터스토어이거나 색인되지 않은 구군명이면 문서를 직접 훑음
+    waste_docs = [doc for doc in vector_db.documents
+                  if isinstance(doc, dict) and (doc.get('metadata') or {}).get('category') == '쓰레기처리'
+                  and doc['metadata'].get('gu_name') == district]
+    if not waste_docs:
+        print(f"  - 메타데이터로 {district} 관련 쓰레기 처리 문서를 찾지 못함, 내용 기반 검색 시도")
+        for doc in vector_db.documents:
+            if isinstance(doc, dict) and 'page_content' in doc:
+                content = doc['page_content'].lower()
+                if district.lower() in content and any(keyword in content for keyword in WASTE_CONTENT_KEYWORDS):
+                    waste_docs.append(doc)
+    return waste_docs
+
 def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None, target_lang=None, conversation_context=None):
     print(f"  - 외국인 근로자 RAG 답변 생성 시작 (Ollama)")
     lang = detect_language(query)
@@ -2354,24 +3130,8 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
             combined_query = f"{district}에서 {previous_waste_query}"
             print(f"  - 조합된 질문: {combined_query}")
             
-            # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
-            
-            # 메타데이터로 찾지 못한 경우, 내용 기반으로 검색
-            if not waste_docs:
-                print(f"  - 메타데이터로 {district} 관련 쓰레기 처리 문서를 찾지 못함, 내용 기반 검색 시도")
-                for doc in vector_db.documents:
-                    if isinstance(doc, dict) and 'page_content' in doc:
-                        content = doc['page_content'].lower()
-                        # 구군명과 쓰레기 관련 키워드가 모두 포함된 문서 찾기
-                        if district.lower() in content and any(keyword in content for keyword in ['쓰레기', '폐기물', '배출', '종량제', '봉투', '수거']):
-                            waste_docs.append(doc)
+            # 쓰레기 처리 관련 문서들을 메타데이터 인덱스로 찾기
+            waste_docs = find_waste_documents(vector_db, district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
@@ -2390,7 +3150,7 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
                         if specific_item_found:
                             break
                 
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
+                context = pack_context(waste_docs)
                 
                 # 특정 품목 정보가 부족한 경우 추가 안내 포함
                 if not specific_item_found:
@@ -2427,24 +3187,8 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
             if conversation_context is not None:
                 conversation_context['waste_district'] = district
             
-            # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
-            
-            # 메타데이터로 찾지 못한 경우, 내용 기반으로 검색
-            if not waste_docs:
-                print(f"  - 메타데이터로 {district} 관련 쓰레기 처리 문서를 찾지 못함, 내용 기반 검색 시도")
-                for doc in vector_db.documents:
-                    if isinstance(doc, dict) and 'page_content' in doc:
-                        content = doc['page_content'].lower()
-                        # 구군명과 쓰레기 관련 키워드가 모두 포함된 문서 찾기
-                        if district.lower() in content and any(keyword in content for keyword in ['쓰레기', '폐기물', '배출', '종량제', '봉투', '수거']):
-                            waste_docs.append(doc)
+            # 쓰레기 처리 관련 문서들을 메타데이터 인덱스로 찾기
+            waste_docs = find_waste_documents(vector_db, district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
@@ -2463,7 +3207,7 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
                         if specific_item_found:
                             break
                 
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
+                context = pack_context(waste_docs)
                 
                 # 특정 품목 정보가 부족한 경우 추가 안내 포함
                 if not specific_item_found:
@@ -2474,10 +3218,12 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
                 # 쓰레기 처리 관련 구체적인 프롬프트 사용
                 waste_prompt_template = get_waste_management_prompt_template(prompt_lang)
                 prompt = waste_prompt_template.format(context=context, query=query, district=district)
+                answer = generate_text_with_llm(prompt, temperature=0.1, max_tokens=1000, gemini_api_key=gemini_api_key)
+                return clean_markdown_text(answer)
             else:
                 print(f"  - {district} 관련 쓰레기 처리 문서를 찾을 수 없음, 전체 문서 사용")
                 relevant_chunks = retrieve_relevant_chunks(query, vector_db)
-                context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+                context = pack_context(relevant_chunks)
                 foreign_worker_prompt_template = get_foreign_worker_prompt_template(prompt_lang)
                 prompt = foreign_worker_prompt_template.format(context=context, query=query)
         else:
@@ -2490,7 +3236,7 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
     relevant_chunks = retrieve_relevant_chunks(query, vector_db)
     if not relevant_chunks:
         return "참고 정보에서 관련 내용을 찾을 수 없습니다."
-    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+    context = pack_context(relevant_chunks)
     prompt = foreign_worker_prompt_template.format(context=context, query=query)
     
     answer = generate_text_with_llm(prompt, temperature=0.1, max_tokens=1000, gemini_api_key=gemini_api_key)
@@ -2499,54 +3245,68 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
     clean_answer = clean_markdown_text(answer)
     return clean_answer
 
-def get_or_create_vector_db_multi(pdf_paths, gemini_api_key):
-    """여러 PDF를 한 번에 임베딩해서 하나의 벡터DB로 저장합니다."""
-    all_chunks = []
-    for pdf_path in pdf_paths:
-        if not os.path.exists(pdf_path):
-            print(f"PDF 파일이 존재하지 않습니다: {pdf_path}")
-            continue
-        print(f"PDF 파일 확인됨: {os.path.abspath(pdf_path)}")
-        chunks = chunk_pdf_to_text_chunks(pdf_path)
-        all_chunks.extend(chunks)
-        print(f"{pdf_path} → 청크 {len(chunks)}개")
-    print(f"총 청크 개수: {len(all_chunks)}")
-    if not all_chunks:
+def get_or_create_vector_db_multi(pdf_paths, gemini_api_key, save_path="vector_db_multi.pkl"):
+    """여러 PDF를 하나의 벡터DB로 저장합니다. 기존 DB가 있으면 바뀐 PDF만 다시 청크/임베딩합니다."""
+    existing = load_vector_db(save_path) if os.path.exists(save_path) else None
+    vector_db, changed = update_vector_db_sources(existing, pdf_paths, gemini_api_key)
+    if not vector_db.documents:
         print("임베딩할 청크가 없습니다.")
         return None
-    embeddings = GeminiEmbeddings(gemini_api_key)
-    doc_embeddings = embeddings.embed_documents([doc['page_content'] for doc in all_chunks])
-    vector_db = SimpleVectorDB(all_chunks, embeddings, doc_embeddings)
-    with open("vector_db_multi.pkl", "wb") as f:
-        pickle.dump(vector_db, f)
-    print("벡터DB 저장 완료: vector_db_multi.pkl")
+    if changed:
+        save_vector_db(vector_db, save_path)
+        print(f"벡터DB 저장 완료: {save_path}")
     return vector_db
 
+def seed_document_embedding_cache(vector_db, model="models/embedding-001", store=None):
+    """벡터DB에 이미 저장된 doc_embeddings를 문서 임베딩 캐시에 넣어, 같은 청크를 다시 임베딩하지 않도록 합니다."""
+    db_model = getattr(vector_db, 'embedding_model', None)
+    if db_model not in (None, model):
+        print(f"임베딩 모델이 달라 캐시에 넣지 않습니다: {db_model} != {model}")
+        return 0
+    doc_embeddings = getattr(vector_db, 'doc_embeddings', None)
+    if doc_embeddings is None or len(doc_embeddings) != len(vector_db.documents):
+        return 0
+    store = store or get_default_document_store()
+    saved = store.put_many(model, [_doc_text(doc) for doc in vector_db.documents], doc_embeddings)
+    print(f"기존 임베딩 {saved}/{len(vector_db.documents)}개를 문서 임베딩 캐시에 저장했습니다.")
+    return saved
+
 def merge_vector_dbs(db_paths, gemini_api_key, save_path="다문화.pkl"):
-    """여러 벡터DB(pkl)를 병합하여 하나의 벡터DB로 만듭니다."""
+    """여러 벡터DB(pkl)를 병합하여 하나의 벡터DB로 만듭니다. 입력 DB에 저장된 임베딩은 다시 계산하지 않습니다."""
     all_chunks = []
+    sources = []
+    embeddings = GeminiEmbeddings(gemini_api_key)
     for db_path in db_paths:
         if not os.path.exists(db_path):
             print(f"DB 파일이 존재하지 않습니다: {db_path}")
             continue
-        with open(db_path, "rb") as f:
-            db = pickle.load(f)
-            all_chunks.extend(db.documents)
+        db = load_vector_db(db_path)
+        # 입력 DB의 소스 매니페스트를 병합 위치만큼 옮겨 이어 붙임
+        offset = len(all_chunks)
+        for entry in db.source_paths().values():
+            sources.append(dict(entry, start=entry['start'] + offset, end=entry['end'] + offset))
+        all_chunks.extend(db.documents)
+        seed_document_embedding_cache(db, model=embeddings.model)
     print(f"총 합쳐진 청크 개수: {len(all_chunks)}")
     if not all_chunks:
         print("합칠 청크가 없습니다.")
         return None
-    embeddings = GeminiEmbeddings(gemini_api_key)
-    doc_embeddings = embeddings.embed_documents([doc['page_content'] for doc in all_chunks])
+    checkpoint_path = save_path + ".ckpt.jsonl"
+    doc_embeddings = embeddings.embed_documents([doc['page_content'] for doc in all_chunks], checkpoint_path=checkpoint_path)
     vector_db = SimpleVectorDB(all_chunks, embeddings, doc_embeddings)
-    with open(save_path, "wb") as f:
-        pickle.dump(vector_db, f)
+    vector_db.sources = sources
+    save_vector_db(vector_db, save_path)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
     print(f"병합 벡터DB 저장 완료: {save_path}")
     return vector_db
 
 # LangGraph 기반 개선된 RAG 함수들
-def create_langgraph_rag_system(gemini_api_key: str, vector_db_path: str, target_lang: str = "ko"):
-    """LangGraph 기반 RAG 시스템 생성"""
+def create_langgraph_rag_system(gemini_api_key: str, vector_db_path, target_lang: str = "ko", vector_store=None, lexical_index=None):
+    """LangGraph 기반 RAG 시스템 생성
+
+    vector_db_path는 벡터DB 경로 또는 SimpleVectorDB 객체입니다. vector_store/lexical_index를 주면 (다른 언어 시스템과 공유) 다시 만들지 않습니다.
+    """
     print(f"🔍 LangGraph RAG 시스템 생성 시작...")
     print(f"   - API Key: {'있음' if gemini_api_key else '없음'}")
     print(f"   - Vector DB Path: {vector_db_path}")
@@ -2582,21 +3342,25 @@ def create_langgraph_rag_system(gemini_api_key: str, vector_db_path: str, target
         print("임베딩 모델 설정 완료")
         
         # 벡터스토어 로드
-        print("📚 벡터스토어 로드 중...")
-        vector_store = load_vector_store_for_langgraph(vector_db_path, embeddings)
-        if not vector_store:
-            print("벡터스토어 로드 실패")
-            return None
-        print("벡터스토어 로드 완료")
+        if vector_store is None:
+            print("📚 벡터스토어 로드 중...")
+            vector_store = load_vector_store_for_langgraph(vector_db_path, embeddings)
+            if not vector_store:
+                print("벡터스토어 로드 실패")
+                return None
+            print("벡터스토어 로드 완료")
+        if lexical_index is None:
+            lexical_index = CharNgramBM25Index([_page_content(doc) for doc in _vector_store_documents(vector_store)])
         
         # RAG 그래프 생성
         print("🔄 RAG 그래프 생성 중...")
-        rag_graph = create_rag_workflow(llm, vector_store, target_lang)
+        rag_graph = create_rag_workflow(llm, vector_store, target_lang, lexical_index=lexical_index)
         print("RAG 그래프 생성 완료")
         
         result = {
             "graph": rag_graph,
             "vector_store": vector_store,
+            "lexical_index": lexical_index,
             "llm": llm,
             "embeddings": embeddings
         }
@@ -2610,46 +3374,23 @@ def create_langgraph_rag_system(gemini_api_key: str, vector_db_path: str, target
         traceback.print_exc()
         return None
 
-def load_vector_store_for_langgraph(vector_db_path: str, embeddings):
-    """기존 벡터DB를 LangChain 벡터스토어로 변환"""
-    print(f"📖 벡터DB 파일 로드 중: {vector_db_path}")
+def load_vector_store_for_langgraph(vector_db_path, embeddings):
+    """기존 벡터DB(경로 또는 SimpleVectorDB 객체)를 LangChain 벡터스토어로 변환"""
+    print(f"📖 벡터DB 로드 중: {vector_db_path if isinstance(vector_db_path, str) else '메모리의 벡터DB'}")
     
     try:
-        # 파일 존재 확인
-        if not os.path.exists(vector_db_path):
-            print(f"벡터DB 파일이 존재하지 않습니다: {vector_db_path}")
-            return None
-        
-        print("📄 벡터DB 파일 읽는 중...")
-        with open(vector_db_path, 'rb') as f:
-            vector_db = pickle.load(f)
+        if isinstance(vector_db_path, str):
+            # 파일 존재 확인
+            if not os.path.exists(vector_db_path):
+                print(f"벡터DB 파일이 존재하지 않습니다: {vector_db_path}")
+                return None
+            vector_db = load_vector_db(vector_db_path)
+        else:
+            vector_db = vector_db_path
         
         print(f"📊 벡터DB 로드 완료: {len(vector_db.documents)}개 문서")
-        
-        # 문서와 임베딩 추출
-        documents = []
-        embeddings_list = []
-        
-        print("🔍 문서 및 임베딩 추출 중...")
-        for i, doc in enumerate(vector_db.documents):
-            if isinstance(doc, dict) and 'page_content' in doc:
-                documents.append(doc['page_content'])
-                if hasattr(vector_db, 'doc_embeddings') and vector_db.doc_embeddings:
-                    if i < len(vector_db.doc_embeddings):
-                        embeddings_list.append(vector_db.doc_embeddings[i])
-        
-        print(f"📝 추출된 문서: {len(documents)}개")
-        print(f"🔢 추출된 임베딩: {len(embeddings_list)}개")
-        
-        # FAISS 벡터스토어 생성 - from_texts 사용
-        print("🏗️ FAISS 벡터스토어 생성 중...")
-        print("🔄 새로운 임베딩 생성하여 벡터스토어 생성")
-        vector_store = FAISS.from_texts(
-            documents, 
-            embeddings
-        )
-        
-        print(f"LangGraph 벡터스토어 로드 완료: {len(documents)}개 문서")
+        vector_store = vector_db_to_faiss(vector_db, embeddings)
+        print(f"LangGraph 벡터스토어 로드 완료: {len(vector_store.index_to_docstore_id)}개 문서")
         return vector_store
         
     except Exception as e:
@@ -2658,7 +3399,127 @@ def load_vector_store_for_langgraph(vector_db_path: str, embeddings):
         traceback.print_exc()
         return None
 
-def create_rag_workflow(llm, vector_store, target_lang: str = "ko"):
+def extract_texts_and_vectors(vector_db):
+    """SimpleVectorDB 스냅샷에서 (텍스트 리스트, 메타데이터 리스트, float32 벡터 행렬)을 한 번의 순회로 꺼냅니다.
+
+    벡터는 저장된 정규화 행렬에서 그대로 가져오며, 저장된 임베딩이 없고 임베딩 객체도 없으면 None입니다.
+    """
+    texts, metadatas, rows = [], [], []
+    for i, doc in enumerate(vector_db.documents):
+        if isinstance(doc, dict) and 'page_content' in doc:
+            texts.append(doc['page_content'])
+            metadatas.append(doc.get('metadata') or {})
+            rows.append(i)
+    has_vectors = getattr(vector_db, '_matrix', None) is not None or getattr(vector_db, 'quantized', None) is not None
+    if not has_vectors and getattr(vector_db, 'embeddings', None) is None:
+        return texts, metadatas, None
+    matrix = vector_db._ensure_search_matrix()
+    if len(rows) == matrix.shape[0]:
+        vectors = np.asarray(matrix, dtype=np.float32)
+    else:
+        vectors = np.asarray(matrix[np.asarray(rows, dtype=np.intp)], dtype=np.float32)
+    return texts, metadatas, vectors
+
+def vector_db_to_faiss(vector_db, embeddings):
+    """SimpleVectorDB 스냅샷을 FAISS 인메모리 벡터스토어로 변환합니다 (선형 시간, 저장된 임베딩 재사용).
+
+    rag_utils의 LangGraph 워크플로와 langgraph_rag.LangGraphRAG가 함께 사용하는 로더입니다.
+    embeddings는 질문 임베딩에만 쓰입니다.
+    """
+    texts, metadatas, vectors = extract_texts_and_vectors(vector_db)
+    if vectors is None:
+        print("🔄 저장된 임베딩이 없어 새로 임베딩하여 벡터스토어 생성")
+        return FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+    # 저장된 임베딩은 정규화되어 있으므로 FAISS의 L2 거리 순위가 코사인 유사도 순위와 같음
+    print(f"🏗️ 저장된 임베딩 {len(texts)}개로 FAISS 벡터스토어 생성")
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+
+# 준비된 LangGraph RAG 시스템 캐시: (코퍼스 id, 코퍼스 버전, target_lang) → 시스템
+RAG_SYSTEM_CACHE_SIZE = int(os.getenv("RAG_SYSTEM_CACHE_SIZE", "8"))
+_rag_system_cache = OrderedDict()
+# 잠금은 캐시 dict 조회/갱신에만 쓰고, 시스템 생성(FAISS/그래프)은 키별 Future로 한 번만 실행 (다른 키 요청은 기다리지 않음)
+_rag_system_cache_lock = threading.Lock()
+_rag_system_builds = {}  # (코퍼스 id, 버전, target_lang, 벡터DB id) → 생성 중인 Future
+
+def get_langgraph_rag_system(vector_db, gemini_api_key, target_lang="ko"):
+    """벡터DB 스냅샷과 언어별로 한 번 만든 LangGraph RAG 시스템을 재사용합니다.
+
+    같은 스냅샷의 FAISS 벡터스토어와 BM25 인덱스는 언어별 시스템이 공유하고,
+    코퍼스 버전이 바뀌면(핫 스왑) 이전 버전의 시스템은 캐시에서 버립니다.
+    같은 시스템을 동시에 요청하면 먼저 온 요청만 만들고 나머지는 그 결과를 기다립니다.
+    """
+    corpus_id = getattr(vector_db, 'corpus_id', None) or f"memory-{id(vector_db)}"
+    version = getattr(vector_db, 'version', None)
+    key = (corpus_id, version, target_lang)
+    build_key = key + (id(vector_db),)
+    while True:
+        with _rag_system_cache_lock:
+            entry = _rag_system_cache.get(key)
+            if entry is not None and entry['vector_db_ref']() is vector_db:
+                _rag_system_cache.move_to_end(key)
+                return entry['system']
+            shared = None
+            for other_key in list(_rag_system_cache):
+                if other_key[0] != corpus_id:
+                    continue
+                other = _rag_system_cache[other_key]
+                if other_key[1] != version or other['vector_db_ref']() is not vector_db:
+                    del _rag_system_cache[other_key]
+                elif shared is None:
+                    shared = other['system']
+            future = _rag_system_builds.get(build_key)
+            waiting_for_shared = False
+            if future is None and shared is None:
+                # 같은 스냅샷의 다른 언어 시스템을 만드는 중이면 끝날 때까지 기다렸다가 벡터스토어를 공유
+                future = next((other for other_key, other in _rag_system_builds.items()
+                               if other_key[:2] == key[:2] and other_key[3] == id(vector_db)), None)
+                waiting_for_shared = future is not None
+            leader = future is None
+            if leader:
+                future = Future()
+                _rag_system_builds[build_key] = future
+        if leader:
+            break
+        if not waiting_for_shared:
+            return future.result()
+        try:
+            future.result()
+        except Exception:
+            pass  # 다른 언어 시스템 생성 실패는 이 요청에서 직접 만들어 봄
+        # 다른 언어 시스템이 끝났으니 캐시에서 공유할 벡터스토어를 다시 찾음
+
+    try:
+        system = create_langgraph_rag_system(
+            gemini_api_key, vector_db, target_lang,
+            vector_store=shared['vector_store'] if shared else None,
+            lexical_index=shared['lexical_index'] if shared else None
+        )
+    except BaseException as e:
+        with _rag_system_cache_lock:
+            _rag_system_builds.pop(build_key, None)
+        future.set_exception(e)
+        raise
+    with _rag_system_cache_lock:
+        _rag_system_builds.pop(build_key, None)
+        if system is not None:
+            _rag_system_cache[key] = {'system': system, 'vector_db_ref': weakref.ref(vector_db)}
+            while len(_rag_system_cache) > RAG_SYSTEM_CACHE_SIZE:
+                _rag_system_cache.popitem(last=False)
+    future.set_result(system)
+    return system
+
+def _vector_store_documents(vector_store):
+    """벡터스토어의 문서를 저장 순서대로 반환합니다 (LangChain FAISS docstore 또는 documents 리스트)."""
+    if hasattr(vector_store, 'index_to_docstore_id'):
+        ids = vector_store.index_to_docstore_id
+        return [vector_store.docstore.search(ids[i]) for i in range(len(ids))]
+    return list(getattr(vector_store, 'documents', []))
+
+def _page_content(doc):
+    """LangChain Document 또는 dict 문서의 본문을 꺼냅니다."""
+    return doc.page_content if hasattr(doc, 'page_content') else _doc_text(doc)
+
+def create_rag_workflow(llm, vector_store, target_lang: str = "ko", lexical_index=None):
     """LangGraph 기반 RAG 워크플로우 생성 (개선된 버전)"""
     
     # 1. 질문 분석 노드
@@ -2725,6 +3586,11 @@ def create_rag_workflow(llm, vector_store, target_lang: str = "ko"):
         }
     
     # 2. 다중 검색 노드
+    # 어휘 검색용 문자 bigram BM25 인덱스 (워크플로 생성 시 한 번 구성)
+    lexical_docs = _vector_store_documents(vector_store)
+    if lexical_index is None:
+        lexical_index = CharNgramBM25Index([_page_content(doc) for doc in lexical_docs])
+    
     def multi_search_documents(state):
         """여러 검색 전략을 사용한 문서 검색"""
         query = state["query"]
@@ -2734,27 +3600,22 @@ def create_rag_workflow(llm, vector_store, target_lang: str = "ko"):
         query_type = state.get("query_type", "general")
         district_name = state.get("district_name")
         
-        all_docs = []
-        
+        # 전략별 (검색어, k) 목록을 먼저 모은 뒤 한 번의 배치 검색으로 처리
+        # exact_match / keyword_search는 임베딩 대신 문자 bigram BM25 인덱스로 검색 (네트워크 호출 없음)
+        search_requests = []
+        lexical_rankings = []
         for strategy in search_strategies:
             if strategy == "semantic_search":
-                docs = vector_store.similarity_search(enhanced_query, k=k)
-                all_docs.extend(docs)
+                search_requests.append((enhanced_query, k))
             elif strategy == "exact_match":
                 # 정확한 키워드 매칭 검색
-                exact_docs = vector_store.similarity_search(enhanced_query, k=k//2)
-                all_docs.extend(exact_docs)
+                lexical_rankings.append([lexical_docs[doc_id] for doc_id, _ in lexical_index.search(enhanced_query, k)])
             elif strategy == "location_based":
                 # 위치 기반 검색 (부산 관련)
-                location_query = f"부산 {query}"
-                location_docs = vector_store.similarity_search(location_query, k=k//2)
-                all_docs.extend(location_docs)
+                search_requests.append((f"부산 {query}", k//2))
             elif strategy == "keyword_search":
-                # 키워드 기반 검색
-                keywords = query.split()
-                for keyword in keywords[:3]:  # 상위 3개 키워드만 사용
-                    keyword_docs = vector_store.similarity_search(keyword, k=k//3)
-                    all_docs.extend(keyword_docs)
+                # 키워드 기반 검색 (질문의 모든 어절을 bigram으로 매칭)
+                lexical_rankings.append([lexical_docs[doc_id] for doc_id, _ in lexical_index.search(query, k)])
             elif strategy == "context_aware":
                 # 문맥 인식 검색 (구군명 + 생활 정보)
                 if district_name:
@@ -2766,18 +3627,27 @@ def create_rag_workflow(llm, vector_store, target_lang: str = "ko"):
                         f"부산 {district_name} 교통"
                     ]
                     for context_query in context_queries:
-                        context_docs = vector_store.similarity_search(context_query, k=k//5)
-                        all_docs.extend(context_docs)
+                        search_requests.append((context_query, k//5))
+        
+        search_results = similarity_search_many(
+            vector_store,
+            [search_query for search_query, _ in search_requests],
+            [search_k for _, search_k in search_requests]
+        )
         
-        # 중복 제거 및 정렬
-        unique_docs = []
-        seen_contents = set()
-        for doc in all_docs:
-            if doc.page_content not in seen_contents:
-                unique_docs.append(doc)
-                seen_contents.add(doc.page_content)
+        # 벡터 검색과 BM25 결과를 RRF로 합치고 내용 기준으로 중복 제거
+        docs_by_content = {}
+        rankings = []
+        for docs in list(search_results) + lexical_rankings:
+            ranking = []
+            for doc in docs:
+                content = _page_content(doc)
+                docs_by_content.setdefault(content, doc)
+                ranking.append(content)
+            rankings.append(ranking)
+        unique_docs = [docs_by_content[content] for content in reciprocal_rank_fusion(rankings)]
         
-        context = "\n\n".join([doc.page_content for doc in unique_docs[:k*2]])
+        context = pack_context(unique_docs[:k*2])
         
         return {
             "query": query,
@@ -3177,29 +4047,17 @@ def answer_with_langgraph_rag(query: str, vector_db, gemini_api_key: str, target
     try:
         print("LangGraph 사용 가능 확인됨")
         
-        # 벡터DB 경로 추출
-        vector_db_path = None
-        if hasattr(vector_db, 'documents'):
-            print(f"📊 벡터DB 문서 수: {len(vector_db.documents)}")
-            # 임시로 벡터DB를 파일로 저장
-            vector_db_path = "temp_vector_db.pkl"
-            print(f"💾 임시 벡터DB 파일 생성: {vector_db_path}")
-            with open(vector_db_path, 'wb') as f:
-                pickle.dump(vector_db, f)
-            print("임시 벡터DB 파일 저장 완료")
-        else:
+        if not hasattr(vector_db, 'documents'):
             print("벡터DB에 documents 속성이 없습니다")
             return answer_with_rag(query, vector_db, gemini_api_key, target_lang=target_lang)
+        print(f"📊 벡터DB 문서 수: {len(vector_db.documents)}")
         
-        # LangGraph RAG 시스템 생성
-        print("🔧 LangGraph RAG 시스템 생성 중...")
-        rag_system = create_langgraph_rag_system(gemini_api_key, vector_db_path, target_lang)
+        # LangGraph RAG 시스템 (코퍼스/버전/언어별로 한 번 만들어 재사용)
+        rag_system = get_langgraph_rag_system(vector_db, gemini_api_key, target_lang)
         if not rag_system:
             print("LangGraph RAG 시스템 생성 실패, 기본 RAG 사용")
             return answer_with_rag(query, vector_db, gemini_api_key, target_lang=target_lang)
         
-        print("LangGraph RAG 시스템 생성 완료")
-        
         # 그래프 실행
         print("🔄 LangGraph 워크플로우 실행 중...")
         initial_state = {
@@ -3210,11 +4068,6 @@ def answer_with_langgraph_rag(query: str, vector_db, gemini_api_key: str, target
         result = rag_system["graph"].invoke(initial_state)
         print("LangGraph 워크플로우 실행 완료")
         
-        # 임시 파일 정리
-        if vector_db_path and os.path.exists(vector_db_path):
-            os.remove(vector_db_path)
-            print("🗑️ 임시 벡터DB 파일 삭제 완료")
-        
         answer = result.get("answer", "답변을 생성할 수 없습니다.")
         print(f"📝 최종 답변 길이: {len(answer)}자")
         return answer
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+지연 로딩 리소스 레지스트리
+Firebase, 벡터DB, JSON 데이터처럼 무거운 리소스를 처음 사용할 때 한 번만 로드합니다.
+필요하면 백그라운드 스레드로 미리 로드(prewarm)할 수 있습니다.
+"""
+
+import time
+import threading
+
+class LazyResource:
+    """처음 get()을 호출할 때 loader를 한 번만 실행하는 스레드 안전 리소스.
+
+    loader가 예외를 던지면 None을 값으로 기록합니다 (매 요청마다 다시 시도하지 않음).
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        """값을 반환합니다. 아직 로드되지 않았으면 로드하고, 동시에 호출한 스레드는 로드가 끝날 때까지 기다립니다."""
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                    print(f"리소스 로드 완료: {self.name} ({time.perf_counter() - start:.2f}초)")
+                except Exception as e:
+                    print(f"리소스 로드 실패 ({self.name}): {e}")
+                    self._value = None
+                self._loaded = True
+        return self._value
+
+    def peek(self):
+        """로드된 값만 반환합니다 (로드하지 않음)."""
+        return self._value if self._loaded else None
+
+    def set(self, value):
+        """값을 교체합니다 (핫 스왑). 참조 교체 한 번이므로 읽는 쪽은 이전 값이나 새 값 중 하나를 봅니다."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+    def reset(self):
+        """값을 내려놓아 다음 get()에서 다시 로드하게 합니다."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+class ResourceRegistry:
+    """이름으로 LazyResource를 등록/조회하는 레지스트리."""
+
+    def __init__(self):
+        self._resources = {}
+
+    def register(self, name, loader):
+        """loader를 name으로 등록합니다. 로드는 처음 get(name)할 때 일어납니다."""
+        self._resources[name] = LazyResource(name, loader)
+        return self._resources[name]
+
+    def resource(self, name):
+        return self._resources[name]
+
+    def get(self, name):
+        return self._resources[name].get()
+
+    def peek(self, name):
+        return self._resources[name].peek()
+
+    def set(self, name, value):
+        self._resources[name].set(value)
+
+    def is_loaded(self, name):
+        return self._resources[name].loaded
+
+    def names(self):
+        return list(self._resources)
+
+    def prewarm(self, names=None, background=True):
+        """리소스들을 미리 로드합니다. background=True이면 데몬 스레드에서 순서대로 로드하고 스레드를 반환합니다."""
+        names = [name for name in (names or self.names()) if name in self._resources]
+
+        def _load_all():
+            for name in names:
+                self._resources[name].get()
+
+        if not background:
+            _load_all()
+            return None
+        thread = threading.Thread(target=_load_all, name="resource-prewarm", daemon=True)
+        thread.start()
+        return thread
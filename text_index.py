@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+텍스트/메타데이터 인덱스
+벡터DB를 로드할 때 한 번 만들어 두고, 문서 전체를 훑지 않고 결과 크기만큼의 비용으로 문서를 찾기 위한 역색인입니다.
+"""
+
+import re
+import math
+import heapq
+import unicodedata
+from collections import Counter
+
+# BM25 기본 파라미터와 RRF 상수 (RRF 점수 = Σ 1 / (RRF_K + 순위))
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+class DocumentMetadataIndex:
+    """category → gu_name → 문서 id 역색인과, 미리 정한 단어(terms)의 본문 포스팅 리스트.
+
+    문서 id는 documents 리스트의 위치이며, 모든 리스트는 문서 순서(오름차순)를 유지합니다.
+    """
+
+    def __init__(self, documents, terms=()):
+        self.by_category = {}
+        self.postings = {term.lower(): [] for term in terms}
+        self._posting_sets = {}
+        for doc_id, doc in enumerate(documents):
+            if not isinstance(doc, dict):
+                continue
+            metadata = doc.get('metadata') or {}
+            category = metadata.get('category')
+            if category is not None:
+                self.by_category.setdefault(category, {}).setdefault(metadata.get('gu_name'), []).append(doc_id)
+            content = doc.get('page_content')
+            if self.postings and isinstance(content, str):
+                content = content.lower()
+                for term, ids in self.postings.items():
+                    if term in content:
+                        ids.append(doc_id)
+
+    def lookup(self, category, gu_name):
+        """category와 gu_name이 모두 일치하는 문서 id 리스트를 반환합니다."""
+        return self.by_category.get(category, {}).get(gu_name, [])
+
+    def has_term(self, term):
+        """term이 색인된 단어인지 반환합니다."""
+        return term.lower() in self.postings
+
+    def match_content(self, required_term, any_terms):
+        """본문에 required_term이 있고 any_terms 중 하나 이상이 있는 문서 id 리스트를 반환합니다 (모두 색인된 단어여야 함)."""
+        # 보통 더 작은 required_term 포스팅에서 시작해 문서마다 키워드 포함 여부만 확인 (비용 = 후보 수 × 키워드 수)
+        candidates = self.postings[required_term.lower()]
+        if not candidates:
+            return []
+        any_sets = [self._posting_set(term) for term in any_terms]
+        return [doc_id for doc_id in candidates if any(doc_id in ids for ids in any_sets)]
+
+    def _posting_set(self, term):
+        """term 포스팅의 집합 (처음 사용할 때 한 번 만들어 둠)."""
+        term = term.lower()
+        ids = self._posting_sets.get(term)
+        if ids is None:
+            ids = self._posting_sets[term] = frozenset(self.postings[term])
+        return ids
+
+def char_ngrams(text, n=2):
+    """텍스트를 단어(\\w+)로 나눈 뒤 단어 안의 문자 n-gram 목록을 반환합니다. n보다 짧은 단어는 그대로 씁니다.
+
+    한국어는 조사/어미가 붙어도 ("해운대구에서", "냉장고는") 어간의 bigram이 그대로 남아 매칭됩니다.
+    """
+    grams = []
+    for word in _WORD_PATTERN.findall(unicodedata.normalize("NFC", text).lower()):
+        if len(word) <= n:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+class CharNgramBM25Index:
+    """문자 n-gram 역색인 위의 BM25 검색. 로드 시점에 문서별 BM25 가중치까지 미리 계산해 두고, 검색은 질의 n-gram의 포스팅만 더합니다."""
+
+    def __init__(self, texts, n=2, k1=BM25_K1, b=BM25_B):
+        self.n = n
+        doc_counts = [Counter(char_ngrams(text, n)) for text in texts]
+        doc_lengths = [sum(counts.values()) for counts in doc_counts]
+        self.count = len(doc_counts)
+        avg_length = (sum(doc_lengths) / self.count) if self.count else 0.0
+        document_frequency = Counter(gram for counts in doc_counts for gram in counts)
+        idf = {
+            gram: math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+            for gram, df in document_frequency.items()
+        }
+        self.postings = {}  # n-gram -> [(문서 id, BM25 가중치)]
+        for doc_id, counts in enumerate(doc_counts):
+            norm = k1 * (1 - b + b * doc_lengths[doc_id] / avg_length) if avg_length else k1
+            for gram, tf in counts.items():
+                self.postings.setdefault(gram, []).append((doc_id, idf[gram] * tf * (k1 + 1) / (tf + norm)))
+
+    def search(self, query, k=5):
+        """BM25 점수 상위 k개의 (문서 id, 점수) 리스트를 점수 내림차순으로 반환합니다."""
+        if k <= 0 or not self.count:
+            return []
+        scores = {}
+        for gram, query_tf in Counter(char_ngrams(query, self.n)).items():
+            for doc_id, weight in self.postings.get(gram, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_tf * weight
+        return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """여러 순위 리스트(키 리스트)를 RRF로 합쳐 점수 내림차순의 키 리스트를 반환합니다. 동점이면 먼저 나온 키가 앞섭니다."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda key: -scores[key])
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+토큰 예산 기반 청크 분할
+글자 수 대신 토큰 수로 청크 크기를 맞추고, 한국어 문장/문단 경계에서 자르며, 청크마다 토큰 수를 기록합니다.
+프롬프트를 만들 때는 기록된 토큰 수로 컨텍스트를 예산에 정확히 채웁니다.
+"""
+
+import os
+import re
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# 토큰 수를 셀 인코딩, 청크 크기/오버랩(토큰), 프롬프트 컨텍스트 예산(토큰)
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+TOKEN_CHUNK_SIZE = int(os.getenv("TOKEN_CHUNK_SIZE", "400"))
+TOKEN_CHUNK_OVERLAP = int(os.getenv("TOKEN_CHUNK_OVERLAP", "60"))
+# 컨텍스트 예산은 모델 컨텍스트 창에서 프롬프트 틀/질문/답변 몫을 뺀 값 (CONTEXT_TOKEN_BUDGET으로 직접 지정 가능)
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "32768"))
+CONTEXT_RESERVED_TOKENS = int(os.getenv("CONTEXT_RESERVED_TOKENS", "8192"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET") or max(MODEL_CONTEXT_TOKENS - CONTEXT_RESERVED_TOKENS, 1024))
+# 청크가 예산의 이 비율 이상 찼으면 새 문단이 시작될 때 청크를 끊음
+PARAGRAPH_BREAK_FILL = 0.5
+# 문장 사이 구분자(공백/줄바꿈)에 잡는 토큰 수
+SEPARATOR_TOKENS = 1
+
+# 문단: 빈 줄로 구분
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+# 문장 끝: 마침표/물음표/느낌표(전각 포함) 뒤의 공백, 또는 줄 앞에 오는 글머리 기호(○, □, •, ※, - 등) 앞
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?。！？])\s+|\s*\n(?=\s*(?:[○□■◦•·※▶▷◎●-]|\d+[.)]|[가-하][.)])\s)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# 문장 끝 규칙에 잘려 나온 번호 매기기 표시("1.", "가.")는 다음 문장에 붙임
+_LIST_MARKER_PATTERN = re.compile(r"^(?:\d+|[가-하])[.)]$")
+
+_encoding = None
+_encoding_failed = False
+
+def _get_encoding():
+    """tiktoken 인코딩을 한 번만 로드합니다. 설치되어 있지 않거나 로드에 실패하면 None을 반환합니다."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed and TIKTOKEN_AVAILABLE:
+        try:
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            print(f"tiktoken 인코딩 로드 실패 ({TOKEN_ENCODING}), 글자 수로 토큰 수를 대신합니다: {e}")
+            _encoding_failed = True
+    return _encoding
+
+def count_tokens(text):
+    """텍스트의 토큰 수를 반환합니다.
+
+    tiktoken을 쓸 수 없으면 글자 수를 반환합니다 (한국어는 대부분 글자당 1토큰 이상이라 예산을 넘기지 않는 쪽으로 추정됨).
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def split_sentences(text):
+    """텍스트를 문단 리스트로 나누고, 각 문단을 문장 리스트로 나눕니다. 문장 안의 줄바꿈/연속 공백은 공백 하나로 합칩니다."""
+    paragraphs = []
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        sentences = []
+        marker = ""
+        for sentence in _SENTENCE_PATTERN.split(paragraph):
+            sentence = _WHITESPACE_PATTERN.sub(" ", sentence).strip()
+            if _LIST_MARKER_PATTERN.match(sentence):
+                marker = f"{marker} {sentence}".strip()
+            elif sentence:
+                sentences.append(f"{marker} {sentence}" if marker else sentence)
+                marker = ""
+        if marker:
+            sentences.append(marker)
+        if sentences:
+            paragraphs.append(sentences)
+    return paragraphs
+
+def _split_long_sentence(sentence, max_tokens):
+    """예산보다 긴 문장을 단어 단위로 (단어 하나가 예산보다 길면 글자 단위로) 예산 안의 조각들로 나눕니다."""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in sentence.split(" "):
+        word_tokens = count_tokens(word)
+        if word_tokens > max_tokens:
+            # 공백 없이 이어진 긴 문자열은 글자 단위로 자름
+            if current:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            start = 0
+            while start < len(word):
+                end = len(word)
+                while end > start + 1 and count_tokens(word[start:end]) > max_tokens:
+                    end = start + max(1, (end - start) * max_tokens // count_tokens(word[start:end]))
+                pieces.append(word[start:end])
+                start = end
+            continue
+        added = word_tokens + (SEPARATOR_TOKENS if current else 0)
+        if current and current_tokens + added > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [word], word_tokens
+        else:
+            current.append(word)
+            current_tokens += added
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def split_text_into_token_chunks(text, max_tokens=TOKEN_CHUNK_SIZE, overlap_tokens=TOKEN_CHUNK_OVERLAP):
+    """텍스트를 문장 단위로 모아 max_tokens 이하의 청크로 나눕니다. (청크 텍스트, 토큰 수) 리스트를 반환합니다.
+
+    - 문장 중간에서 자르지 않고, 예산의 절반 이상 찼으면 문단이 바뀔 때 끊습니다.
+    - 오버랩은 이전 청크 끝의 온전한 문장들(overlap_tokens 이내)을 다음 청크 앞에 다시 넣습니다.
+    - 문장 하나가 예산보다 길면 단어 단위로 나눕니다.
+    """
+    units = []  # (문장, 토큰 수, 문단 시작 여부)
+    for paragraph in split_sentences(text):
+        for i, sentence in enumerate(paragraph):
+            sentence_tokens = count_tokens(sentence)
+            if sentence_tokens <= max_tokens:
+                units.append((sentence, sentence_tokens, i == 0))
+            else:
+                for j, piece in enumerate(_split_long_sentence(sentence, max_tokens)):
+                    units.append((piece, count_tokens(piece), i == 0 and j == 0))
+
+    chunks = []
+    current = []  # (문장, 토큰 수)
+    current_tokens = 0
+    has_new_content = False  # 오버랩으로 가져온 문장 외에 새 문장이 들어갔는지
+    for sentence, sentence_tokens, starts_paragraph in units:
+        added = sentence_tokens + (SEPARATOR_TOKENS if current else 0)
+        paragraph_break = starts_paragraph and current_tokens >= max_tokens * PARAGRAPH_BREAK_FILL
+        if has_new_content and (current_tokens + added > max_tokens or paragraph_break):
+            chunks.append(_join_chunk(current))
+            # 오버랩: 끝에서부터 overlap_tokens 안에 들어가는 온전한 문장들을 다시 사용
+            overlap = []
+            overlap_total = 0
+            for previous, previous_tokens in reversed(current):
+                cost = previous_tokens + SEPARATOR_TOKENS
+                if overlap_total + cost > overlap_tokens or overlap_total + cost + sentence_tokens > max_tokens:
+                    break
+                overlap.insert(0, (previous, previous_tokens))
+                overlap_total += cost
+            current = overlap
+            current_tokens = overlap_total - SEPARATOR_TOKENS if overlap else 0
+            added = sentence_tokens + (SEPARATOR_TOKENS if current else 0)
+        elif not has_new_content and current and current_tokens + added > max_tokens:
+            # 오버랩 문장만 들어 있는 상태에서 다음 문장이 들어가지 않으면 오버랩을 버림
+            current, current_tokens = [], 0
+            added = sentence_tokens
+        current.append((sentence, sentence_tokens))
+        current_tokens += added
+        has_new_content = True
+    if has_new_content:
+        chunks.append(_join_chunk(current))
+    return chunks
+
+def _join_chunk(sentences):
+    text = " ".join(sentence for sentence, _ in sentences)
+    return text, count_tokens(text)
+
+def _document_text_and_metadata(doc):
+    """청크 dict, LangChain Document(page_content/metadata 속성), 그 밖의 객체에서 본문과 메타데이터를 꺼냅니다."""
+    if isinstance(doc, dict) and 'page_content' in doc:
+        return doc['page_content'], doc.get('metadata') or {}
+    if hasattr(doc, 'page_content'):
+        return doc.page_content, getattr(doc, 'metadata', None) or {}
+    return str(doc), {}
+
+def document_token_count(doc):
+    """문서의 토큰 수. 청크 메타데이터에 기록된 token_count가 있으면 그것을 쓰고, 없으면 본문을 셉니다."""
+    text, metadata = _document_text_and_metadata(doc)
+    token_count = metadata.get('token_count')
+    return token_count if token_count is not None else count_tokens(text)
+
+def truncate_to_tokens(text, max_tokens):
+    """텍스트 앞부분을 max_tokens 토큰 이내로 자릅니다."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def pack_context(docs, max_tokens=CONTEXT_TOKEN_BUDGET, separator="\n\n"):
+    """검색된 문서를 순서대로 토큰 예산 안에서 채워 컨텍스트 문자열을 만듭니다.
+
+    예산을 넘기는 문서는 건너뛰고 뒤의 더 짧은 문서를 계속 시도합니다. 첫 문서가 예산보다 크면 예산만큼 잘라서 넣습니다.
+    빠지거나 잘린 문서가 있으면 로그를 남깁니다.
+    """
+    separator_tokens = count_tokens(separator)
+    parts = []
+    used = 0
+    dropped = 0
+    for doc in docs:
+        text = _document_text_and_metadata(doc)[0]
+        doc_tokens = document_token_count(doc)
+        if not parts and doc_tokens > max_tokens:
+            print(f"컨텍스트 예산({max_tokens}토큰)보다 큰 첫 문서({doc_tokens}토큰)를 잘라서 넣습니다.")
+            parts.append(truncate_to_tokens(text, max_tokens))
+            used = max_tokens
+            continue
+        cost = doc_tokens + (separator_tokens if parts else 0)
+        if used + cost > max_tokens:
+            dropped += 1
+            continue
+        parts.append(text)
+        used += cost
+    if dropped:
+        print(f"컨텍스트 예산({max_tokens}토큰) 초과로 문서 {dropped}개를 뺐습니다 (사용 {used}토큰, 넣은 문서 {len(parts)}개).")
+    return separator.join(parts)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+번역 캐시
+채팅 메시지 번역 결과를 (정규화된 원문, 대상 언어, 모델)을 키로 프로세스 내 LRU 캐시와 SQLite 디스크 계층에 보관합니다.
+"안녕하세요", "thank you"처럼 자주 보내는 짧은 문장은 LLM을 호출하지 않고 바로 번역됩니다.
+SingleFlight는 같은 번역을 동시에 요청한 여러 호출을 LLM 호출 하나로 합칩니다.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from embedding_cache import normalize_text
+
+# 환경변수로 조정 가능한 기본 설정 (TRANSLATION_CACHE_DB_PATH가 비어 있으면 디스크 계층 비활성화)
+TRANSLATION_CACHE_MAX_SIZE = int(os.getenv("TRANSLATION_CACHE_MAX_SIZE", "4096"))
+TRANSLATION_CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_DB_PATH", "translation_cache.sqlite3")
+# 이보다 긴 메시지는 다시 나올 가능성이 낮으므로 캐시하지 않음 (정규화 후 글자 수)
+TRANSLATION_CACHE_MAX_CHARS = int(os.getenv("TRANSLATION_CACHE_MAX_CHARS", "200"))
+
+def _cache_key(model, target_lang, normalized):
+    return hashlib.sha256(f"{model}\x1f{target_lang}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+class TranslationCache:
+    """(정규화된 원문, 대상 언어, 모델)을 키로 하는 스레드 안전 LRU 번역 캐시 (+ 선택적 SQLite 디스크 계층)."""
+
+    def __init__(self, max_size=TRANSLATION_CACHE_MAX_SIZE, db_path=None, max_chars=TRANSLATION_CACHE_MAX_CHARS):
+        self.max_size = max_size
+        self.db_path = db_path
+        self.max_chars = max_chars
+        self._entries = OrderedDict()  # key -> 번역문
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_disk_tier(db_path)
+
+    def _open_disk_tier(self, db_path):
+        try:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, model TEXT, target_lang TEXT, source_text TEXT, translated TEXT, created_at REAL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"번역 디스크 캐시를 열 수 없습니다 ({db_path}): {e}")
+            self._conn = None
+
+    def _key(self, text, target_lang, model):
+        """캐시 키. 비어 있거나 너무 긴 텍스트는 캐시하지 않으므로 None."""
+        normalized = normalize_text(text or "")
+        if not normalized or len(normalized) > self.max_chars:
+            return None, normalized
+        return _cache_key(model, target_lang, normalized), normalized
+
+    def get(self, text, target_lang, model):
+        """캐시된 번역문을 반환하고, 없으면 None을 반환합니다."""
+        key, _ = self._key(text, target_lang, model)
+        with self._lock:
+            if key is not None:
+                translated = self._entries.get(key)
+                if translated is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return translated
+                if self._conn is not None:
+                    row = self._conn.execute("SELECT translated FROM translations WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._remember(key, row[0])
+                        self.disk_hits += 1
+                        return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, text, target_lang, model, translated):
+        """번역문을 메모리(및 디스크) 캐시에 저장합니다. 저장했으면 True."""
+        key, normalized = self._key(text, target_lang, model)
+        if key is None or not translated:
+            return False
+        with self._lock:
+            self._remember(key, translated)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, model, target_lang, normalized, translated, time.time())
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"번역 디스크 캐시 저장 실패: {e}")
+        return True
+
+    def _remember(self, key, translated):
+        self._entries[key] = translated
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """적중/미스 통계를 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """메모리 캐시와 통계를 비웁니다 (디스크 계층은 유지)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+class SingleFlight:
+    """같은 키의 동시 요청을 하나로 합칩니다.
+
+    작업자 풀에 넣기 전에 합치므로, 실행 중인 작업과 같은 키의 요청은 풀 스레드를 차지하지 않고 같은 Future를 받습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+        self.executed = 0
+        self.shared = 0
+
+    def submit(self, key, executor, fn):
+        """실행 중인 같은 키의 Future가 있으면 그것을, 없으면 executor에 fn을 넣은 새 Future를 반환합니다."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            future = executor.submit(fn)
+            self._calls[key] = future
+            self.executed += 1
+        # 이미 끝난 Future의 콜백은 바로 이 스레드에서 실행되므로 잠금 밖에서 등록
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        # 끝난 호출은 지움: 이후 요청은 번역 캐시나 저장된 번역으로 처리됨
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+_default_translation_cache = None
+_default_translation_cache_lock = threading.Lock()
+
+def get_default_translation_cache():
+    """프로세스 전체에서 공유하는 번역 캐시를 반환합니다."""
+    global _default_translation_cache
+    with _default_translation_cache_lock:
+        if _default_translation_cache is None:
+            _default_translation_cache = TranslationCache(db_path=TRANSLATION_CACHE_DB_PATH or None)
+        return _default_translation_cache
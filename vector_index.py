@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+벡터 검색 인덱스
+SimpleVectorDB가 사용하는 행렬 연산 헬퍼와 NumPy 기반 IVF 근사 최근접 이웃(ANN) 인덱스입니다.
+"""
+
+import os
+import sys
+import numpy as np
+
+# 이 문서 수 미만이면 ANN 인덱스가 있어도 정확 검색(brute force)을 사용
+ANN_MIN_DOCUMENTS = 2000
+# 검색 시 탐색할 기본 리스트 수 (클수록 재현율↑, 지연시간↑)
+DEFAULT_NPROBE = 8
+# 양자화 검색에서 정확 재점수화할 후보 수 = k × RESCORE_FACTOR
+RESCORE_FACTOR = 4
+QUANTIZATION_DTYPES = ("float16", "int8")
+ANN_INDEX_FILE = "ivf_index.npz"
+ANN_INDEX_SUFFIX = ".ivf.npz"
+
+def normalize_rows(matrix):
+    """행 벡터를 L2 정규화한 contiguous float32 행렬을 반환합니다."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k_indices(scores, k):
+    """점수 벡터에서 상위 k개 인덱스를 내림차순으로 반환합니다 (argpartition 사용)."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def ann_index_path_for(db_path):
+    """벡터DB 경로 옆에 저장되는 ANN 인덱스 파일 경로를 반환합니다."""
+    if os.path.isdir(db_path):
+        return os.path.join(db_path, ANN_INDEX_FILE)
+    return os.path.splitext(db_path)[0] + ANN_INDEX_SUFFIX
+
+def _assign_to_centroids(matrix, centroids, batch_size=65536):
+    """각 행을 가장 가까운(내적 최대) centroid 번호에 배정합니다."""
+    assignments = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], batch_size):
+        block = np.asarray(matrix[start:start + batch_size], dtype=np.float32)
+        assignments[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def _spherical_kmeans(sample, n_lists, n_iter, rng):
+    """정규화된 샘플에 대해 코사인 k-means를 수행해 centroid 행렬을 반환합니다."""
+    centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+        # 비어 있는 리스트는 임의의 샘플로 다시 시작
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = sample[rng.choice(sample.shape[0], empty.size, replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class QuantizedMatrix:
+    """정규화된 임베딩 행렬의 압축 표현: float16, 또는 행별 scale을 둔 int8 (float32 대비 1/2, 약 1/4 메모리).
+
+    행 인덱싱(matrix[ids])은 복원한 float32 행을 돌려주므로 IVFIndex.search에도 그대로 쓸 수 있습니다.
+    """
+
+    def __init__(self, codes, scales=None, batch_size=8192):
+        self.codes = codes
+        self.scales = scales
+        self.batch_size = batch_size
+
+    @property
+    def dtype(self):
+        return str(self.codes.dtype)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @classmethod
+    def build(cls, matrix, dtype="int8", batch_size=8192):
+        """float32 행렬을 블록 단위로 압축합니다 (메모리 맵 행렬도 한 번에 다 올리지 않음)."""
+        if dtype not in QUANTIZATION_DTYPES:
+            raise ValueError(f"지원하지 않는 양자화 형식입니다: {dtype} (가능: {', '.join(QUANTIZATION_DTYPES)})")
+        n = matrix.shape[0]
+        codes = np.empty(matrix.shape, dtype=np.float16 if dtype == "float16" else np.int8)
+        scales = np.empty(n, dtype=np.float32) if dtype == "int8" else None
+        for start in range(0, n, batch_size):
+            block = np.asarray(matrix[start:start + batch_size], dtype=np.float32)
+            if scales is None:
+                codes[start:start + batch_size] = block
+                continue
+            block_scales = np.abs(block).max(axis=1) / 127.0
+            block_scales[block_scales == 0] = 1.0
+            codes[start:start + batch_size] = np.rint(block / block_scales[:, None])
+            scales[start:start + batch_size] = block_scales
+        return cls(codes, scales, batch_size=batch_size)
+
+    def __getitem__(self, ids):
+        rows = self.codes[ids].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[ids][..., None]
+        return rows
+
+    def __array__(self, dtype=None, copy=None):
+        # 전체를 한 번에 복원 (FAISS 변환처럼 모든 행이 필요한 경우에만 사용)
+        rows = self[:]
+        return rows if dtype is None else rows.astype(dtype, copy=False)
+
+    def dot(self, queries):
+        """압축 행렬과 쿼리(들)의 내적을 블록 단위로 계산합니다. queries가 (d,)면 (n,), (m, d)면 (m, n)을 반환합니다."""
+        queries = np.asarray(queries, dtype=np.float32)
+        n = self.codes.shape[0]
+        out = np.empty(queries.shape[:-1] + (n,), dtype=np.float32)
+        for start in range(0, n, self.batch_size):
+            end = min(start + self.batch_size, n)
+            out[..., start:end] = queries @ self[start:end].T
+        return out
+
+class IVFIndex:
+    """Inverted File 인덱스: centroid별 문서 id 리스트를 CSR 형태(offsets + ids)로 보관합니다."""
+
+    def __init__(self, centroids, list_offsets, list_ids, nprobe=DEFAULT_NPROBE):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @property
+    def count(self):
+        return int(self.list_ids.shape[0])
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, n_iter=10, sample_size=50000, nprobe=DEFAULT_NPROBE, seed=0):
+        """정규화된 임베딩 행렬로 IVF 인덱스를 만듭니다 (오프라인 빌드용)."""
+        n = matrix.shape[0]
+        if n == 0:
+            raise ValueError("빈 행렬로는 인덱스를 만들 수 없습니다.")
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(n))
+        n_lists = max(1, min(n_lists, n))
+        rng = np.random.default_rng(seed)
+        if n > sample_size:
+            sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+        else:
+            sample = np.asarray(matrix, dtype=np.float32)
+        centroids = _spherical_kmeans(sample, n_lists, n_iter, rng)
+        assignments = _assign_to_centroids(matrix, centroids)
+        list_ids = np.argsort(assignments, kind="stable").astype(np.int32)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_ids, nprobe=nprobe)
+
+    def search(self, matrix, query, k, nprobe=None):
+        """nprobe개 리스트의 후보만 정확 점수로 재계산해 (인덱스 배열, 점수 배열)을 반환합니다."""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probe = top_k_indices(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probe])
+        if candidates.size == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        candidates.sort()  # 메모리 맵 행렬을 순차적으로 읽도록 정렬
+        scores = np.asarray(matrix[candidates], dtype=np.float32) @ query
+        top = top_k_indices(scores, k)
+        return candidates[top], scores[top]
+
+    def save(self, path):
+        """인덱스를 .npz 파일로 저장합니다."""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, list_offsets=self.list_offsets,
+                 list_ids=self.list_ids, nprobe=np.int64(self.nprobe))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """저장된 .npz 인덱스를 로드합니다."""
+        with np.load(path) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_ids"], nprobe=int(data["nprobe"]))
+
+def main():
+    """벡터DB 옆에 ANN 인덱스를 빌드해 저장합니다: python vector_index.py <벡터DB 경로> [n_lists] [nprobe]"""
+    from rag_utils import load_vector_db
+    if len(sys.argv) < 2:
+        print("사용법: python vector_index.py <벡터DB 경로(.pkl 또는 .vdb)> [n_lists] [nprobe]")
+        return
+    db_path = sys.argv[1]
+    n_lists = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    nprobe = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_NPROBE
+    vector_db = load_vector_db(db_path)
+    index = vector_db.build_ann_index(n_lists=n_lists, nprobe=nprobe)
+    index_path = ann_index_path_for(db_path)
+    index.save(index_path)
+    print(f"ANN 인덱스 저장 완료: {index_path} (리스트 {index.n_lists}개, 문서 {index.count}개, nprobe={index.nprobe})")
+
+if __name__ == "__main__":
+    # pickle이 __main__.SimpleVectorDB를 참조하는 경우를 위해 __main__ 모듈에 이름을 둠
+    # (rag_utils가 이 모듈을 import하므로 파일 맨 위에서 가져오면 순환 import가 됨)
+    import rag_utils
+    SimpleVectorDB = rag_utils.SimpleVectorDB
+    main()